@@ -66,6 +66,7 @@ from routers.devices import get_device_details
 from routers.zabbix import get_alerts, get_mttr_stats, get_groups, get_templates, create_host, update_host, delete_host
 from routers.reports import get_mttr_extended
 from routers.websockets import monitor_device_changes
+from monitoring.victoria.async_client import close_async_victoria_client
 
 # Thread pool for running sync Zabbix client in async context
 executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
@@ -181,6 +182,7 @@ async def lifespan(app: FastAPI):
     # Shutdown
     app.state.monitor_task.cancel()
     executor.shutdown(wait=False)
+    await close_async_victoria_client()
 
 
 app = FastAPI(
@@ -0,0 +1,5 @@
+"""
+WARD FLUX - Alerting
+
+Alert rule evaluation and alert state tracking.
+"""
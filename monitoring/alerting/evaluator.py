@@ -0,0 +1,357 @@
+"""
+WARD FLUX - Alert Rule Evaluator
+
+Evaluates AlertRule expressions against VictoriaMetrics in batches:
+
+- rules are grouped by evaluation_interval and only due groups are evaluated,
+- due rules are queried concurrently on a bounded thread pool,
+- each rule moves through inactive -> pending -> firing -> (resolved) inactive,
+  firing only after its condition held for for_duration seconds,
+- all alert state changes of a cycle are written in one transaction.
+
+Rule state lives in memory and is snapshotted to Redis after every cycle, so
+a restarted worker (or another Celery process) resumes pending timers instead
+of starting them over. A Redis lock keeps concurrent cycles from evaluating
+the same rules twice.
+
+With ALERT_STREAMING enabled, simple threshold rules are left to the poller's
+ingest-time engine (monitoring/alerting/stream.py) and skipped here.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict, replace
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import redis
+
+from database import SessionLocal
+from monitoring.alerting.stream import ALERT_STREAMING, is_streamable
+from monitoring.models import AlertRule, AlertHistory
+from monitoring.victoria.client import get_victoria_client
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+ALERT_STATE_KEY = "ward:alerts:state"
+ALERT_LOCK_KEY = "ward:alerts:lock"
+
+ALERT_EVAL_CONCURRENCY = int(os.getenv("ALERT_EVAL_CONCURRENCY", "16"))  # Rules queried at once
+ALERT_LOCK_TIMEOUT = int(os.getenv("ALERT_LOCK_TIMEOUT", "120"))  # seconds
+ALERT_FORCED_LOCK_WAIT = float(os.getenv("ALERT_FORCED_LOCK_WAIT", "30"))  # seconds a forced cycle waits for a running one
+DEFAULT_EVALUATION_INTERVAL = 60  # seconds
+INTERVAL_SLACK = 2.0  # seconds: a rule is due slightly early so beat jitter does not skip a cycle
+
+STATE_INACTIVE = "inactive"
+STATE_PENDING = "pending"
+STATE_FIRING = "firing"
+
+
+@dataclass
+class RuleState:
+    """Evaluation state of one alert rule"""
+
+    state: str = STATE_INACTIVE
+    active_since: Optional[float] = None  # When the condition started holding (epoch seconds)
+    last_eval: float = 0.0
+    last_value: Optional[str] = None
+    alert_id: Optional[str] = None  # Open AlertHistory row while firing
+
+
+def metric_pattern(metrics: Iterable[str]) -> re.Pattern:
+    """
+    Build a regex matching any of the metric names as a whole PromQL identifier
+
+    Args:
+        metrics: Metric names
+
+    Returns:
+        Compiled pattern for searching rule expressions
+    """
+    names = "|".join(re.escape(name) for name in sorted(set(metrics), key=len, reverse=True))
+    return re.compile(rf"(?<![A-Za-z0-9_:])(?:{names})(?![A-Za-z0-9_:])")
+
+
+class AlertEvaluator:
+    """
+    Batched alert rule evaluator with a for_duration state machine
+    """
+
+    def __init__(self, concurrency: int = ALERT_EVAL_CONCURRENCY):
+        """
+        Initialize evaluator
+
+        Args:
+            concurrency: Maximum rules queried at once
+        """
+        self.concurrency = concurrency
+        self._states: Dict[str, RuleState] = {}
+        self._cycle = 0
+        self._seeded = False
+        self._redis: Optional[redis.Redis] = None
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="alert-eval")
+
+    # ============================================
+    # State snapshot
+    # ============================================
+
+    def _get_redis(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.from_url(REDIS_URL, decode_responses=True, socket_timeout=2)
+        return self._redis
+
+    def _load_snapshot(self):
+        """Adopt the Redis snapshot if another process evaluated more recently"""
+        try:
+            raw = self._get_redis().get(ALERT_STATE_KEY)
+        except Exception as e:
+            logger.debug(f"Failed to load alert state snapshot: {e}")
+            return
+
+        if not raw:
+            return
+
+        snapshot = json.loads(raw)
+        if snapshot.get("cycle", 0) > self._cycle:
+            self._cycle = snapshot["cycle"]
+            self._states = {rule_id: RuleState(**state) for rule_id, state in snapshot.get("states", {}).items()}
+            self._seeded = True
+
+    def _save_snapshot(self):
+        snapshot = {"cycle": self._cycle, "states": {rule_id: asdict(state) for rule_id, state in self._states.items()}}
+        try:
+            self._get_redis().set(ALERT_STATE_KEY, json.dumps(snapshot))
+        except Exception as e:
+            logger.warning(f"Failed to save alert state snapshot: {e}")
+
+    def _seed_from_database(self, db):
+        """Mark rules with an open alert as firing (first run without a snapshot)"""
+        for alert in db.query(AlertHistory).filter(AlertHistory.resolved_at.is_(None)).all():
+            self._states[str(alert.rule_id)] = RuleState(
+                state=STATE_FIRING,
+                active_since=alert.triggered_at.timestamp() if alert.triggered_at else None,
+                alert_id=str(alert.id),
+            )
+        self._seeded = True
+
+    # ============================================
+    # Evaluation
+    # ============================================
+
+    @staticmethod
+    def _evaluate_rule(expression: str) -> Tuple[Optional[bool], Optional[str]]:
+        """
+        Query one rule expression
+
+        Returns:
+            (condition met, first sample value), or (None, None) if the query failed
+        """
+        result = get_victoria_client().query(expression)
+        if not result or result.get("status") != "success":
+            return None, None
+
+        data = result.get("data", {}).get("result", [])
+        if not data:
+            return False, None
+
+        value = data[0].get("value")
+        return True, str(value[1]) if value else None
+
+    def due_rules(
+        self, rules: List[AlertRule], now: float, metrics: Optional[Iterable[str]] = None
+    ) -> Dict[int, List[AlertRule]]:
+        """
+        Group rules by evaluation interval and keep the groups that are due
+
+        Args:
+            rules: Enabled rules
+            now: Current epoch time
+            metrics: Metric names whose rules are due regardless of their interval
+
+        Returns:
+            Dictionary of interval -> due rules
+        """
+        forced = metric_pattern(metrics) if metrics else None
+
+        groups: Dict[int, List[AlertRule]] = {}
+        for rule in rules:
+            interval = rule.evaluation_interval or DEFAULT_EVALUATION_INTERVAL
+            state = self._states.get(str(rule.id))
+            is_forced = forced is not None and forced.search(rule.expression or "") is not None
+            if not is_forced and state is not None and now - state.last_eval < interval - INTERVAL_SLACK:
+                continue
+            groups.setdefault(interval, []).append(rule)
+        return groups
+
+    def run_cycle(self, metrics: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Evaluate all due rules and persist alert state changes
+
+        Args:
+            metrics: Also evaluate rules referencing these metric names now, even if
+                not due (event-triggered checks such as link traps). Such a cycle
+                waits up to ALERT_FORCED_LOCK_WAIT for a running one instead of skipping.
+
+        Returns:
+            Cycle summary
+        """
+        blocking_timeout = ALERT_FORCED_LOCK_WAIT if metrics else 0
+        lock = self._get_redis().lock(ALERT_LOCK_KEY, timeout=ALERT_LOCK_TIMEOUT, blocking_timeout=blocking_timeout)
+        try:
+            acquired = lock.acquire()
+        except Exception as e:
+            logger.warning(f"Alert lock unavailable ({e}), evaluating without it")
+            lock, acquired = None, True
+
+        if not acquired:
+            logger.debug("Another alert evaluation cycle is running, skipping")
+            return {"skipped": True}
+
+        db = SessionLocal()
+        try:
+            self._load_snapshot()
+            if not self._seeded:
+                self._seed_from_database(db)
+
+            return self._run_cycle(db, metrics)
+        finally:
+            db.close()
+            if lock is not None:
+                try:
+                    lock.release()
+                except Exception:
+                    pass
+
+    def _run_cycle(self, db, metrics: Optional[List[str]] = None) -> Dict[str, Any]:
+        now = time.time()
+        rules = db.query(AlertRule).filter_by(enabled=True).all()
+        enabled_ids = {str(rule.id) for rule in rules}
+        if ALERT_STREAMING:
+            rules = [rule for rule in rules if not is_streamable(rule.expression)]
+
+        timestamp = datetime.utcnow()
+        new_alerts: List[Tuple[RuleState, AlertHistory]] = []
+        resolved_ids: List[uuid.UUID] = []
+        failed = 0
+
+        # Work on a copy: if the commit fails the old states stay, so the same rules
+        # are due again next tick and their resolutions are retried
+        states = {rule_id: replace(state) for rule_id, state in self._states.items()}
+
+        # Forget rules that were deleted or disabled, resolving their open alerts;
+        # enabled rules handed to the streaming engine are dropped without resolving
+        evaluated_ids = {str(rule.id) for rule in rules}
+        for rule_id in list(states):
+            if rule_id in evaluated_ids:
+                continue
+            state = states.pop(rule_id)
+            if rule_id not in enabled_ids and state.state == STATE_FIRING and state.alert_id:
+                resolved_ids.append(uuid.UUID(state.alert_id))
+                logger.info(f"Alert resolved: rule {rule_id} deleted or disabled")
+
+        groups = self.due_rules(rules, now, metrics)
+        due = [rule for group in groups.values() for rule in group]
+
+        outcomes = list(self._pool.map(lambda rule: self._evaluate_rule(rule.expression), due))
+
+        for rule, (met, value) in zip(due, outcomes):
+            if met is None:
+                failed += 1
+                continue
+
+            state = states.setdefault(str(rule.id), RuleState())
+            state.last_eval = now
+
+            if not met:
+                if state.state == STATE_FIRING and state.alert_id:
+                    resolved_ids.append(uuid.UUID(state.alert_id))
+                    logger.info(f"Alert resolved: {rule.name}")
+                states[str(rule.id)] = RuleState(last_eval=now)
+                continue
+
+            state.last_value = value
+            if state.state == STATE_INACTIVE:
+                state.state = STATE_PENDING
+                state.active_since = now
+
+            if state.state == STATE_PENDING and now - state.active_since >= (rule.for_duration or 0):
+                alert = AlertHistory(
+                    id=uuid.uuid4(),
+                    rule_id=rule.id,
+                    device_id=rule.device_id,
+                    severity=rule.severity,
+                    message=f"Alert: {rule.name}",
+                    value=value[:100] if value else None,
+                    triggered_at=timestamp,
+                )
+                new_alerts.append((state, alert))
+                logger.warning(f"Alert triggered: {rule.name}")
+
+        if new_alerts or resolved_ids:
+            if new_alerts:
+                db.add_all([alert for _, alert in new_alerts])
+            if resolved_ids:
+                db.query(AlertHistory).filter(AlertHistory.id.in_(resolved_ids)).update(
+                    {AlertHistory.resolved_at: timestamp}, synchronize_session=False
+                )
+            try:
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+
+        # Only move to firing once the alert row is committed
+        for state, alert in new_alerts:
+            state.state = STATE_FIRING
+            state.alert_id = str(alert.id)
+        self._states = states
+
+        self._cycle += 1
+        self._save_snapshot()
+
+        summary = {
+            "rules": len(rules),
+            "rules_evaluated": len(due),
+            "intervals": sorted(groups),
+            "evaluation_errors": failed,
+            "pending": sum(1 for state in self._states.values() if state.state == STATE_PENDING),
+            "firing": sum(1 for state in self._states.values() if state.state == STATE_FIRING),
+            "alerts_triggered": len(new_alerts),
+            "alerts_resolved": len(resolved_ids),
+        }
+        logger.info(f"Alert cycle: {summary}")
+        return summary
+
+    def get_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the current state of every tracked rule
+
+        Returns:
+            Dictionary of rule ID -> state dictionary
+        """
+        return {rule_id: asdict(state) for rule_id, state in self._states.items()}
+
+
+# Singleton instance
+_alert_evaluator: Optional[AlertEvaluator] = None
+
+
+def get_alert_evaluator() -> AlertEvaluator:
+    """
+    Get or create AlertEvaluator singleton
+
+    Returns:
+        AlertEvaluator instance
+    """
+    global _alert_evaluator
+
+    if _alert_evaluator is None:
+        _alert_evaluator = AlertEvaluator()
+
+    return _alert_evaluator
@@ -0,0 +1,499 @@
+"""
+WARD FLUX - Streaming Threshold Alerts
+
+Evaluates simple threshold rules against samples as the poller produces them,
+without a VictoriaMetrics query. Rules whose expression has the form
+
+    metric_name <op> number
+    metric_name{label="value", ...} <op> number      (op: > >= < <= == !=)
+
+are compiled into predicates indexed by metric name and device. Every other
+expression stays with the batched evaluator (monitoring/alerting/evaluator.py),
+which skips streamable rules when ALERT_STREAMING is enabled.
+
+A global rule (no device_id) is tracked per device. The state machine is the
+evaluator's: pending until the condition held for for_duration, then firing
+until a sample no longer matches. State changes are queued and written in one
+transaction per flush.
+
+Streaming runs in the poller service, which sees the samples of the devices
+it polls. When sharded, a ring rebalance moves devices between nodes: the
+losing node drops their state and the gaining node adopts their open alerts
+(set_ownership). The handoff is not transactional, so an alert raised or
+cleared right at a rebalance can be missed or duplicated until the next
+sample. A device that stops producing samples (unreachable, removed) ages out
+after a few poll intervals and its alerts are resolved.
+
+Samples produced outside the poller service (linkUp/linkDown traps, see
+monitoring/traps.py) are published on ALERT_SAMPLES_CHANNEL; every poller
+node observes the ones of devices it owns.
+"""
+
+import os
+import re
+import time
+import asyncio
+import uuid
+import operator
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from database import SessionLocal
+from monitoring.models import AlertRule, AlertHistory
+
+logger = logging.getLogger(__name__)
+
+ALERT_STREAMING = os.getenv("ALERT_STREAMING", "false").lower() == "true"
+ALERT_STREAM_REFRESH = float(os.getenv("ALERT_STREAM_REFRESH", "60"))  # seconds between rule reloads
+ALERT_STREAM_FLUSH_INTERVAL = float(os.getenv("ALERT_STREAM_FLUSH_INTERVAL", "2"))  # seconds between alert writes
+ALERT_STREAM_STALE_INTERVALS = float(os.getenv("ALERT_STREAM_STALE_INTERVALS", "3"))  # missed polls before state ages out
+ALERT_STREAM_STALE_AFTER = float(os.getenv("ALERT_STREAM_STALE_AFTER", "300"))  # seconds, until a poll interval is known
+
+# Redis pub/sub channel on which the trap receiver publishes link-state samples for observe()
+ALERT_SAMPLES_CHANNEL = "ward:alerts:samples"
+
+OPERATORS: Dict[str, Callable[[float, float], bool]] = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+THRESHOLD_PATTERN = re.compile(
+    r"^\s*(?P<metric>[a-zA-Z_:][a-zA-Z0-9_:]*)\s*"
+    r"(?:\{(?P<labels>[^{}]*)\})?\s*"
+    r"(?P<op>>=|<=|==|!=|>|<)\s*"
+    r"(?P<threshold>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*$"
+)
+LABEL_PATTERN = re.compile(r'\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*"((?:[^"\\]|\\.)*)"\s*(?:,|$)')
+
+
+@dataclass(frozen=True)
+class ThresholdRule:
+    """Compiled threshold form of an AlertRule"""
+
+    rule_id: str
+    name: str
+    severity: Any
+    device_id: Optional[str]
+    metric_name: str
+    matchers: Tuple[Tuple[str, str], ...]
+    op: str
+    threshold: float
+    for_duration: int
+
+    def matches(self, value: float, labels: Mapping[str, str]) -> Optional[bool]:
+        """
+        Check a sample
+
+        Returns:
+            None if the sample's labels do not select this rule, else whether the condition holds
+        """
+        for key, expected in self.matchers:
+            if labels.get(key) != expected:
+                return None
+        return OPERATORS[self.op](value, self.threshold)
+
+
+def parse_threshold(expression: str) -> Optional[Tuple[str, Tuple[Tuple[str, str], ...], str, float]]:
+    """
+    Parse a threshold expression
+
+    Args:
+        expression: AlertRule.expression
+
+    Returns:
+        (metric name, label matchers, operator, threshold), or None if the
+        expression is not a simple threshold
+    """
+    match = THRESHOLD_PATTERN.match(expression or "")
+    if not match:
+        return None
+
+    matchers = []
+    labels = (match.group("labels") or "").strip()
+    position = 0
+    while position < len(labels):
+        label = LABEL_PATTERN.match(labels, position)
+        if not label:
+            return None  # Regex/negative matchers need PromQL
+        matchers.append((label.group(1), label.group(2).replace('\\"', '"').replace("\\\\", "\\")))
+        position = label.end()
+
+    return match.group("metric"), tuple(matchers), match.group("op"), float(match.group("threshold"))
+
+
+def is_streamable(expression: str) -> bool:
+    """True if the expression can be evaluated at ingest time"""
+    return parse_threshold(expression) is not None
+
+
+def compile_rule(rule: AlertRule) -> Optional[ThresholdRule]:
+    """
+    Compile an AlertRule into a ThresholdRule
+
+    Args:
+        rule: AlertRule database object
+
+    Returns:
+        ThresholdRule, or None if the expression needs the batched evaluator
+    """
+    parsed = parse_threshold(rule.expression)
+    if parsed is None:
+        return None
+
+    metric_name, matchers, op, threshold = parsed
+    return ThresholdRule(
+        rule_id=str(rule.id),
+        name=rule.name,
+        severity=rule.severity,
+        device_id=str(rule.device_id) if rule.device_id else None,
+        metric_name=metric_name,
+        matchers=matchers,
+        op=op,
+        threshold=threshold,
+        for_duration=rule.for_duration or 0,
+    )
+
+
+@dataclass
+class _SeriesState:
+    active_since: float
+    value: float
+    firing: bool = False
+    alert_id: Optional[str] = None
+    last_seen: float = 0.0
+    interval: Optional[float] = None  # seconds between the last two matching samples
+
+    def is_stale(self, now: float) -> bool:
+        window = self.interval * ALERT_STREAM_STALE_INTERVALS if self.interval else ALERT_STREAM_STALE_AFTER
+        return now - self.last_seen > window
+
+
+class StreamingAlertEngine:
+    """
+    Ingest-time evaluator for threshold rules
+
+    observe() is called from the polling loop and only does dictionary
+    lookups and comparisons; refresh() and flush() touch the database and
+    should run in a thread.
+    """
+
+    def __init__(self):
+        # metric name -> device ID (None for global rules) -> rules
+        self._index: Dict[str, Dict[Optional[str], List[ThresholdRule]]] = {}
+        self._rules: Dict[str, ThresholdRule] = {}
+        # (rule ID, device ID) -> state while the condition holds or the alert fires
+        self._states: Dict[Tuple[str, str], _SeriesState] = {}
+        self._fired: List[Tuple[_SeriesState, AlertHistory]] = []
+        self._resolved: List[str] = []
+        self._lock = threading.Lock()
+        self._owns: Optional[Callable[[str], bool]] = None
+        self._needs_seed = True  # Adopt open alerts on the next refresh
+
+        self.samples_checked = 0
+        self.alerts_triggered = 0
+        self.alerts_resolved = 0
+        self.states_expired = 0
+
+    def set_ownership(self, owns: Optional[Callable[[str], bool]]):
+        """
+        Restrict the engine to the devices this node polls
+
+        State of devices that moved to another node is dropped without resolving
+        (the new owner adopts the open alert); open alerts of gained devices are
+        adopted on the next refresh.
+
+        Args:
+            owns: Device ID -> whether this node owns it (None = every device)
+        """
+        with self._lock:
+            self._owns = owns
+            if owns is not None:
+                for key in [key for key in self._states if not owns(key[1])]:
+                    del self._states[key]
+            self._needs_seed = True
+
+    def refresh(self):
+        """Reload and recompile enabled rules (blocking)"""
+        with self._lock:
+            seed, self._needs_seed = self._needs_seed, False
+
+        db = SessionLocal()
+        try:
+            rules = db.query(AlertRule).filter_by(enabled=True).all()
+            compiled = [threshold for threshold in (compile_rule(rule) for rule in rules) if threshold is not None]
+
+            index: Dict[str, Dict[Optional[str], List[ThresholdRule]]] = {}
+            for threshold in compiled:
+                index.setdefault(threshold.metric_name, {}).setdefault(threshold.device_id, []).append(threshold)
+
+            open_alerts = []
+            if seed:
+                open_alerts = (
+                    db.query(AlertHistory)
+                    .filter(AlertHistory.resolved_at.is_(None), AlertHistory.rule_id.in_([uuid.UUID(t.rule_id) for t in compiled]))
+                    .all()
+                    if compiled
+                    else []
+                )
+        except Exception:
+            if seed:
+                with self._lock:
+                    self._needs_seed = True
+            raise
+        finally:
+            db.close()
+
+        now = time.time()
+        with self._lock:
+            self._index = index
+            self._rules = {threshold.rule_id: threshold for threshold in compiled}
+
+            # Drop state of rules that were deleted, disabled or are no longer thresholds
+            for key in [key for key in self._states if key[0] not in self._rules]:
+                state = self._states.pop(key)
+                if state.firing and state.alert_id:
+                    self._resolved.append(state.alert_id)
+                    self.alerts_resolved += 1
+                    logger.info(f"Alert resolved: rule {key[0]} removed (device {key[1]})")
+
+            # Adopt open alerts of owned devices (startup and after a rebalance)
+            pending = set(self._resolved)
+            for alert in open_alerts:
+                if alert.device_id is None or str(alert.id) in pending:
+                    continue
+                key = (str(alert.rule_id), str(alert.device_id))
+                if key in self._states or (self._owns is not None and not self._owns(key[1])):
+                    continue
+                self._states[key] = _SeriesState(
+                    active_since=alert.triggered_at.timestamp() if alert.triggered_at else now,
+                    value=float("nan"),
+                    firing=True,
+                    alert_id=str(alert.id),
+                    last_seen=now,
+                )
+
+        logger.info(f"Streaming alerts: {len(compiled)} threshold rules on {len(index)} metrics")
+
+    def observe(self, metrics: List[Dict[str, Any]]):
+        """
+        Check fresh samples against the threshold rules
+
+        Args:
+            metrics: Metric dictionaries as passed to write_metrics_bulk
+        """
+        if not self._index:
+            return
+
+        # Like a PromQL threshold, a rule holds for a device if any of its series matches
+        # (a poll delivers all series of a device together)
+        outcomes: Dict[Tuple[str, str], Tuple[ThresholdRule, bool, float]] = {}
+        for metric in metrics:
+            by_device = self._index.get(metric["metric_name"])
+            if by_device is None:
+                continue
+
+            labels = metric.get("labels") or {}
+            device_id = labels.get("device_id")
+            if not device_id:
+                continue
+            value = metric["value"]
+
+            for rules in (by_device.get(device_id), by_device.get(None)):
+                if not rules:
+                    continue
+                for threshold in rules:
+                    met = threshold.matches(value, labels)
+                    if met is None:
+                        continue
+                    self.samples_checked += 1
+                    key = (threshold.rule_id, device_id)
+                    previous = outcomes.get(key)
+                    if previous is None or (met and not previous[1]):
+                        outcomes[key] = (threshold, met, value)
+
+        if not outcomes:
+            return
+
+        now = time.time()
+        with self._lock:
+            for (_, device_id), (threshold, met, value) in outcomes.items():
+                self._transition(threshold, device_id, met, value, now)
+
+    def _transition(self, threshold: ThresholdRule, device_id: str, met: bool, value: float, now: float):
+        key = (threshold.rule_id, device_id)
+        state = self._states.get(key)
+
+        if not met:
+            if state is not None:
+                if state.firing and state.alert_id:
+                    self._resolved.append(state.alert_id)
+                    self.alerts_resolved += 1
+                    logger.info(f"Alert resolved: {threshold.name} (device {device_id})")
+                del self._states[key]
+            return
+
+        if state is None:
+            state = self._states[key] = _SeriesState(active_since=now, value=value)
+        elif now > state.last_seen:
+            state.interval = now - state.last_seen
+        state.value = value
+        state.last_seen = now
+
+        if not state.firing and now - state.active_since >= threshold.for_duration:
+            alert = AlertHistory(
+                id=uuid.uuid4(),
+                rule_id=uuid.UUID(threshold.rule_id),
+                device_id=uuid.UUID(device_id),
+                severity=threshold.severity,
+                message=f"Alert: {threshold.name}",
+                value=str(value)[:100],
+                triggered_at=datetime.utcnow(),
+            )
+            state.firing = True
+            state.alert_id = str(alert.id)
+            self._fired.append((state, alert))
+            self.alerts_triggered += 1
+            logger.warning(f"Alert triggered: {threshold.name} (device {device_id}, value {value})")
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """
+        Age out states that stopped receiving samples, resolving their alerts
+
+        A device that stops answering produces no samples, so without this its
+        alerts would fire forever.
+
+        Args:
+            now: Current time (defaults to time.time())
+
+        Returns:
+            Number of states removed
+        """
+        now = now or time.time()
+        with self._lock:
+            stale = [key for key, state in self._states.items() if state.is_stale(now)]
+            for key in stale:
+                state = self._states.pop(key)
+                if state.firing and state.alert_id:
+                    self._resolved.append(state.alert_id)
+                    self.alerts_resolved += 1
+                    logger.info(f"Alert resolved: rule {key[0]} (device {key[1]}, no samples for {now - state.last_seen:.0f}s)")
+            self.states_expired += len(stale)
+        return len(stale)
+
+    def flush(self) -> int:
+        """
+        Write queued alert state changes in one transaction (blocking)
+
+        Returns:
+            Number of changes written
+        """
+        with self._lock:
+            fired, self._fired = self._fired, []
+            resolved, self._resolved = self._resolved, []
+
+        if not fired and not resolved:
+            return 0
+
+        # An alert raised and cleared within one flush only needs its resolved_at set on insert
+        resolved_set = set(resolved)
+        timestamp = datetime.utcnow()
+        for _, alert in fired:
+            if str(alert.id) in resolved_set:
+                alert.resolved_at = timestamp
+                resolved_set.discard(str(alert.id))
+
+        db = SessionLocal()
+        try:
+            if fired:
+                db.add_all([alert for _, alert in fired])
+            if resolved_set:
+                db.query(AlertHistory).filter(AlertHistory.id.in_([uuid.UUID(alert_id) for alert_id in resolved_set])).update(
+                    {AlertHistory.resolved_at: timestamp}, synchronize_session=False
+                )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to write streaming alert changes, requeueing: {e}")
+            with self._lock:
+                self._fired = fired + self._fired
+                self._resolved = resolved + self._resolved
+            return 0
+        finally:
+            db.close()
+
+        return len(fired) + len(resolved)
+
+    async def run(self, stop_event: asyncio.Event, refresh_interval: float = ALERT_STREAM_REFRESH, flush_interval: float = ALERT_STREAM_FLUSH_INTERVAL):
+        """
+        Flush alert changes and reload rules until stop_event is set
+
+        Args:
+            stop_event: Set to stop the loop (pending changes are flushed first)
+            refresh_interval: Seconds between rule reloads
+            flush_interval: Seconds between alert writes
+        """
+        loop = asyncio.get_running_loop()
+        next_refresh = 0.0
+
+        while not stop_event.is_set():
+            if loop.time() >= next_refresh or self._needs_seed:
+                try:
+                    await loop.run_in_executor(None, self.refresh)
+                except Exception as e:
+                    logger.error(f"Failed to load threshold rules: {e}")
+                next_refresh = loop.time() + refresh_interval
+
+            self.expire()
+            await loop.run_in_executor(None, self.flush)
+
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+        await loop.run_in_executor(None, self.flush)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get engine statistics
+
+        Returns:
+            Dictionary with rule, state and alert counts
+        """
+        return {
+            "rules": len(self._rules),
+            "metrics_indexed": len(self._index),
+            "active_series": len(self._states),
+            "firing": sum(1 for state in self._states.values() if state.firing),
+            "samples_checked": self.samples_checked,
+            "alerts_triggered": self.alerts_triggered,
+            "alerts_resolved": self.alerts_resolved,
+            "states_expired": self.states_expired,
+            "queued_changes": len(self._fired) + len(self._resolved),
+        }
+
+
+# Singleton instance
+_streaming_engine: Optional[StreamingAlertEngine] = None
+
+
+def get_streaming_engine() -> StreamingAlertEngine:
+    """
+    Get or create StreamingAlertEngine singleton
+
+    Returns:
+        StreamingAlertEngine instance
+    """
+    global _streaming_engine
+
+    if _streaming_engine is None:
+        _streaming_engine = StreamingAlertEngine()
+
+    return _streaming_engine
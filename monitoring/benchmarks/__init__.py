@@ -0,0 +1,6 @@
+"""
+WARD FLUX - Monitoring Benchmarks
+
+Standalone load/throughput benchmarks for the monitoring engine.
+Run individual benchmarks with ``python -m monitoring.benchmarks.<name>``.
+"""
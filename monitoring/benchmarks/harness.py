@@ -0,0 +1,285 @@
+"""
+WARD FLUX - Poller Benchmark Harness
+
+Polls a fleet of simulated agents (monitoring.benchmarks.simulator, started
+in a child process so it does not share CPU with the poller) in each poller
+mode and reports devices/sec, p50/p99 per-device poll latency and poller CPU
+time per poll.
+
+Modes:
+    pysnmp   SNMPPoller.get_batch on the pysnmp backend (poll_device_snmp path)
+    fast     SNMPPoller.get_batch on the native v2c fast path
+    per-oid  one SNMPPoller.get per OID, all in parallel (pre-batching behaviour)
+    scanner  SNMPScanner.scan_host_v2c discovery of each agent
+
+Usage:
+    python -m monitoring.benchmarks.harness --agents 500 --rounds 3 \\
+        --modes pysnmp,fast --latency 0.002 --loss 0.001
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from monitoring.benchmarks.simulator import (
+    AgentProfile,
+    AgentSimulator,
+    add_profile_arguments,
+    build_oid_tree,
+    profile_from_args,
+)
+from monitoring.discovery.snmp_scanner import SNMPScanner
+from monitoring.poll_plan import PollPlan, build_plan_metrics, compile_plan
+from monitoring.rates import SYS_UPTIME_OID
+from monitoring.snmp.poller import SNMPPoller, SNMPCredentialData
+
+logger = logging.getLogger(__name__)
+
+MODES = ("pysnmp", "fast", "per-oid", "scanner")
+
+# ifTable columns polled per interface: ifOperStatus, ifInOctets, ifOutOctets
+POLLED_IF_COLUMNS = (8, 10, 16)
+
+
+def _run_simulator(count: int, base_port: int, host: str, profile: AgentProfile, ready):
+    async def serve():
+        simulator = AgentSimulator(count, base_port, host, profile)
+        await simulator.start()
+        ready.set()
+        await asyncio.Event().wait()
+
+    logging.basicConfig(level=logging.WARNING)
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+def device_oids(profile: AgentProfile) -> List[str]:
+    """
+    OIDs polled per device: interface status/counters plus vendor OIDs
+
+    Args:
+        profile: Agent profile of the simulated fleet
+
+    Returns:
+        List of dotted OIDs (sysUpTime is added by the poll itself)
+    """
+    oids = []
+    for oid in sorted(build_oid_tree(profile, 0)):
+        is_if_counter = oid[:9] == (1, 3, 6, 1, 2, 1, 2, 2, 1) and oid[9] in POLLED_IF_COLUMNS
+        is_vendor = oid[:6] == (1, 3, 6, 1, 4, 1)
+        if is_if_counter or is_vendor:
+            oids.append(".".join(map(str, oid)))
+    return oids
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percentile / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _build_poll_func(
+    mode: str, credentials: SNMPCredentialData, oids: List[str], timeout: float, retries: int, with_metrics: bool
+) -> Callable[[str, int], Awaitable[bool]]:
+    """Return an async poll(ip, port) -> success function for a mode"""
+    if mode == "scanner":
+        scanner = SNMPScanner(timeout=timeout, retries=retries)
+
+        async def scan(ip: str, port: int) -> bool:
+            result = await scanner.scan_host_v2c(ip, [credentials.community], port)
+            return result.responsive
+
+        return scan
+
+    poller = SNMPPoller(backend="fast" if mode == "fast" else "pysnmp")
+    poller.timeout = timeout
+    poller.retries = retries
+    poller.health.max_timeout = timeout
+
+    plans: Dict[Tuple[str, int], PollPlan] = {}
+    item_names = [f"item_{i}" for i in range(len(oids))]
+    request_oids = oids + [SYS_UPTIME_OID]
+
+    async def poll(ip: str, port: int) -> bool:
+        if mode == "per-oid":
+            results = await asyncio.gather(*(poller.get(ip, oid, credentials, port) for oid in request_oids))
+        else:
+            results = await poller.get_batch(ip, request_oids, credentials, port)
+
+        if with_metrics:
+            plan = plans.get((ip, port))
+            if plan is None:
+                device_id = f"{ip}:{port}"
+                plan = compile_plan(device_id, device_id, ip, 60, credentials, list(zip(oids, item_names)))
+                plans[(ip, port)] = plan
+            build_plan_metrics(plan, results, datetime.utcnow())
+
+        return all(result.success for result in results)
+
+    return poll
+
+
+async def run_mode(
+    mode: str,
+    addresses: List[Tuple[str, int]],
+    credentials: SNMPCredentialData,
+    oids: List[str],
+    rounds: int = 3,
+    concurrency: int = 200,
+    timeout: float = 2.0,
+    retries: int = 1,
+    with_metrics: bool = False,
+) -> Dict[str, float]:
+    """
+    Poll every address `rounds` times in one mode and measure it
+
+    Args:
+        mode: One of MODES
+        addresses: (ip, port) of each simulated agent
+        credentials: v2c credentials
+        oids: OIDs polled per device
+        rounds: Full passes over all devices
+        concurrency: Maximum devices polled at once
+        timeout: Per-request timeout in seconds
+        retries: Retries per request
+        with_metrics: Also build VictoriaMetrics samples (as poll_device_snmp does)
+
+    Returns:
+        Dictionary with devices/sec, latency percentiles and CPU per poll
+    """
+    poll = _build_poll_func(mode, credentials, oids, timeout, retries, with_metrics)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    succeeded = 0
+
+    async def one(ip: str, port: int):
+        nonlocal succeeded
+        async with semaphore:
+            started = time.perf_counter()
+            ok = await poll(ip, port)
+            latencies.append(time.perf_counter() - started)
+            succeeded += ok
+
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(one(ip, port) for ip, port in addresses))
+    wall = time.perf_counter() - wall_started
+    cpu = time.process_time() - cpu_started
+
+    polls = len(latencies)
+    return {
+        "mode": mode,
+        "polls": polls,
+        "succeeded": succeeded,
+        "oids_per_poll": len(oids) + 1,
+        "seconds": round(wall, 3),
+        "devices_per_sec": round(polls / wall, 1) if wall else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "cpu_ms_per_poll": round(cpu / polls * 1000, 3) if polls else 0.0,
+    }
+
+
+async def run_benchmarks(
+    modes: List[str],
+    addresses: List[Tuple[str, int]],
+    credentials: SNMPCredentialData,
+    oids: List[str],
+    **options,
+) -> List[Dict[str, float]]:
+    """
+    Run run_mode for each mode in turn
+
+    Returns:
+        One result dictionary per mode
+    """
+    results = []
+    for mode in modes:
+        logger.info(f"Benchmarking {mode} against {len(addresses)} agents")
+        results.append(await run_mode(mode, addresses, credentials, oids, **options))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SNMP poller benchmark against simulated agents")
+    parser.add_argument("--agents", type=int, default=200, help="Number of simulated agents")
+    parser.add_argument("--host", default="127.0.0.1", help="Simulator bind address")
+    parser.add_argument("--base-port", type=int, default=20000, help="Port of the first agent")
+    parser.add_argument("--external", action="store_true", help="Use an already running simulator")
+    parser.add_argument("--modes", default="pysnmp,fast,per-oid", help=f"Comma-separated modes: {', '.join(MODES)}")
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over all agents per mode")
+    parser.add_argument("--concurrency", type=int, default=200, help="Devices polled at once")
+    parser.add_argument("--timeout", type=float, default=2.0, help="Per-request timeout in seconds")
+    parser.add_argument("--retries", type=int, default=1, help="Retries per request")
+    parser.add_argument("--with-metrics", action="store_true", help="Include metric/rate building per poll")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"Unknown modes: {', '.join(unknown)}")
+
+    profile = profile_from_args(args)
+    addresses = [(args.host, args.base_port + i) for i in range(args.agents)]
+    credentials = SNMPCredentialData(version="v2c", community=profile.community)
+    oids = device_oids(profile)
+
+    simulator = None
+    if not args.external:
+        ready = multiprocessing.Event()
+        simulator = multiprocessing.Process(
+            target=_run_simulator, args=(args.agents, args.base_port, args.host, profile, ready), daemon=True
+        )
+        simulator.start()
+        if not ready.wait(timeout=60):
+            simulator.terminate()
+            raise SystemExit("Simulator failed to start")
+
+    try:
+        results = asyncio.run(
+            run_benchmarks(
+                modes,
+                addresses,
+                credentials,
+                oids,
+                rounds=args.rounds,
+                concurrency=args.concurrency,
+                timeout=args.timeout,
+                retries=args.retries,
+                with_metrics=args.with_metrics,
+            )
+        )
+    finally:
+        if simulator is not None:
+            simulator.terminate()
+            simulator.join()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.agents} agents, {len(oids) + 1} OIDs per poll, {args.rounds} rounds")
+    print(f"{'mode':>8} {'devices/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'cpu ms/poll':>12} {'ok':>12}")
+    for result in results:
+        print(
+            f"{result['mode']:>8} {result['devices_per_sec']:>10} {result['p50_ms']:>9} {result['p99_ms']:>9} "
+            f"{result['cpu_ms_per_poll']:>12} {result['succeeded']:>5}/{result['polls']:<6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
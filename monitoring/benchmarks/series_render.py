@@ -0,0 +1,98 @@
+"""
+WARD FLUX - Series Rendering Benchmark
+
+Measures samples/sec of turning metric dictionaries into Prometheus import
+lines, comparing per-sample label formatting (the pre-cache
+write_metrics_bulk path) with the interned SeriesCache rendering into a
+reused byte buffer. The first cached round fills the cache; later rounds are
+the steady state of a poller writing the same series every interval.
+
+Usage:
+    python -m monitoring.benchmarks.series_render --devices 2000 --items 100 --rounds 5
+"""
+
+import argparse
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from monitoring.victoria.client import SeriesCache, format_series
+
+
+def build_samples(devices: int, items: int) -> List[Dict[str, Any]]:
+    """Build one poll round of samples shaped like build_plan_metrics output"""
+    timestamp = datetime.utcnow()
+    samples = []
+    for device in range(devices):
+        ip = f"10.{device // 65536 % 256}.{device // 256 % 256}.{device % 256}"
+        for item in range(items):
+            samples.append({
+                "metric_name": "if_in_octets",
+                "value": device * items + item,
+                "labels": {
+                    "device": f"switch-{device:05d}",
+                    "device_id": f"00000000-0000-0000-0000-{device:012d}",
+                    "ip": ip,
+                    "item": "ifInOctets",
+                    "oid": f"1.3.6.1.2.1.2.2.1.10.{item + 1}",
+                    "index": str(item + 1),
+                },
+                "timestamp": timestamp,
+            })
+    return samples
+
+
+def render_legacy(samples: List[Dict[str, Any]]) -> bytes:
+    lines = []
+    for metric in samples:
+        series = format_series(metric["metric_name"], metric.get("labels"))
+        ts_ms = int((metric.get("timestamp") or datetime.utcnow()).timestamp() * 1000)
+        lines.append(f"{series} {metric['value']} {ts_ms}")
+    return "\n".join(lines).encode()
+
+
+def run_benchmark(devices: int, items: int, rounds: int) -> Dict[str, List[float]]:
+    """
+    Render the same round of samples repeatedly with both approaches
+
+    Returns:
+        Dictionary of mode -> samples/sec per round
+    """
+    samples = build_samples(devices, items)
+    cache = SeriesCache(max_size=len(samples) * 2)
+    buffer = bytearray()
+    results: Dict[str, List[float]] = {"legacy": [], "cached": []}
+
+    for _ in range(rounds):
+        started = time.perf_counter()
+        render_legacy(samples)
+        results["legacy"].append(len(samples) / (time.perf_counter() - started))
+
+        started = time.perf_counter()
+        buffer.clear()
+        cache.render(samples, buffer)
+        results["cached"].append(len(samples) / (time.perf_counter() - started))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VictoriaMetrics series rendering benchmark")
+    parser.add_argument("--devices", type=int, default=2000, help="Devices per round")
+    parser.add_argument("--items", type=int, default=100, help="Series per device")
+    parser.add_argument("--rounds", type=int, default=5, help="Rounds per mode")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.devices, args.items, args.rounds)
+
+    print(f"{args.devices * args.items} series, {args.rounds} rounds")
+    for mode, rates in results.items():
+        print(f"{mode:>7}: " + "  ".join(f"{rate:>10,.0f}" for rate in rates) + "  samples/s")
+
+    steady = results["cached"][1:] or results["cached"]
+    legacy = sum(results["legacy"]) / len(results["legacy"])
+    print(f"steady-state speedup: {sum(steady) / len(steady) / legacy:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+"""
+WARD FLUX - SNMP Agent Simulator
+
+Asyncio SNMPv2c responder that simulates many agents on consecutive localhost
+ports, so SNMPPoller, SNMPScanner and the polling tasks can be load-tested
+without real equipment.
+
+Each agent serves a MIB-II system group, an ifTable/ifXTable with growing
+counters and the vendor OIDs from monitoring/snmp/oids.py, and answers
+GET, GETNEXT and GETBULK after a configurable latency, dropping a
+configurable share of requests.
+
+Usage:
+    python -m monitoring.benchmarks.simulator --agents 1000 --base-port 20000 \\
+        --vendor Cisco --interfaces 24 --latency 0.005 --loss 0.01
+
+Each agent holds one UDP socket; raise `ulimit -n` for very large agent counts.
+"""
+
+import argparse
+import asyncio
+import bisect
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from monitoring.snmp.fastpath import (
+    PDU_GET,
+    PDU_GET_NEXT,
+    TAG_INTEGER,
+    TAG_OCTET_STRING,
+    TAG_OID,
+    TAG_COUNTER32,
+    TAG_COUNTER64,
+    TAG_GAUGE32,
+    TAG_TIMETICKS,
+    TAG_NO_SUCH_OBJECT,
+    TAG_END_OF_MIB_VIEW,
+    SNMPDecodeError,
+    decode_request,
+    encode_oid,
+    encode_response,
+    encode_value,
+)
+from monitoring.snmp.oids import UNIVERSAL_OIDS, VENDOR_DETECTION, get_vendor_oids
+
+logger = logging.getLogger(__name__)
+
+ERROR_STATUS_TOO_BIG = 1
+
+COUNTER32_MODULUS = 2 ** 32
+COUNTER64_MODULUS = 2 ** 64
+
+# A value is either fixed (tag, value) or computed from seconds since agent start
+ValueSource = Union[Tuple[int, object], Callable[[float], Tuple[int, object]]]
+
+SYS_DESCR = {
+    "Cisco": "Cisco IOS Software, C3750E Software, Version 15.2(4)E10 (simulated)",
+    "Fortinet": "FortiGate-100F v7.2.5 (simulated)",
+    "Juniper": "Juniper Networks, Inc. ex4300-48t, JUNOS 21.4R3 (simulated)",
+    "HP": "HP J9850A Switch 5406Rzl2, revision KB.16.10 (simulated)",
+    "MikroTik": "RouterOS CCR1036-8G-2S+ (simulated)",
+    "Linux/Net-SNMP": "Linux sim-host 5.15.0-91-generic #101-Ubuntu SMP x86_64 (simulated)",
+    "Microsoft Windows": "Hardware: Intel64 Software: Windows Version 10.0 (Build 20348) (simulated)",
+}
+
+# oids.py value_type -> value tag
+VALUE_TAGS = {
+    "integer": TAG_INTEGER,
+    "gauge": TAG_GAUGE32,
+    "counter32": TAG_COUNTER32,
+    "counter64": TAG_COUNTER64,
+    "string": TAG_OCTET_STRING,
+}
+
+
+@dataclass
+class AgentProfile:
+    """Behaviour shared by a group of simulated agents"""
+
+    vendor: str = "Cisco"
+    community: str = "public"
+    interfaces: int = 24
+    latency: float = 0.0  # seconds, mean response delay
+    jitter: float = 0.0  # seconds, uniform +/- around latency
+    loss: float = 0.0  # probability of silently dropping a request
+    octets_per_sec: int = 1_250_000  # ifInOctets growth of interface 1 (others scale up to 5x)
+    max_message_size: int = 1472  # larger GET responses get tooBig, GETBULK is truncated
+
+
+def _counter(start: int, per_sec: float, tag: int, modulus: int) -> Callable[[float], Tuple[int, object]]:
+    return lambda elapsed: (tag, int(start + per_sec * elapsed) % modulus)
+
+
+def _gauge_walk(low: int, high: int, seed: int) -> Callable[[float], Tuple[int, object]]:
+    rng = random.Random(seed)
+    state = {"value": rng.randint(low, high), "at": 0.0}
+
+    def value(elapsed: float) -> Tuple[int, object]:
+        # Move at most once per second so repeated reads within a poll agree
+        if elapsed - state["at"] >= 1.0:
+            state["value"] = min(high, max(low, state["value"] + rng.randint(-5, 5)))
+            state["at"] = elapsed
+        return TAG_GAUGE32, state["value"]
+
+    return value
+
+
+def build_oid_tree(profile: AgentProfile, index: int) -> Dict[Tuple[int, ...], ValueSource]:
+    """
+    Build the OID -> value map of one simulated agent
+
+    Args:
+        profile: Agent profile
+        index: Agent number (makes names, counters and gauges differ per agent)
+
+    Returns:
+        Dictionary of OID tuple -> fixed (tag, value) or callable(elapsed)
+    """
+    def oid(dotted: str) -> Tuple[int, ...]:
+        return tuple(int(part) for part in dotted.split("."))
+
+    vendor_prefix = next((prefix for prefix, name in VENDOR_DETECTION.items() if name == profile.vendor), "1.3.6.1.4.1.8072")
+    uptime_start = random.Random(index).randint(0, 10_000_000)
+
+    tree: Dict[Tuple[int, ...], ValueSource] = {
+        oid("1.3.6.1.2.1.1.1.0"): (TAG_OCTET_STRING, SYS_DESCR.get(profile.vendor, f"{profile.vendor} (simulated)")),
+        oid("1.3.6.1.2.1.1.2.0"): (TAG_OID, f"{vendor_prefix}.1.{index % 1000 + 1}"),
+        oid("1.3.6.1.2.1.1.3.0"): _counter(uptime_start, 100, TAG_TIMETICKS, COUNTER32_MODULUS),
+        oid("1.3.6.1.2.1.1.4.0"): (TAG_OCTET_STRING, "noc@example.com"),
+        oid("1.3.6.1.2.1.1.5.0"): (TAG_OCTET_STRING, f"sim-{profile.vendor.split('/')[0].lower()}-{index}"),
+        oid("1.3.6.1.2.1.1.6.0"): (TAG_OCTET_STRING, "Simulator Rack 1"),
+        oid("1.3.6.1.2.1.2.1.0"): (TAG_INTEGER, profile.interfaces),
+    }
+
+    for if_index in range(1, profile.interfaces + 1):
+        rate = profile.octets_per_sec * (1 + (if_index - 1) % 5)
+        start = random.Random(index * 10000 + if_index).randint(0, COUNTER32_MODULUS - 1)
+        columns = {
+            1: (TAG_INTEGER, if_index),
+            2: (TAG_OCTET_STRING, f"GigabitEthernet0/{if_index}"),
+            3: (TAG_INTEGER, 6),  # ethernetCsmacd
+            4: (TAG_INTEGER, 1500),
+            5: (TAG_GAUGE32, 1_000_000_000),
+            7: (TAG_INTEGER, 1),
+            8: (TAG_INTEGER, 1 if if_index % 7 else 2),
+            10: _counter(start, rate, TAG_COUNTER32, COUNTER32_MODULUS),
+            11: _counter(start // 1000, rate / 1000, TAG_COUNTER32, COUNTER32_MODULUS),
+            14: _counter(0, 0.01 * if_index, TAG_COUNTER32, COUNTER32_MODULUS),
+            16: _counter(start // 2, rate / 2, TAG_COUNTER32, COUNTER32_MODULUS),
+            17: _counter(start // 2000, rate / 2000, TAG_COUNTER32, COUNTER32_MODULUS),
+            20: _counter(0, 0.005 * if_index, TAG_COUNTER32, COUNTER32_MODULUS),
+        }
+        for column, value in columns.items():
+            tree[(1, 3, 6, 1, 2, 1, 2, 2, 1, column, if_index)] = value
+
+        # ifXTable: ifName, ifHCInOctets, ifHCOutOctets, ifHighSpeed
+        tree[(1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 1, if_index)] = (TAG_OCTET_STRING, f"Gi0/{if_index}")
+        tree[(1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 6, if_index)] = _counter(start, rate, TAG_COUNTER64, COUNTER64_MODULUS)
+        tree[(1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 10, if_index)] = _counter(start // 2, rate / 2, TAG_COUNTER64, COUNTER64_MODULUS)
+        tree[(1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 15, if_index)] = (TAG_GAUGE32, 1000)
+
+    vendor_oids = get_vendor_oids(profile.vendor)
+    for seed, (name, definition) in enumerate(vendor_oids.items()):
+        if name in UNIVERSAL_OIDS:
+            continue
+
+        key = oid(definition.oid)
+        if definition.is_table or key[-1] != 0:
+            key = key + (1,)
+
+        tag = VALUE_TAGS.get(definition.value_type, TAG_OCTET_STRING)
+        if tag == TAG_GAUGE32:
+            high = 100 if definition.units == "%" else 1_000_000
+            tree[key] = _gauge_walk(0, high, index * 1000 + seed)
+        elif tag in (TAG_COUNTER32, TAG_COUNTER64):
+            modulus = COUNTER32_MODULUS if tag == TAG_COUNTER32 else COUNTER64_MODULUS
+            tree[key] = _counter(0, 100 + seed, tag, modulus)
+        elif tag == TAG_INTEGER:
+            tree[key] = (TAG_INTEGER, 1)
+        else:
+            tree[key] = (TAG_OCTET_STRING, f"{name} (simulated)")
+
+    return tree
+
+
+class SimulatedAgent(asyncio.DatagramProtocol):
+    """
+    One simulated SNMPv2c agent bound to its own UDP port
+    """
+
+    def __init__(self, profile: AgentProfile, index: int, stats: Dict[str, int]):
+        self.profile = profile
+        self.index = index
+        self.stats = stats
+        self.started = time.monotonic()
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self._rng = random.Random(index)
+
+        tree = build_oid_tree(profile, index)
+        self._oids: List[Tuple[int, ...]] = sorted(tree)
+        self._values: List[ValueSource] = [tree[key] for key in self._oids]
+        self._encoded_oids: List[bytes] = [encode_oid(".".join(map(str, key))) for key in self._oids]
+        self._positions: Dict[Tuple[int, ...], int] = {key: i for i, key in enumerate(self._oids)}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        self.stats["requests"] += 1
+
+        try:
+            request = decode_request(data)
+        except SNMPDecodeError:
+            self.stats["malformed"] += 1
+            return
+
+        if request.community != self.profile.community or self._rng.random() < self.profile.loss:
+            self.stats["dropped"] += 1
+            return
+
+        response = self._respond(request)
+        delay = self.profile.latency
+        if self.profile.jitter:
+            delay = max(0.0, delay + self._rng.uniform(-self.profile.jitter, self.profile.jitter))
+
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._send, response, addr)
+        else:
+            self._send(response, addr)
+
+    def _send(self, response: bytes, addr):
+        if self.transport is not None and not self.transport.is_closing():
+            self.transport.sendto(response, addr)
+            self.stats["responses"] += 1
+
+    def _value(self, position: int, elapsed: float) -> bytes:
+        source = self._values[position]
+        tag, value = source(elapsed) if callable(source) else source
+        return encode_value(tag, value)
+
+    def _next_position(self, oid: Tuple[int, ...]) -> int:
+        return bisect.bisect_right(self._oids, oid)
+
+    def _respond(self, request) -> bytes:
+        elapsed = time.monotonic() - self.started
+        var_binds: List[Tuple[bytes, bytes]] = []
+
+        if request.pdu_type == PDU_GET:
+            for oid in request.oids:
+                position = self._positions.get(oid)
+                if position is None:
+                    var_binds.append((encode_oid(".".join(map(str, oid))), encode_value(TAG_NO_SUCH_OBJECT, None)))
+                else:
+                    var_binds.append((self._encoded_oids[position], self._value(position, elapsed)))
+
+            response = encode_response(request.request_id, request.community, var_binds)
+            if len(response) > self.profile.max_message_size:
+                self.stats["too_big"] += 1
+                null = [(encode_oid(".".join(map(str, oid))), bytes((0x05, 0))) for oid in request.oids]
+                return encode_response(request.request_id, request.community, null, ERROR_STATUS_TOO_BIG, 0)
+            return response
+
+        if request.pdu_type == PDU_GET_NEXT:
+            repeaters, non_repeaters, repetitions = [], request.oids, 0
+        else:
+            non_repeaters = request.oids[:request.non_repeaters]
+            repeaters = request.oids[request.non_repeaters:]
+            repetitions = max(0, request.max_repetitions)
+
+        for oid in non_repeaters:
+            var_binds.append(self._next_var_bind(oid, elapsed))
+
+        cursors = list(repeaters)
+        for _ in range(repetitions if repeaters else 0):
+            row = []
+            for column, oid in enumerate(cursors):
+                var_bind, cursors[column] = self._next_var_bind(oid, elapsed, with_oid=True)
+                row.append(var_bind)
+            var_binds.extend(row)
+
+            if all(position >= len(self._oids) for position in map(self._next_position, cursors)):
+                break
+
+        # GETBULK: drop trailing varbinds until the response fits (RFC 3416 4.2.3)
+        response = encode_response(request.request_id, request.community, var_binds)
+        while len(response) > self.profile.max_message_size and len(var_binds) > 1:
+            self.stats["truncated"] += 1
+            var_binds = var_binds[:max(1, len(var_binds) * 3 // 4)]
+            response = encode_response(request.request_id, request.community, var_binds)
+
+        return response
+
+    def _next_var_bind(self, oid: Tuple[int, ...], elapsed: float, with_oid: bool = False):
+        position = self._next_position(oid)
+        if position >= len(self._oids):
+            var_bind = (encode_oid(".".join(map(str, oid))), encode_value(TAG_END_OF_MIB_VIEW, None))
+            next_oid = oid
+        else:
+            var_bind = (self._encoded_oids[position], self._value(position, elapsed))
+            next_oid = self._oids[position]
+
+        return (var_bind, next_oid) if with_oid else var_bind
+
+
+class AgentSimulator:
+    """
+    Runs a fleet of simulated agents on consecutive ports
+
+    Usage:
+        simulator = AgentSimulator(count=500, base_port=20000, profile=AgentProfile(latency=0.002))
+        await simulator.start()
+        ...  # poll 127.0.0.1:20000 .. 127.0.0.1:20499
+        await simulator.stop()
+    """
+
+    def __init__(
+        self,
+        count: int,
+        base_port: int = 20000,
+        host: str = "127.0.0.1",
+        profile: Optional[AgentProfile] = None,
+    ):
+        self.count = count
+        self.base_port = base_port
+        self.host = host
+        self.profile = profile or AgentProfile()
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "responses": 0,
+            "dropped": 0,
+            "malformed": 0,
+            "too_big": 0,
+            "truncated": 0,
+        }
+        self._transports: List[asyncio.DatagramTransport] = []
+
+    @property
+    def addresses(self) -> List[Tuple[str, int]]:
+        return [(self.host, self.base_port + i) for i in range(self.count)]
+
+    async def start(self):
+        """Bind all agents"""
+        loop = asyncio.get_running_loop()
+        for i in range(self.count):
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda i=i: SimulatedAgent(self.profile, i, self.stats),
+                local_addr=(self.host, self.base_port + i),
+            )
+            self._transports.append(transport)
+
+        logger.info(
+            f"Simulating {self.count} {self.profile.vendor} agents on "
+            f"{self.host}:{self.base_port}-{self.base_port + self.count - 1}"
+        )
+
+    async def stop(self):
+        """Close all agents"""
+        for transport in self._transports:
+            transport.close()
+        self._transports.clear()
+
+
+async def _serve(simulator: AgentSimulator, report_interval: float):
+    await simulator.start()
+    try:
+        while True:
+            await asyncio.sleep(report_interval)
+            logger.info(f"Simulator stats: {simulator.stats}")
+    finally:
+        await simulator.stop()
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    """Add the AgentProfile options to an argument parser"""
+    parser.add_argument("--vendor", default="Cisco", help="Vendor OID set from monitoring/snmp/oids.py")
+    parser.add_argument("--community", default="public", help="SNMPv2c community the agents accept")
+    parser.add_argument("--interfaces", type=int, default=24, help="ifTable rows per agent")
+    parser.add_argument("--latency", type=float, default=0.0, help="Response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- latency jitter in seconds")
+    parser.add_argument("--loss", type=float, default=0.0, help="Share of requests dropped (0-1)")
+    parser.add_argument("--octets-per-sec", type=int, default=1_250_000, help="ifInOctets growth of interface 1")
+    parser.add_argument("--max-message-size", type=int, default=1472, help="Largest response in bytes")
+
+
+def profile_from_args(args: argparse.Namespace) -> AgentProfile:
+    """Build an AgentProfile from parsed add_profile_arguments options"""
+    return AgentProfile(
+        vendor=args.vendor,
+        community=args.community,
+        interfaces=args.interfaces,
+        latency=args.latency,
+        jitter=args.jitter,
+        loss=args.loss,
+        octets_per_sec=args.octets_per_sec,
+        max_message_size=args.max_message_size,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate SNMPv2c agents on localhost ports")
+    parser.add_argument("--agents", type=int, default=100, help="Number of agents")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind")
+    parser.add_argument("--base-port", type=int, default=20000, help="Port of the first agent")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="Seconds between stats logs")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    simulator = AgentSimulator(args.agents, args.base_port, args.host, profile_from_args(args))
+    try:
+        asyncio.run(_serve(simulator, args.report_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+WARD FLUX - SNMPPoller Throughput Benchmark
+
+Compares SNMP GET throughput of the legacy per-call setup (new SnmpEngine,
+transport target and auth data for every request) against the cached
+SNMPPoller (one engine per event loop, LRU transport/auth cache).
+
+Usage:
+    python -m monitoring.benchmarks.snmp_poller --host 127.0.0.1 --community public \\
+        --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict
+
+from pysnmp.hlapi.asyncio import SnmpEngine, UdpTransportTarget, ContextData, ObjectType, ObjectIdentity, getCmd
+
+from monitoring.snmp.poller import SNMPPoller, SNMPCredentialData
+
+logger = logging.getLogger(__name__)
+
+SYS_UPTIME_OID = "1.3.6.1.2.1.1.3.0"
+
+
+async def _legacy_get(poller: SNMPPoller, ip: str, port: int, oid: str, credentials: SNMPCredentialData) -> bool:
+    """Reproduce the pre-cache GET path: build engine, target and auth data per call"""
+    auth_data = poller._build_auth_data(credentials)
+    target = UdpTransportTarget((ip, port), timeout=poller.timeout, retries=poller.retries)
+
+    error_indication, error_status, _, _ = await getCmd(
+        SnmpEngine(), auth_data, target, ContextData(), ObjectType(ObjectIdentity(oid))
+    )
+    return not error_indication and not error_status
+
+
+async def _cached_get(poller: SNMPPoller, ip: str, port: int, oid: str, credentials: SNMPCredentialData) -> bool:
+    """GET through the cached SNMPPoller path"""
+    result = await poller.get(ip, oid, credentials, port)
+    return result.success
+
+
+async def _run(
+    get_func: Callable[..., Awaitable[bool]],
+    poller: SNMPPoller,
+    ip: str,
+    port: int,
+    oid: str,
+    credentials: SNMPCredentialData,
+    requests: int,
+    concurrency: int,
+) -> Dict[str, float]:
+    """Issue `requests` GETs with bounded concurrency and measure throughput"""
+    semaphore = asyncio.Semaphore(concurrency)
+    ok = 0
+
+    async def one():
+        nonlocal ok
+        async with semaphore:
+            if await get_func(poller, ip, port, oid, credentials):
+                ok += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "succeeded": ok,
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(requests / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+async def run_benchmark(
+    ip: str, port: int, community: str, oid: str, requests: int, concurrency: int
+) -> Dict[str, Dict[str, float]]:
+    """
+    Run the legacy and cached benchmarks back to back
+
+    Returns:
+        Dictionary with "legacy" and "cached" result dictionaries
+    """
+    credentials = SNMPCredentialData(version="v2c", community=community)
+
+    legacy_poller = SNMPPoller(target_cache_size=0)
+    legacy = await _run(_legacy_get, legacy_poller, ip, port, oid, credentials, requests, concurrency)
+
+    cached_poller = SNMPPoller()
+    cached = await _run(_cached_get, cached_poller, ip, port, oid, credentials, requests, concurrency)
+
+    return {"legacy": legacy, "cached": cached}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SNMPPoller GET throughput benchmark")
+    parser.add_argument("--host", default="127.0.0.1", help="SNMP agent address")
+    parser.add_argument("--port", type=int, default=161, help="SNMP agent port")
+    parser.add_argument("--community", default="public", help="SNMPv2c community")
+    parser.add_argument("--oid", default=SYS_UPTIME_OID, help="OID to GET")
+    parser.add_argument("--requests", type=int, default=1000, help="Total GET requests per mode")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent in-flight requests")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    results = asyncio.run(
+        run_benchmark(args.host, args.port, args.community, args.oid, args.requests, args.concurrency)
+    )
+
+    for mode, stats in results.items():
+        print(
+            f"{mode:>8}: {stats['requests_per_sec']:>8} req/s "
+            f"({stats['succeeded']}/{stats['requests']} ok in {stats['seconds']}s)"
+        )
+
+    if results["legacy"]["requests_per_sec"]:
+        speedup = results["cached"]["requests_per_sec"] / results["legacy"]["requests_per_sec"]
+        print(f" speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -55,10 +55,10 @@ app.conf.beat_schedule = {
         "task": "monitoring.tasks.ping_all_devices",
         "schedule": 30.0,  # Every 30 seconds
     },
-    # Check alert rules every 60 seconds
+    # Alert evaluator tick; each rule is evaluated at its own evaluation_interval
     "check-alert-rules": {
         "task": "monitoring.tasks.check_alert_rules",
-        "schedule": 60.0,  # Every minute
+        "schedule": 15.0,  # Every 15 seconds
     },
     # Cleanup old data every day at 2 AM
     "cleanup-old-data": {
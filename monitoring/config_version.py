@@ -0,0 +1,64 @@
+"""
+WARD FLUX - Monitoring Configuration Version
+
+A Redis counter bumped whenever monitoring items, templates, credentials or
+monitored devices change. Long-lived consumers (compiled poll plans, credential
+caches) compare it to the version they were built from and rebuild only when
+it moved, instead of re-reading the database on every cycle.
+"""
+
+import os
+import logging
+from typing import Optional
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+CONFIG_VERSION_KEY = "ward:monitoring:config_version"
+
+_redis_client: Optional[redis.Redis] = None
+
+
+def _get_redis() -> redis.Redis:
+    global _redis_client
+
+    if _redis_client is None:
+        _redis_client = redis.from_url(REDIS_URL, decode_responses=True, socket_timeout=2)
+
+    return _redis_client
+
+
+def bump_config_version(reason: str = "") -> Optional[int]:
+    """
+    Signal that the monitoring configuration changed
+
+    Args:
+        reason: Short description for the log
+
+    Returns:
+        New version, or None if Redis is unavailable (consumers then fall back
+        to periodic rebuilds)
+    """
+    try:
+        version = int(_get_redis().incr(CONFIG_VERSION_KEY))
+        logger.debug(f"Monitoring config version -> {version} ({reason or 'unspecified'})")
+        return version
+    except Exception as e:
+        logger.warning(f"Failed to bump monitoring config version ({reason}): {e}")
+        return None
+
+
+def get_config_version() -> Optional[int]:
+    """
+    Get the current monitoring configuration version
+
+    Returns:
+        Version number (0 if never bumped), or None if Redis is unavailable
+    """
+    try:
+        return int(_get_redis().get(CONFIG_VERSION_KEY) or 0)
+    except Exception as e:
+        logger.debug(f"Failed to read monitoring config version: {e}")
+        return None
@@ -69,7 +69,10 @@ class SNMPScanner:
         """
         self.timeout = timeout
         self.retries = retries
-        self.poller = SNMPPoller()
+        self.poller = SNMPPoller(circuit_breaker=False)
+        self.poller.timeout = timeout
+        self.poller.retries = retries
+        self.poller.health.max_timeout = timeout
 
     async def scan_host_v2c(
         self,
@@ -96,17 +99,14 @@ class SNMPScanner:
                 creds = SNMPCredentialData(
                     version='v2c',
                     community=community,
-                    port=port,
-                    timeout=self.timeout,
-                    retries=self.retries
                 )
 
                 # Try to get sysDescr
-                result = await self.poller.get(ip, SNMP_OIDS['sysDescr'], creds)
+                result = await self.poller.get(ip, SNMP_OIDS['sysDescr'], creds, port)
 
                 if result.success and result.value:
                     # Community works! Get full system info
-                    sys_info = await self._get_system_info(ip, creds)
+                    sys_info = await self._get_system_info(ip, creds, port)
 
                     # Detect vendor and device type
                     vendor, device_type, model, os_version = self._parse_sys_descr(
@@ -175,17 +175,14 @@ class SNMPScanner:
                     auth_key=cred_dict.get('auth_key'),
                     priv_protocol=cred_dict.get('priv_protocol'),
                     priv_key=cred_dict.get('priv_key'),
-                    port=port,
-                    timeout=self.timeout,
-                    retries=self.retries
                 )
 
                 # Try to get sysDescr
-                result = await self.poller.get(ip, SNMP_OIDS['sysDescr'], creds)
+                result = await self.poller.get(ip, SNMP_OIDS['sysDescr'], creds, port)
 
                 if result.success and result.value:
                     # Credentials work! Get full system info
-                    sys_info = await self._get_system_info(ip, creds)
+                    sys_info = await self._get_system_info(ip, creds, port)
 
                     # Detect vendor and device type
                     vendor, device_type, model, os_version = self._parse_sys_descr(
@@ -227,7 +224,8 @@ class SNMPScanner:
     async def _get_system_info(
         self,
         ip: str,
-        creds: SNMPCredentialData
+        creds: SNMPCredentialData,
+        port: int = 161
     ) -> Dict[str, str]:
         """
         Get complete system information via SNMP
@@ -235,6 +233,7 @@ class SNMPScanner:
         Args:
             ip: Target IP
             creds: Working SNMP credentials
+            port: SNMP port
 
         Returns:
             Dictionary of system information
@@ -243,7 +242,7 @@ class SNMPScanner:
 
         # Get all system OIDs
         tasks = [
-            self.poller.get(ip, oid, creds)
+            self.poller.get(ip, oid, creds, port)
             for oid in SNMP_OIDS.values()
         ]
 
@@ -0,0 +1,202 @@
+"""
+WARD FLUX - Async ICMP Engine
+
+Pings many targets concurrently from one event loop with icmplib's
+async_multiping, instead of one blocking icmplib.ping per Celery task.
+Used by the ping_devices_batch / ping_device tasks; results become
+ping_rtt_ms / ping_packet_loss / ping_is_alive samples.
+
+With the defaults (3 echo requests 200ms apart, 1.5s reply timeout, 1000
+targets in flight) a wave takes ~0.5s for live hosts and ~2s for dead ones,
+so a 10k-device sweep finishes in well under the 30s beat period.
+"""
+
+import os
+import asyncio
+import logging
+import ipaddress
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from icmplib import async_multiping, async_ping, async_resolve
+
+logger = logging.getLogger(__name__)
+
+ICMP_COUNT = int(os.getenv("ICMP_COUNT", "3"))  # Echo requests per target
+ICMP_INTERVAL = float(os.getenv("ICMP_INTERVAL", "0.2"))  # seconds between requests
+ICMP_TIMEOUT = float(os.getenv("ICMP_TIMEOUT", "1.5"))  # seconds to wait for a reply
+ICMP_CONCURRENCY = int(os.getenv("ICMP_CONCURRENCY", "1000"))  # Targets pinged at once
+ICMP_PRIVILEGED = os.getenv("ICMP_PRIVILEGED", "false").lower() == "true"  # Raw sockets (needs root/CAP_NET_RAW)
+
+
+def build_ping_metrics(device_id: str, device_ip: str, host, timestamp: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Build VictoriaMetrics samples from an icmplib Host result
+
+    Args:
+        device_id: Device UUID
+        device_ip: Device IP address
+        host: icmplib Host
+        timestamp: Sample time (defaults to now at write time)
+
+    Returns:
+        List of metric dictionaries for write_metrics_bulk
+    """
+    labels = {"device_id": device_id, "ip": device_ip}
+    return [
+        {"metric_name": "ping_rtt_ms", "value": host.avg_rtt, "labels": labels, "timestamp": timestamp},
+        {"metric_name": "ping_packet_loss", "value": host.packet_loss, "labels": labels, "timestamp": timestamp},
+        {"metric_name": "ping_is_alive", "value": 1 if host.is_alive else 0, "labels": labels, "timestamp": timestamp},
+    ]
+
+
+class ICMPEngine:
+    """
+    Concurrent multi-target pinger
+
+    Each distinct address is pinged once per call even if several devices
+    share it. Hostnames are resolved first; names that do not resolve are skipped.
+    """
+
+    def __init__(
+        self,
+        count: int = ICMP_COUNT,
+        interval: float = ICMP_INTERVAL,
+        timeout: float = ICMP_TIMEOUT,
+        concurrency: int = ICMP_CONCURRENCY,
+        privileged: bool = ICMP_PRIVILEGED,
+    ):
+        """
+        Initialize engine
+
+        Args:
+            count: Echo requests per target
+            interval: Seconds between requests to one target
+            timeout: Seconds to wait for a reply
+            concurrency: Maximum targets pinged at once
+            privileged: Use raw sockets instead of unprivileged datagram sockets
+        """
+        self.count = count
+        self.interval = interval
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.privileged = privileged
+
+    async def ping_addresses(self, addresses: Sequence[str]) -> Dict[str, Any]:
+        """
+        Ping addresses concurrently
+
+        Args:
+            addresses: IP addresses or hostnames (duplicates are pinged once)
+
+        Returns:
+            Dictionary of address (as given) -> icmplib Host
+        """
+        targets = await self._resolve(list(dict.fromkeys(addresses)))
+        if not targets:
+            return {}
+
+        unique = list(dict.fromkeys(targets.values()))
+        try:
+            hosts = await async_multiping(
+                unique,
+                count=self.count,
+                interval=self.interval,
+                timeout=self.timeout,
+                concurrent_tasks=self.concurrency,
+                privileged=self.privileged,
+            )
+            by_ip = {host.address: host for host in hosts}
+        except Exception as e:
+            # One failing target aborts async_multiping; retry individually so the rest still report
+            logger.warning(f"Multi-ping of {len(unique)} targets failed ({e}), pinging individually")
+            by_ip = await self._ping_individually(unique)
+
+        return {address: by_ip[ip] for address, ip in targets.items() if ip in by_ip}
+
+    async def _resolve(self, addresses: List[str]) -> Dict[str, str]:
+        """
+        Map each address to the IP to ping, resolving hostnames concurrently
+
+        Returns:
+            Dictionary of address -> IP address (unresolvable names are left out)
+        """
+        targets = {}
+        names = []
+        for address in addresses:
+            try:
+                ipaddress.ip_address(address)
+                targets[address] = address
+            except ValueError:
+                names.append(address)
+
+        if names:
+            resolved = await asyncio.gather(*(async_resolve(name) for name in names), return_exceptions=True)
+            for name, result in zip(names, resolved):
+                if isinstance(result, Exception) or not result:
+                    logger.warning(f"Skipping ping of {name!r}: cannot resolve ({result})")
+                else:
+                    targets[name] = result[0]
+
+        return targets
+
+    async def _ping_individually(self, addresses: List[str]) -> Dict[str, Any]:
+        results = {}
+        for start in range(0, len(addresses), self.concurrency):
+            wave = addresses[start:start + self.concurrency]
+            hosts = await asyncio.gather(
+                *(
+                    async_ping(address, count=self.count, interval=self.interval, timeout=self.timeout, privileged=self.privileged)
+                    for address in wave
+                ),
+                return_exceptions=True,
+            )
+            for address, host in zip(wave, hosts):
+                if isinstance(host, Exception):
+                    logger.error(f"Error pinging {address}: {host}")
+                else:
+                    results[address] = host
+        return results
+
+    async def ping_devices(self, devices: Sequence[Tuple[str, str]]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        Ping devices and build their samples
+
+        Args:
+            devices: (device_id, ip) pairs
+
+        Returns:
+            Tuple of (metric dictionaries, summary counts)
+        """
+        timestamp = datetime.utcnow()
+        hosts = await self.ping_addresses([ip for _, ip in devices])
+
+        metrics = []
+        alive = 0
+        for device_id, ip in devices:
+            host = hosts.get(ip)
+            if host is None:
+                continue
+            metrics.extend(build_ping_metrics(device_id, ip, host, timestamp))
+            alive += host.is_alive
+
+        return metrics, {"devices": len(devices), "pinged": len(hosts), "alive": alive}
+
+
+# Singleton instance
+_icmp_engine: Optional[ICMPEngine] = None
+
+
+def get_icmp_engine() -> ICMPEngine:
+    """
+    Get or create ICMPEngine singleton
+
+    Returns:
+        ICMPEngine instance
+    """
+    global _icmp_engine
+
+    if _icmp_engine is None:
+        _icmp_engine = ICMPEngine()
+
+    return _icmp_engine
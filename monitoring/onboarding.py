@@ -0,0 +1,215 @@
+"""
+WARD FLUX - Bulk Device Onboarding
+
+Detects vendor/type of many standalone devices concurrently (bounded by a
+semaphore and the poller's rate limiter) and assigns default monitoring
+templates to them, writing all MonitoringItem rows in one bulk insert.
+
+Used by the bulk_detect_devices Celery task; the per-device endpoints in
+routers/snmp_credentials.py remain for single devices.
+"""
+
+import os
+import uuid
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from monitoring.config_version import bump_config_version
+from monitoring.models import MonitoringItem, MonitoringTemplate, StandaloneDevice
+from monitoring.snmp.credential_service import get_credential_service
+from monitoring.snmp.poller import SNMPPoller, SNMPCredentialData, detect_vendor
+
+logger = logging.getLogger(__name__)
+
+BULK_DETECT_CONCURRENCY = int(os.getenv("BULK_DETECT_CONCURRENCY", "100"))  # Devices detected at once
+PROGRESS_INTERVAL = 1.0  # Minimum seconds between progress reports
+
+
+@dataclass
+class DetectionOutcome:
+    """Detection result of one device"""
+
+    device_id: str
+    ip: str
+    success: bool
+    vendor_candidates: List[str] = field(default_factory=list)  # sysObjectID vendor first, then sysDescr vendor
+    device_type: Optional[str] = None
+    sys_object_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+async def detect_devices(
+    poller: SNMPPoller,
+    targets: Sequence[Tuple[str, str, SNMPCredentialData]],
+    concurrency: int = BULK_DETECT_CONCURRENCY,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> List[DetectionOutcome]:
+    """
+    Run SNMPPoller.detect_device over many devices with bounded concurrency
+
+    Args:
+        poller: SNMP poller
+        targets: (device_id, ip, credentials) tuples
+        concurrency: Maximum devices detected at once
+        on_progress: Called with (done, total) at most every PROGRESS_INTERVAL seconds and at the end
+
+    Returns:
+        One DetectionOutcome per target, in target order
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    total = len(targets)
+    done = 0
+    last_report = 0.0
+
+    async def detect(device_id: str, ip: str, credentials: SNMPCredentialData) -> DetectionOutcome:
+        nonlocal done, last_report
+
+        async with semaphore:
+            result = await poller.detect_device(ip, credentials)
+
+        sys_object_id = result.get("sys_object_id")
+        candidates = []
+        if result.get("vendor"):
+            candidates.append(result["vendor"])
+        descr_vendor = detect_vendor(result.get("sys_descr") or "")
+        if descr_vendor and descr_vendor not in candidates:
+            candidates.append(descr_vendor)
+
+        success = "error" not in result and (sys_object_id is not None or result.get("sys_descr") is not None)
+        outcome = DetectionOutcome(
+            device_id=device_id,
+            ip=ip,
+            success=success,
+            vendor_candidates=candidates,
+            device_type=result.get("device_type") if success else None,
+            sys_object_id=str(sys_object_id) if sys_object_id else None,
+            error=result.get("error") or (None if success else "No SNMP response"),
+        )
+
+        done += 1
+        now = time.monotonic()
+        if on_progress and (now - last_report >= PROGRESS_INTERVAL or done == total):
+            last_report = now
+            on_progress(done, total)
+
+        return outcome
+
+    return await asyncio.gather(*(detect(device_id, ip, creds) for device_id, ip, creds in targets))
+
+
+def load_detection_targets(db, device_ids: Optional[Sequence[str]] = None) -> Tuple[List[Tuple[str, str, SNMPCredentialData]], List[Dict[str, str]]]:
+    """
+    Load devices and their credentials for detection
+
+    Args:
+        db: Database session
+        device_ids: Device UUIDs, or None for every enabled standalone device
+
+    Returns:
+        Tuple of (detection targets, skipped devices with reasons)
+    """
+    query = db.query(StandaloneDevice)
+    if device_ids is None:
+        query = query.filter(StandaloneDevice.enabled == True)
+    else:
+        query = query.filter(StandaloneDevice.id.in_([uuid.UUID(str(device_id)) for device_id in device_ids]))
+    devices = query.all()
+
+    credentials = get_credential_service().get_many([device.id for device in devices], db)
+
+    targets = []
+    skipped = []
+    for device in devices:
+        creds = credentials.get(str(device.id))
+        if not device.ip:
+            skipped.append({"device_id": str(device.id), "error": "Device has no IP address"})
+        elif not creds:
+            skipped.append({"device_id": str(device.id), "error": "No SNMP credentials"})
+        else:
+            targets.append((str(device.id), device.ip, creds))
+
+    return targets, skipped
+
+
+def apply_detection_results(db, outcomes: Sequence[DetectionOutcome], assign_templates: bool = True) -> Dict[str, Any]:
+    """
+    Store detected vendors/types and create template items, in one transaction
+
+    A device gets the default template of its first vendor candidate that has
+    one. Devices that already have monitoring items keep them.
+
+    Args:
+        db: Database session
+        outcomes: Detection outcomes
+        assign_templates: Also create MonitoringItem rows from default templates
+
+    Returns:
+        Summary with counts and per-device template assignments
+    """
+    now = datetime.utcnow()
+    detected = [outcome for outcome in outcomes if outcome.success]
+
+    templates: Dict[str, MonitoringTemplate] = {}
+    devices_with_items = set()
+    if assign_templates and detected:
+        for template in db.query(MonitoringTemplate).filter_by(is_default=True).all():
+            templates.setdefault(template.vendor, template)
+        rows = db.query(MonitoringItem.device_id).filter(
+            MonitoringItem.device_id.in_([uuid.UUID(outcome.device_id) for outcome in detected])
+        ).distinct()
+        devices_with_items = {str(row.device_id) for row in rows}
+
+    device_updates = []
+    item_rows = []
+    assignments = []
+
+    for outcome in detected:
+        template = next((templates[vendor] for vendor in outcome.vendor_candidates if vendor in templates), None)
+        vendor = template.vendor if template else (outcome.vendor_candidates[0] if outcome.vendor_candidates else None)
+
+        update = {"id": uuid.UUID(outcome.device_id), "last_seen": now, "updated_at": now}
+        if vendor:
+            update["vendor"] = vendor
+        if outcome.device_type and outcome.device_type != "generic":
+            update["device_type"] = outcome.device_type
+        device_updates.append(update)
+
+        if template is None or outcome.device_id in devices_with_items:
+            continue
+
+        for item_def in template.items:
+            item_rows.append({
+                "id": uuid.uuid4(),
+                "device_id": uuid.UUID(outcome.device_id),
+                "template_id": template.id,
+                "oid_name": item_def["oid_name"],
+                "oid": item_def["oid"],
+                "interval": item_def.get("interval", 60),
+                "value_type": item_def.get("value_type", "integer"),
+                "units": item_def.get("units", ""),
+                "enabled": True,
+                "created_at": now,
+                "updated_at": now,
+            })
+        assignments.append({"device_id": outcome.device_id, "template_name": template.name, "items": len(template.items)})
+
+    if device_updates:
+        db.bulk_update_mappings(StandaloneDevice, device_updates)
+    if item_rows:
+        db.bulk_insert_mappings(MonitoringItem, item_rows)
+    db.commit()
+
+    if item_rows:
+        bump_config_version("bulk template assignment")
+
+    return {
+        "devices_detected": len(detected),
+        "devices_failed": len(outcomes) - len(detected),
+        "devices_assigned": len(assignments),
+        "items_created": len(item_rows),
+        "assignments": assignments,
+    }
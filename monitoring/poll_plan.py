@@ -0,0 +1,432 @@
+"""
+WARD FLUX - Compiled Poll Plans
+
+Turns each device's monitoring configuration into an immutable PollPlan once:
+OIDs to request, decrypted credentials (from the credential service), sanitized
+metric names, label sets and pre-rendered series strings. The polling hot path (poll_device_snmp and the
+poller service) only reads plans, so a poll cycle does no ORM queries,
+decryption or label building.
+
+Plans are recompiled when the monitoring configuration version
+(monitoring/config_version.py) changes, and at least every PLAN_MAX_AGE
+seconds as a safety net for changes made outside the API.
+"""
+
+import os
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from database import SessionLocal
+from monitoring.config_version import get_config_version
+from monitoring.models import MonitoringItem, MonitoringProfile, MonitoringMode, StandaloneDevice
+from monitoring.rates import get_rate_engine, SYS_UPTIME_OID, COUNTER_TYPES
+from monitoring.snmp.credential_service import get_credential_service
+from monitoring.snmp.oids import UNIVERSAL_OIDS, resolve_oid
+from monitoring.snmp.poller import SNMPCredentialData, SNMPResult
+from monitoring.victoria.client import format_series
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_VALUE_TYPES = ("integer", "gauge", "counter32", "counter64", "timeticks")
+
+PLAN_MAX_AGE = float(os.getenv("POLL_PLAN_MAX_AGE", "600"))  # seconds
+
+# With the trap receiver (monitoring/traps.py) catching link flaps, ifOperStatus items can be
+# polled at this longer interval instead of their own (0 = keep item intervals)
+TRAP_STATUS_POLL_INTERVAL = int(os.getenv("TRAP_STATUS_POLL_INTERVAL", "0"))  # seconds
+IF_OPER_STATUS_PREFIX = UNIVERSAL_OIDS["ifOperStatus"].oid + "."
+
+
+@dataclass(frozen=True)
+class PollPlan:
+    """Everything needed to poll one device's items and turn the results into samples"""
+
+    device_id: str
+    device_name: str
+    ip: str
+    interval: int
+    credentials: SNMPCredentialData
+    oids: Tuple[str, ...]
+    item_names: Tuple[str, ...]
+    metric_names: Tuple[str, ...]
+    labels: Tuple[Mapping[str, str], ...]
+    series: Tuple[str, ...]  # pre-rendered metric_name{labels}
+    rate_series: Tuple[str, ...]  # pre-rendered metric_name_rate{labels}
+    request_oids: Tuple[str, ...]  # oids + sysUpTime
+    config_version: Optional[int] = None
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        return (self.device_id, self.interval)
+
+
+def sanitize_metric_name(name: str) -> str:
+    """
+    Sanitize metric name for Prometheus/VictoriaMetrics
+
+    Args:
+        name: Metric name
+
+    Returns:
+        Sanitized metric name
+    """
+    # Replace spaces and special characters with underscores
+    sanitized = name.lower().replace(" ", "_").replace("-", "_").replace("(", "").replace(")", "")
+
+    # Remove consecutive underscores
+    while "__" in sanitized:
+        sanitized = sanitized.replace("__", "_")
+
+    return sanitized.strip("_")
+
+
+def item_labels(device_name: str, device_id: str, ip: str, item_name: str, oid: str) -> Dict[str, str]:
+    """
+    Build the label set of a monitoring item's series
+
+    Table instances (e.g. ifInOctets.3) also get an "index" label, resolved
+    through the OID trie once per plan compilation.
+
+    Args:
+        device_name: Device display name
+        device_id: Device UUID
+        ip: Device IP address
+        item_name: Item name
+        oid: Item OID
+
+    Returns:
+        Label dictionary
+    """
+    labels = {"device": device_name, "device_id": device_id, "ip": ip, "item": item_name, "oid": oid}
+
+    resolved = resolve_oid(oid)
+    if resolved is not None and resolved[1]:
+        labels["index"] = resolved[1]
+
+    return labels
+
+
+def compile_plan(
+    device_id: str,
+    device_name: str,
+    ip: str,
+    interval: int,
+    credentials: SNMPCredentialData,
+    items: Sequence[Tuple[str, str]],
+    config_version: Optional[int] = None,
+) -> PollPlan:
+    """
+    Compile a poll plan
+
+    Args:
+        device_id: Device UUID
+        device_name: Device display name
+        ip: Device IP address
+        interval: Polling interval in seconds
+        credentials: SNMP credentials
+        items: (OID, item name) pairs
+        config_version: Configuration version the plan was compiled from
+
+    Returns:
+        PollPlan
+    """
+    oids = tuple(oid for oid, _ in items)
+    item_names = tuple(name for _, name in items)
+    metric_names = tuple(sanitize_metric_name(name) for name in item_names)
+
+    labels = tuple(MappingProxyType(item_labels(device_name, device_id, ip, name, oid)) for oid, name in items)
+
+    return PollPlan(
+        device_id=device_id,
+        device_name=device_name,
+        ip=ip,
+        interval=interval,
+        credentials=credentials,
+        oids=oids,
+        item_names=item_names,
+        metric_names=metric_names,
+        labels=labels,
+        series=tuple(format_series(name, label_set) for name, label_set in zip(metric_names, labels)),
+        rate_series=tuple(format_series(f"{name}_rate", label_set) for name, label_set in zip(metric_names, labels)),
+        request_oids=oids + (SYS_UPTIME_OID,),
+        config_version=config_version,
+    )
+
+
+def _item_interval(item: MonitoringItem) -> int:
+    """Polling interval of an item, stretched for link status items when traps cover them"""
+    interval = item.interval or 60
+    if TRAP_STATUS_POLL_INTERVAL and item.oid.startswith(IF_OPER_STATUS_PREFIX):
+        return max(interval, TRAP_STATUS_POLL_INTERVAL)
+    return interval
+
+
+def load_plans(config_version: Optional[int] = None) -> Tuple[Dict[Tuple[str, int], PollPlan], Dict[str, PollPlan]]:
+    """
+    Compile plans for all enabled monitoring items
+
+    Args:
+        config_version: Configuration version to stamp on the plans
+
+    Returns:
+        Tuple of (plans per (device, interval), one plan per device covering all its items).
+        Both are empty if standalone monitoring is inactive.
+    """
+    db = SessionLocal()
+    try:
+        profile = db.query(MonitoringProfile).filter_by(is_active=True).first()
+        if not profile or profile.mode == MonitoringMode.ZABBIX:
+            return {}, {}
+
+        items = db.query(MonitoringItem).filter_by(enabled=True).all()
+        device_ids = {item.device_id for item in items}
+        if not device_ids:
+            return {}, {}
+
+        devices = {d.id: d for d in db.query(StandaloneDevice).filter(StandaloneDevice.id.in_(device_ids)).all()}
+        creds = get_credential_service().get_many(device_ids, db)
+
+        by_device: Dict[Any, List[MonitoringItem]] = {}
+        for item in items:
+            by_device.setdefault(item.device_id, []).append(item)
+
+        interval_plans: Dict[Tuple[str, int], PollPlan] = {}
+        device_plans: Dict[str, PollPlan] = {}
+
+        for device_id, device_items in by_device.items():
+            device = devices.get(device_id)
+            credentials = creds.get(str(device_id))
+            if not device or not device.ip or not device.enabled or not credentials:
+                continue
+
+            common = {
+                "device_id": str(device_id),
+                "device_name": device.name or device.ip,
+                "ip": device.ip,
+                "credentials": credentials,
+                "config_version": config_version,
+            }
+
+            device_plans[str(device_id)] = compile_plan(
+                interval=min(item.interval or 60 for item in device_items),
+                items=[(item.oid, item.oid_name) for item in device_items],
+                **common,
+            )
+
+            grouped: Dict[int, List[MonitoringItem]] = {}
+            for item in device_items:
+                grouped.setdefault(_item_interval(item), []).append(item)
+
+            for interval, group in grouped.items():
+                plan = compile_plan(interval=interval, items=[(item.oid, item.oid_name) for item in group], **common)
+                interval_plans[plan.key] = plan
+
+        return interval_plans, device_plans
+    finally:
+        db.close()
+
+
+def build_plan_metrics(plan: PollPlan, results: List[SNMPResult], timestamp: datetime, rates: bool = True) -> List[Dict[str, Any]]:
+    """
+    Build VictoriaMetrics samples from the results of polling plan.request_oids
+
+    Numeric results become one sample each; with rates, counter32/counter64
+    results also produce a "<metric>_rate" per-second sample via the rate
+    engine, using the trailing sysUpTime result to detect reboots.
+
+    The rate engine keeps the previous sample in process memory, so rates are
+    only correct when every poll of a device lands in the same process. That
+    holds for the poller service (monitoring/poller_service.py), whose shards
+    pin devices to a node, but not for Celery prefork workers, which is why
+    the Celery polling tasks pass rates=False.
+
+    Args:
+        plan: Poll plan that was polled
+        results: SNMPResult list in plan.request_oids order
+        timestamp: Poll time
+        rates: Emit "<metric>_rate" samples for counters
+
+    Returns:
+        List of metric dictionaries for write_metrics_bulk
+    """
+    rate_engine = get_rate_engine()
+    ts = timestamp.timestamp()
+    count = len(plan.oids)
+
+    uptime = None
+    for result in results[count:]:
+        if result.oid == SYS_UPTIME_OID and result.success and result.value_type == "timeticks":
+            uptime = int(result.value)
+
+    metrics = []
+
+    for i, result in enumerate(results[:count]):
+        if not result.success or result.value is None:
+            logger.warning(f"Failed to poll {plan.ip} - {plan.item_names[i]}: {result.error}")
+            continue
+
+        if result.value_type not in NUMERIC_VALUE_TYPES:
+            logger.debug(f"Skipping non-numeric value for {plan.ip} - {plan.item_names[i]} ({result.value_type})")
+            continue
+
+        metrics.append({
+            "metric_name": plan.metric_names[i],
+            "value": float(result.value),
+            "labels": plan.labels[i],
+            "series": plan.series[i],
+            "timestamp": timestamp,
+        })
+
+        if rates and result.value_type in COUNTER_TYPES:
+            rate = rate_engine.observe(plan.device_id, plan.oids[i], result.value, result.value_type, ts, uptime)
+            if rate is not None:
+                metrics.append({
+                    "metric_name": f"{plan.metric_names[i]}_rate",
+                    "value": rate,
+                    "labels": plan.labels[i],
+                    "series": plan.rate_series[i],
+                    "timestamp": timestamp,
+                })
+
+    return metrics
+
+
+class PlanCache:
+    """
+    Process-wide cache of compiled poll plans
+
+    get_plans()/get_device_plan() check the configuration version (one Redis
+    GET, at most every check_interval seconds) and recompile all plans only if
+    it changed or the plans are older than max_age. If Redis is unavailable,
+    plans are recompiled every check_interval seconds.
+    """
+
+    def __init__(self, max_age: float = PLAN_MAX_AGE, check_interval: float = 5.0):
+        """
+        Initialize cache
+
+        Args:
+            max_age: Seconds after which plans are recompiled regardless of version
+            check_interval: Minimum seconds between configuration version checks
+        """
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self._plans: Dict[Tuple[str, int], PollPlan] = {}
+        self._device_plans: Dict[str, PollPlan] = {}
+        self._version: Optional[int] = None
+        self._compiled_at: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.compilations = 0
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Recompile plans if the configuration changed
+
+        Args:
+            force: Recompile unconditionally
+
+        Returns:
+            True if plans were recompiled
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._compiled_at is not None:
+                if now - self._checked_at < self.check_interval:
+                    return False
+                self._checked_at = now
+
+                version = get_config_version()
+                fresh = now - self._compiled_at < self.max_age
+                if version is not None and version == self._version and fresh:
+                    return False
+            else:
+                version = get_config_version()
+                self._checked_at = now
+
+            started = time.monotonic()
+            plans, device_plans = load_plans(version)
+
+            self._plans = plans
+            self._device_plans = device_plans
+            self._version = version
+            self._compiled_at = now
+            self.compilations += 1
+
+            logger.info(
+                f"Compiled {len(plans)} poll plans for {len(device_plans)} devices "
+                f"(config version {version}) in {(time.monotonic() - started) * 1000:.0f}ms"
+            )
+            return True
+
+    def get_plans(self) -> Dict[Tuple[str, int], PollPlan]:
+        """
+        Get plans per (device, interval), refreshing if needed
+
+        Returns:
+            Dictionary of plan key -> PollPlan
+        """
+        self.refresh()
+        return self._plans
+
+    def get_device_plan(self, device_id: str) -> Optional[PollPlan]:
+        """
+        Get the plan covering all items of one device, refreshing if needed
+
+        Args:
+            device_id: Device UUID
+
+        Returns:
+            PollPlan or None if the device has nothing to poll
+        """
+        self.refresh()
+        return self._device_plans.get(str(device_id))
+
+    def get_device_ids(self) -> List[str]:
+        """
+        Get the IDs of all devices with a plan, refreshing if needed
+
+        Returns:
+            List of device IDs
+        """
+        self.refresh()
+        return list(self._device_plans)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+
+        Returns:
+            Dictionary with plan counts, config version and compilation count
+        """
+        return {
+            "plans": len(self._plans),
+            "devices": len(self._device_plans),
+            "config_version": self._version,
+            "compilations": self.compilations,
+            "age_seconds": round(time.monotonic() - self._compiled_at, 1) if self._compiled_at is not None else None,
+        }
+
+
+# Singleton instance
+_plan_cache: Optional[PlanCache] = None
+
+
+def get_plan_cache() -> PlanCache:
+    """
+    Get or create PlanCache singleton
+
+    Returns:
+        PlanCache instance
+    """
+    global _plan_cache
+
+    if _plan_cache is None:
+        _plan_cache = PlanCache()
+
+    return _plan_cache
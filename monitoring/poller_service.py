@@ -0,0 +1,345 @@
+"""
+WARD FLUX - Asyncio SNMP Poller Service
+
+Standalone polling daemon that replaces the Celery beat fan-out for SNMP polling.
+Monitoring items are compiled into poll plans per (device, interval) (see
+monitoring/poll_plan.py) and scheduled on a heap, so
+each item is polled at its own MonitoringItem.interval with due times spread
+across the interval. Thousands of devices are polled concurrently from a single
+event loop and results are handed to VictoriaMetrics in batches.
+
+Usage:
+    python -m monitoring.poller_service
+
+When running this service, remove the "poll-devices-snmp" beat entry so devices
+are not polled twice.
+
+Horizontal scaling: start several instances with distinct POLLER_NODE_ID values
+(or --node-id). Devices are then split between live nodes by consistent hashing
+(see monitoring/sharding.py) and each node only polls its own shard.
+
+With ALERT_STREAMING=true, threshold alert rules are checked against samples
+as they are polled (see monitoring/alerting/stream.py), and against the
+link-state samples the trap receiver publishes.
+"""
+
+import os
+import json
+import socket
+import signal
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import redis.asyncio as aioredis
+
+from monitoring.alerting.stream import ALERT_SAMPLES_CHANNEL, ALERT_STREAMING, get_streaming_engine
+from monitoring.poll_plan import PollPlan, get_plan_cache, build_plan_metrics
+from monitoring.scheduler import PollScheduler
+from monitoring.sharding import HashRing, ShardCoordinator, REDIS_URL, STATS_KEY_PREFIX
+from monitoring.snmp.credential_service import get_credential_service
+from monitoring.snmp.poller import get_snmp_poller
+from monitoring.victoria.writer import get_metrics_writer
+
+logger = logging.getLogger(__name__)
+
+# Service settings
+POLLER_CONCURRENCY = int(os.getenv("POLLER_CONCURRENCY", "500"))  # Max devices polled at once
+POLLER_REFRESH_INTERVAL = float(os.getenv("POLLER_REFRESH_INTERVAL", "10"))  # Seconds between config version checks
+POLLER_JITTER = float(os.getenv("POLLER_JITTER", "0.1"))  # Fraction of interval
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))  # seconds
+METRICS_FLUSH_TIMEOUT = 30.0  # Max seconds a flush waits for the writer
+POLLER_NODE_ID = os.getenv("POLLER_NODE_ID")  # Enables sharding when set
+POLLER_STATS_INTERVAL = float(os.getenv("POLLER_STATS_INTERVAL", "15"))  # Seconds between stats snapshots
+
+class MetricsBatcher:
+    """
+    Asyncio front end of the process-wide MetricsWriter
+
+    add() hands samples to the writer's buffer without blocking the loop; the
+    writer thread batches, compresses, retries and spools them (see
+    monitoring/victoria/writer.py). run() forces a flush every flush_interval
+    seconds for callers that need lower latency than the writer's default.
+    """
+
+    def __init__(self, flush_interval: float = METRICS_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self.writer = get_metrics_writer()
+
+    @property
+    def samples_written(self) -> int:
+        return self.writer.samples_written
+
+    async def add(self, metrics: List[Dict[str, Any]]):
+        self.writer.add(metrics)
+
+    async def flush(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.writer.flush, METRICS_FLUSH_TIMEOUT)
+
+    async def run(self, stop_event: asyncio.Event):
+        """Periodic flush loop"""
+        while not stop_event.is_set():
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+
+class PollerService:
+    """
+    Asyncio SNMP polling daemon
+
+    Keeps a heap schedule of (device, interval) jobs, polls due jobs concurrently
+    with SNMPPoller.get_batch and feeds results to a MetricsBatcher.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = POLLER_CONCURRENCY,
+        refresh_interval: float = POLLER_REFRESH_INTERVAL,
+        jitter: float = POLLER_JITTER,
+        node_id: Optional[str] = POLLER_NODE_ID,
+    ):
+        self.concurrency = concurrency
+        self.refresh_interval = refresh_interval
+        self.scheduler = PollScheduler(jitter=jitter)
+        self.batcher = MetricsBatcher()
+        self.poller = get_snmp_poller()
+        self.alerts = get_streaming_engine() if ALERT_STREAMING else None
+
+        self.node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.coordinator = ShardCoordinator(node_id, on_change=self._on_ring_change) if node_id else None
+
+        self._all_jobs: Dict[Tuple[str, int], PollPlan] = {}  # Jobs of every device, before sharding
+        self._jobs: Dict[Tuple[str, int], PollPlan] = {}  # Jobs this node owns
+        self._in_flight: Set[Tuple[str, int]] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._stop = asyncio.Event()
+
+        self.polls_completed = 0
+        self.polls_skipped = 0  # Previous poll of the same job still running
+
+    async def refresh_jobs(self):
+        """Sync the schedule with the compiled poll plans (recompiled only on config changes)"""
+        loop = asyncio.get_running_loop()
+        try:
+            jobs = await loop.run_in_executor(None, get_plan_cache().get_plans)
+        except Exception as e:
+            logger.error(f"Failed to load poll plans: {e}")
+            return
+
+        if jobs is not self._all_jobs:
+            self.apply_jobs(jobs)
+
+    def apply_jobs(self, jobs: Dict[Tuple[str, int], PollPlan]):
+        """
+        Replace the job set, adding/removing schedule entries as needed
+
+        When sharding is enabled only jobs of devices owned by this node are kept.
+
+        Args:
+            jobs: Dictionary of job key -> PollPlan
+        """
+        now = asyncio.get_running_loop().time()
+        self._all_jobs = jobs
+
+        if self.coordinator:
+            jobs = {key: job for key, job in jobs.items() if self.coordinator.owns(job.device_id)}
+
+        for key in self._jobs.keys() - jobs.keys():
+            self.scheduler.remove(key)
+
+        for key, job in jobs.items():
+            if key not in self.scheduler:
+                self.scheduler.add(key, job.interval, now)
+
+        added = len(jobs.keys() - self._jobs.keys())
+        removed = len(self._jobs.keys() - jobs.keys())
+        self._jobs = jobs
+
+        if added or removed:
+            logger.info(f"Poll schedule updated: {len(jobs)} jobs (+{added}/-{removed})")
+
+    def _on_ring_change(self, ring: HashRing):
+        """Re-filter the known jobs and alert state against the new ring"""
+        self.apply_jobs(self._all_jobs)
+        if self.alerts:
+            self.alerts.set_ownership(self.coordinator.owns)
+
+    async def run(self):
+        """Run the service until stop() is called"""
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_running_loop()
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except NotImplementedError:
+                pass
+
+        if self.coordinator:
+            if self.alerts:
+                self.alerts.set_ownership(self.coordinator.owns)
+            await self.coordinator.start()
+
+        flusher = asyncio.create_task(self.batcher.run(self._stop))
+        stats_publisher = asyncio.create_task(self._publish_stats_loop())
+        alert_writer = asyncio.create_task(self.alerts.run(self._stop)) if self.alerts else None
+        trap_samples = asyncio.create_task(self._observe_published_samples()) if self.alerts else None
+        next_refresh = 0.0
+
+        logger.info(f"Poller service started (concurrency={self.concurrency})")
+
+        while not self._stop.is_set():
+            now = loop.time()
+
+            if now >= next_refresh:
+                await self.refresh_jobs()
+                next_refresh = now + self.refresh_interval
+
+            for key in self.scheduler.pop_due(now):
+                job = self._jobs.get(key)
+                if job is None:
+                    continue
+                if key in self._in_flight:
+                    self.polls_skipped += 1
+                    logger.warning(f"Previous poll of {job.ip} (interval {job.interval}s) still running, skipping")
+                    continue
+
+                self._in_flight.add(key)
+                task = asyncio.create_task(self._poll(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            next_due = self.scheduler.next_due()
+            wake_at = min(next_due if next_due is not None else next_refresh, next_refresh)
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=max(0.0, min(wake_at - loop.time(), 1.0)))
+            except asyncio.TimeoutError:
+                pass
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await flusher
+        await self.batcher.flush()
+        if alert_writer:
+            await alert_writer
+        if trap_samples:
+            trap_samples.cancel()
+        stats_publisher.cancel()
+
+        if self.coordinator:
+            await self.coordinator.stop()
+
+        logger.info(f"Poller service stopped ({self.polls_completed} polls, {self.batcher.samples_written} samples written)")
+
+    def stop(self):
+        """Request a graceful shutdown"""
+        self._stop.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get a snapshot of service, cache and device-health statistics
+
+        Returns:
+            Dictionary suitable for JSON serialization
+        """
+        return {
+            "node_id": self.node_id,
+            "jobs": len(self._jobs),
+            "in_flight": len(self._in_flight),
+            "polls_completed": self.polls_completed,
+            "polls_skipped": self.polls_skipped,
+            "samples_written": self.batcher.samples_written,
+            "writer": self.batcher.writer.get_stats(),
+            "plans": get_plan_cache().get_stats(),
+            "credentials": get_credential_service().get_stats(),
+            "alerts": self.alerts.get_stats() if self.alerts else None,
+            "cache": self.poller.get_cache_stats(),
+            "devices": self.poller.get_device_stats(only_unhealthy=True),
+            "updated_at": time.time(),
+        }
+
+    async def _observe_published_samples(self):
+        """Feed samples published by other processes (trap receiver) to the streaming alert engine"""
+        while True:
+            client = aioredis.from_url(REDIS_URL, decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(ALERT_SAMPLES_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        metrics = json.loads(message["data"])
+                    except ValueError:
+                        continue
+                    if self.coordinator:
+                        metrics = [m for m in metrics if self.coordinator.owns((m.get("labels") or {}).get("device_id", ""))]
+                    self.alerts.observe(metrics)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Published alert samples unavailable ({e}), resubscribing in 5s")
+                await asyncio.sleep(5)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+    async def _publish_stats_loop(self):
+        """Periodically publish get_stats() to Redis for the monitoring API"""
+        client = aioredis.from_url(REDIS_URL, decode_responses=True)
+        key = f"{STATS_KEY_PREFIX}{self.node_id}"
+        try:
+            while True:
+                try:
+                    await client.set(key, json.dumps(self.get_stats(), default=str), ex=int(POLLER_STATS_INTERVAL * 4))
+                except Exception as e:
+                    logger.debug(f"Failed to publish poller stats: {e}")
+                await asyncio.sleep(POLLER_STATS_INTERVAL)
+        finally:
+            await client.aclose()
+
+    async def _poll(self, job: PollPlan):
+        """Poll one job and queue its samples"""
+        try:
+            async with self._semaphore:
+                started = time.monotonic()
+                results = await self.poller.get_batch(job.ip, list(job.request_oids), job.credentials)
+                elapsed = time.monotonic() - started
+
+            metrics = build_plan_metrics(job, results, datetime.utcnow())
+            if self.alerts:
+                self.alerts.observe(metrics)
+
+            await self.batcher.add(metrics)
+            self.polls_completed += 1
+            logger.debug(f"Polled {job.ip}: {len(metrics)} samples from {len(job.oids)} items in {elapsed * 1000:.0f}ms")
+
+        except Exception as e:
+            logger.error(f"Error polling device {job.device_id} ({job.ip}): {e}")
+        finally:
+            self._in_flight.discard(job.key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WARD FLUX asyncio SNMP poller service")
+    parser.add_argument("--node-id", default=POLLER_NODE_ID, help="Poller node ID (enables sharding)")
+    parser.add_argument("--concurrency", type=int, default=POLLER_CONCURRENCY, help="Max devices polled at once")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="[%(asctime)s: %(levelname)s/%(name)s] %(message)s",
+    )
+    asyncio.run(PollerService(concurrency=args.concurrency, node_id=args.node_id).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+WARD FLUX - Counter Rate Engine
+
+Turns raw SNMP counter samples into per-second rates at ingest time.
+Keeps the previous sample per (device, OID), corrects counter32 wraps and
+detects device reboots via sysUpTime so resets never produce bogus spikes.
+
+State is per process, so rates are only produced by the poller service
+(monitoring/poller_service.py), where each device is always polled by the same
+process; the Celery polling tasks write raw counters only.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SYS_UPTIME_OID = "1.3.6.1.2.1.1.3.0"
+
+COUNTER32_MODULUS = 2 ** 32
+COUNTER_TYPES = ("counter32", "counter64")
+
+
+@dataclass
+class _CounterSample:
+    value: int
+    timestamp: float  # seconds
+    uptime: Optional[int]  # sysUpTime in timeticks at sample time
+
+
+class RateEngine:
+    """
+    In-process counter-to-rate converter keyed by (device, OID)
+
+    Rules for a new sample compared to the previous one:
+    - first sample, or non-increasing timestamp: store only, no rate
+    - sysUpTime went backwards: device rebooted, counters restarted, no rate
+    - counter32 went backwards: counter wrapped at 2^32, add the modulus
+    - counter64 went backwards: treated as a reset (wrapping 2^64 is not realistic)
+    """
+
+    def __init__(self, stale_after: float = 3600.0, prune_every: int = 100000):
+        """
+        Initialize rate engine
+
+        Args:
+            stale_after: Seconds after which an unrefreshed sample is discarded
+            prune_every: Number of observations between stale-sample sweeps
+        """
+        self.stale_after = stale_after
+        self.prune_every = prune_every
+        self._samples: Dict[Tuple[str, str], _CounterSample] = {}
+        self._lock = threading.Lock()
+        self._observations = 0
+        self.resets_detected = 0
+        self.wraps_corrected = 0
+
+    def observe(
+        self,
+        device_id: str,
+        oid: str,
+        value: int,
+        value_type: str,
+        timestamp: float,
+        uptime: Optional[int] = None,
+    ) -> Optional[float]:
+        """
+        Record a counter sample and compute the per-second rate since the previous one
+
+        Args:
+            device_id: Device ID
+            oid: Counter OID
+            value: Raw counter value
+            value_type: "counter32" or "counter64"
+            timestamp: Sample time in seconds (Unix time)
+            uptime: sysUpTime (timeticks) polled in the same request, if available
+
+        Returns:
+            Rate per second, or None if no rate can be derived from this sample
+        """
+        key = (device_id, oid)
+        sample = _CounterSample(value=int(value), timestamp=timestamp, uptime=uptime)
+
+        with self._lock:
+            previous = self._samples.get(key)
+            self._samples[key] = sample
+
+            self._observations += 1
+            if self._observations % self.prune_every == 0:
+                self._prune(timestamp)
+
+        if previous is None:
+            return None
+
+        elapsed = timestamp - previous.timestamp
+        if elapsed <= 0:
+            return None
+
+        if uptime is not None and previous.uptime is not None and uptime < previous.uptime:
+            self.resets_detected += 1
+            logger.info(f"Device {device_id} rebooted (sysUpTime {previous.uptime} -> {uptime}), resetting counters")
+            return None
+
+        delta = sample.value - previous.value
+        if delta < 0:
+            if value_type == "counter32":
+                delta += COUNTER32_MODULUS
+                self.wraps_corrected += 1
+            else:
+                self.resets_detected += 1
+                logger.debug(f"Counter reset for {device_id} {oid}: {previous.value} -> {sample.value}")
+                return None
+
+        return delta / elapsed
+
+    def forget_device(self, device_id: str):
+        """
+        Drop all samples of a device
+
+        Args:
+            device_id: Device ID
+        """
+        with self._lock:
+            for key in [k for k in self._samples if k[0] == device_id]:
+                del self._samples[key]
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get engine statistics
+
+        Returns:
+            Dictionary with tracked series and reset/wrap counters
+        """
+        return {
+            "series_tracked": len(self._samples),
+            "resets_detected": self.resets_detected,
+            "wraps_corrected": self.wraps_corrected,
+        }
+
+    def _prune(self, now: float):
+        """Discard samples older than stale_after (caller holds the lock)"""
+        cutoff = now - self.stale_after
+        stale = [key for key, sample in self._samples.items() if sample.timestamp < cutoff]
+        for key in stale:
+            del self._samples[key]
+        if stale:
+            logger.debug(f"Rate engine pruned {len(stale)} stale series")
+
+
+# Singleton instance
+_rate_engine: Optional[RateEngine] = None
+
+
+def get_rate_engine() -> RateEngine:
+    """
+    Get or create RateEngine singleton
+
+    Returns:
+        RateEngine instance
+    """
+    global _rate_engine
+
+    if _rate_engine is None:
+        _rate_engine = RateEngine()
+
+    return _rate_engine
@@ -0,0 +1,140 @@
+"""
+WARD FLUX - Poll Scheduler
+
+Heap-based schedule of recurring poll jobs keyed on each job's interval.
+"""
+
+import heapq
+import logging
+import random
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(order=True)
+class _ScheduleEntry:
+    """Heap entry: ordered by due time, then insertion sequence"""
+
+    due: float
+    seq: int
+    key: Hashable = field(compare=False)
+    generation: int = field(compare=False)
+
+
+class PollScheduler:
+    """
+    Min-heap scheduler for recurring jobs
+
+    Each job is identified by a hashable key and fires every `interval` seconds.
+    First due times are spread across the interval by a stable hash of the key
+    plus random jitter, so jobs sharing an interval do not all land on the same
+    second. Removed or rescheduled jobs are dropped lazily when popped.
+    """
+
+    def __init__(self, jitter: float = 0.1):
+        """
+        Initialize scheduler
+
+        Args:
+            jitter: Random jitter applied to first due times, as a fraction of the interval
+        """
+        self.jitter = jitter
+        self._heap: List[_ScheduleEntry] = []
+        self._jobs: Dict[Hashable, Tuple[float, int]] = {}  # key -> (interval, generation)
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._jobs
+
+    def add(self, key: Hashable, interval: float, now: float, first_due: Optional[float] = None):
+        """
+        Add or reschedule a job
+
+        Args:
+            key: Job key
+            interval: Seconds between runs
+            now: Current (monotonic) time
+            first_due: Optional explicit first due time; defaults to a spread offset
+        """
+        interval = max(float(interval), 1.0)
+        generation = self._jobs.get(key, (0.0, 0))[1] + 1
+        self._jobs[key] = (interval, generation)
+
+        if first_due is None:
+            first_due = now + self._spread_offset(key, interval)
+
+        self._push(first_due, key, generation)
+
+    def remove(self, key: Hashable):
+        """
+        Remove a job (its heap entries are discarded when popped)
+
+        Args:
+            key: Job key
+        """
+        self._jobs.pop(key, None)
+
+    def pop_due(self, now: float) -> List[Hashable]:
+        """
+        Pop all jobs due at or before `now` and schedule their next run
+
+        Args:
+            now: Current (monotonic) time
+
+        Returns:
+            List of due job keys
+        """
+        due = []
+
+        while self._heap and self._heap[0].due <= now:
+            entry = heapq.heappop(self._heap)
+            job = self._jobs.get(entry.key)
+
+            if job is None or job[1] != entry.generation:
+                continue  # removed or rescheduled
+
+            interval = job[0]
+            next_due = entry.due + interval
+
+            # Skip missed runs after a stall instead of firing a burst
+            if next_due <= now:
+                missed = int((now - entry.due) // interval)
+                next_due = entry.due + (missed + 1) * interval
+                logger.debug(f"Scheduler fell behind for {entry.key}: skipped {missed} runs")
+
+            self._push(next_due, entry.key, entry.generation)
+            due.append(entry.key)
+
+        return due
+
+    def next_due(self) -> Optional[float]:
+        """
+        Get the earliest due time of any live job
+
+        Returns:
+            Due time or None if the schedule is empty
+        """
+        while self._heap:
+            entry = self._heap[0]
+            job = self._jobs.get(entry.key)
+            if job is not None and job[1] == entry.generation:
+                return entry.due
+            heapq.heappop(self._heap)
+
+        return None
+
+    def _push(self, due: float, key: Hashable, generation: int):
+        self._seq += 1
+        heapq.heappush(self._heap, _ScheduleEntry(due=due, seq=self._seq, key=key, generation=generation))
+
+    def _spread_offset(self, key: Hashable, interval: float) -> float:
+        """Stable per-key phase within the interval, plus random jitter"""
+        phase = (zlib.crc32(repr(key).encode()) / 0xFFFFFFFF) * interval
+        offset = phase + random.uniform(-self.jitter, self.jitter) * interval
+        return offset % interval
@@ -0,0 +1,249 @@
+"""
+WARD FLUX - Poller Sharding
+
+Splits device ownership across poller nodes with a consistent-hash ring.
+Each node holds a lease in Redis (a key with a TTL refreshed by heartbeats);
+the set of live leases is the ring membership. When a node joins, leaves or
+its lease expires, every node rebuilds the ring and only ~1/N of the devices
+change owner, so per-device state stays warm on the rest.
+
+Local test with several processes and a local Redis:
+    POLLER_NODE_ID=a python -m monitoring.poller_service
+    POLLER_NODE_ID=b python -m monitoring.poller_service
+    python -m monitoring.sharding          # show live nodes and shard sizes
+"""
+
+import os
+import json
+import socket
+import bisect
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import redis
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+NODE_KEY_PREFIX = "ward:poller:nodes:"
+STATS_KEY_PREFIX = "ward:poller:stats:"
+LEASE_TTL = int(os.getenv("POLLER_LEASE_TTL", "15"))  # seconds
+HEARTBEAT_INTERVAL = float(os.getenv("POLLER_HEARTBEAT_INTERVAL", "5"))  # seconds
+RING_REPLICAS = int(os.getenv("POLLER_RING_REPLICAS", "128"))  # virtual nodes per node
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Consistent-hash ring with virtual nodes
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = RING_REPLICAS):
+        """
+        Initialize ring
+
+        Args:
+            nodes: Node IDs
+            replicas: Virtual nodes per node (more = smoother distribution)
+        """
+        self.replicas = replicas
+        self.nodes: Tuple[str, ...] = tuple(sorted(set(nodes)))
+        self._ring: List[Tuple[int, str]] = sorted(
+            (_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas)
+        )
+        self._hashes = [h for h, _ in self._ring]
+
+    def get_node(self, key: str) -> Optional[str]:
+        """
+        Get the node owning a key
+
+        Args:
+            key: Key to place (e.g. device ID)
+
+        Returns:
+            Node ID or None if the ring is empty
+        """
+        if not self._ring:
+            return None
+
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+
+class ShardCoordinator:
+    """
+    Maintains this node's Redis lease and the current hash ring
+
+    Usage:
+        coordinator = ShardCoordinator("node-a", on_change=reapply)
+        await coordinator.start()
+        ...
+        if coordinator.owns(device_id): poll(device_id)
+        ...
+        await coordinator.stop()
+    """
+
+    def __init__(
+        self,
+        node_id: str,
+        redis_url: str = REDIS_URL,
+        lease_ttl: int = LEASE_TTL,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+        on_change: Optional[Callable[[HashRing], None]] = None,
+    ):
+        self.node_id = node_id
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.on_change = on_change
+        self.ring = HashRing([node_id])
+        self.extra_info: Dict[str, object] = {}
+
+        self._redis = aioredis.from_url(redis_url, decode_responses=True)
+        self._task: Optional[asyncio.Task] = None
+        self._started_at = time.time()
+
+    @property
+    def lease_key(self) -> str:
+        return f"{NODE_KEY_PREFIX}{self.node_id}"
+
+    def owns(self, device_id: str) -> bool:
+        """
+        Check whether this node owns a device
+
+        Args:
+            device_id: Device ID
+
+        Returns:
+            True if the device hashes to this node
+        """
+        return self.ring.get_node(str(device_id)) == self.node_id
+
+    async def start(self):
+        """Acquire the lease, load membership and start heartbeating"""
+        await self.heartbeat()
+        self._task = asyncio.create_task(self._heartbeat_loop())
+        logger.info(f"Poller node {self.node_id} joined ring: {list(self.ring.nodes)}")
+
+    async def stop(self):
+        """Stop heartbeating and release the lease so peers rebalance immediately"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        try:
+            await self._redis.delete(self.lease_key)
+        except Exception as e:
+            logger.warning(f"Failed to release poller lease {self.lease_key}: {e}")
+
+        await self._redis.aclose()
+        logger.info(f"Poller node {self.node_id} left ring")
+
+    async def heartbeat(self):
+        """Refresh this node's lease and rebuild the ring if membership changed"""
+        info = {"host": socket.gethostname(), "pid": os.getpid(), "started_at": self._started_at, **self.extra_info}
+        await self._redis.set(self.lease_key, json.dumps(info), ex=self.lease_ttl)
+
+        nodes = await live_nodes(self._redis)
+        nodes.setdefault(self.node_id, info)
+
+        if tuple(sorted(nodes)) != self.ring.nodes:
+            old_nodes = list(self.ring.nodes)
+            self.ring = HashRing(nodes.keys())
+            logger.info(f"Poller ring membership changed: {old_nodes} -> {list(self.ring.nodes)}")
+            if self.on_change:
+                self.on_change(self.ring)
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.heartbeat()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep the current ring; if Redis stays down our lease expires and peers take over
+                logger.error(f"Poller heartbeat failed for {self.node_id}: {e}")
+
+
+async def live_nodes(redis_client) -> Dict[str, dict]:
+    """
+    Get all poller nodes holding a live lease
+
+    Args:
+        redis_client: redis.asyncio client (decode_responses=True)
+
+    Returns:
+        Dictionary of node ID -> lease info
+    """
+    nodes = {}
+    async for key in redis_client.scan_iter(match=f"{NODE_KEY_PREFIX}*"):
+        raw = await redis_client.get(key)
+        if raw is None:
+            continue  # expired between SCAN and GET
+        try:
+            nodes[key[len(NODE_KEY_PREFIX):]] = json.loads(raw)
+        except ValueError:
+            nodes[key[len(NODE_KEY_PREFIX):]] = {}
+    return nodes
+
+
+def get_published_stats(redis_url: str = REDIS_URL) -> Dict[str, dict]:
+    """
+    Read the stats snapshots published by running poller nodes
+
+    Args:
+        redis_url: Redis URL
+
+    Returns:
+        Dictionary of node ID -> stats snapshot
+    """
+    client = redis.from_url(redis_url, decode_responses=True)
+    try:
+        stats = {}
+        for key in client.scan_iter(match=f"{STATS_KEY_PREFIX}*"):
+            raw = client.get(key)
+            if raw is None:
+                continue
+            try:
+                stats[key[len(STATS_KEY_PREFIX):]] = json.loads(raw)
+            except ValueError:
+                continue
+        return stats
+    finally:
+        client.close()
+
+
+async def _print_status(redis_url: str):
+    client = aioredis.from_url(redis_url, decode_responses=True)
+    try:
+        nodes = await live_nodes(client)
+    finally:
+        await client.aclose()
+
+    if not nodes:
+        print("No live poller nodes")
+        return
+
+    ring = HashRing(nodes.keys())
+    sample = [f"device-{i}" for i in range(10000)]
+    counts: Dict[str, int] = {node: 0 for node in nodes}
+    for key in sample:
+        counts[ring.get_node(key)] += 1
+
+    for node, info in sorted(nodes.items()):
+        share = counts[node] / len(sample) * 100
+        print(f"{node:<20} {info.get('host', '?')}:{info.get('pid', '?')}  ~{share:.1f}% of devices")
+
+
+if __name__ == "__main__":
+    asyncio.run(_print_status(REDIS_URL))
@@ -0,0 +1,321 @@
+"""
+WARD FLUX - SNMP Credential Service
+
+Loads SNMP credentials in bulk and keeps the decrypted SNMPCredentialData in a
+bounded, TTL-limited in-memory cache, so pollers and API endpoints do not
+query and Fernet-decrypt a device's credentials on every use.
+
+Entries remember the ciphertext they were decrypted from: when a row is
+re-read after its TTL expired and nothing changed, the cached plaintext is
+reused without decrypting again. Changes made through the API invalidate the
+local cache directly and, via the monitoring config version
+(monitoring/config_version.py), the caches of all other processes.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from database import SessionLocal
+from monitoring.config_version import get_config_version
+from monitoring.models import SNMPCredential
+from monitoring.snmp.crypto import decrypt_credential
+from monitoring.snmp.poller import SNMPCredentialData
+
+logger = logging.getLogger(__name__)
+
+CREDENTIAL_CACHE_TTL = float(os.getenv("SNMP_CREDENTIAL_CACHE_TTL", "300"))  # seconds
+CREDENTIAL_CACHE_SIZE = int(os.getenv("SNMP_CREDENTIAL_CACHE_SIZE", "50000"))
+CONFIG_CHECK_INTERVAL = 5.0  # seconds between config version checks
+
+
+def build_credential_data(snmp_cred: SNMPCredential) -> SNMPCredentialData:
+    """
+    Build SNMPCredentialData from database model
+
+    Args:
+        snmp_cred: SNMPCredential database object
+
+    Returns:
+        SNMPCredentialData object
+    """
+    if snmp_cred.version == "v2c":
+        return SNMPCredentialData(
+            version="v2c", community=decrypt_credential(snmp_cred.community_encrypted) if snmp_cred.community_encrypted else "public"
+        )
+    else:  # v3
+        return SNMPCredentialData(
+            version="v3",
+            username=snmp_cred.username,
+            auth_protocol=snmp_cred.auth_protocol,
+            auth_key=decrypt_credential(snmp_cred.auth_key_encrypted) if snmp_cred.auth_key_encrypted else None,
+            priv_protocol=snmp_cred.priv_protocol,
+            priv_key=decrypt_credential(snmp_cred.priv_key_encrypted) if snmp_cred.priv_key_encrypted else None,
+            security_level=snmp_cred.security_level,
+        )
+
+
+def _fingerprint(snmp_cred: SNMPCredential) -> Tuple:
+    """Stored fields a decrypted credential depends on"""
+    return (
+        snmp_cred.version,
+        snmp_cred.community_encrypted,
+        snmp_cred.username,
+        snmp_cred.auth_protocol,
+        snmp_cred.auth_key_encrypted,
+        snmp_cred.priv_protocol,
+        snmp_cred.priv_key_encrypted,
+        snmp_cred.security_level,
+    )
+
+
+@dataclass
+class _CacheEntry:
+    credentials: SNMPCredentialData
+    fingerprint: Tuple
+    expires_at: float
+
+
+class CredentialService:
+    """
+    Bulk-loading, caching access to decrypted SNMP credentials
+
+    Cached SNMPCredentialData objects are shared between callers and must not
+    be modified.
+    """
+
+    def __init__(
+        self,
+        ttl: float = CREDENTIAL_CACHE_TTL,
+        max_size: int = CREDENTIAL_CACHE_SIZE,
+        config_check_interval: float = CONFIG_CHECK_INTERVAL,
+    ):
+        """
+        Initialize service
+
+        Args:
+            ttl: Seconds a decrypted credential is served without re-reading the database
+            max_size: Maximum cached devices (least recently used are evicted)
+            config_check_interval: Minimum seconds between config version checks
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.config_check_interval = config_check_interval
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._version_checked_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.decryptions = 0
+
+    @contextmanager
+    def _session(self, db=None) -> Iterator[Any]:
+        if db is not None:
+            yield db
+            return
+
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def _sync_config_version(self, now: float):
+        """Drop all entries if another process changed the monitoring configuration"""
+        if now - self._version_checked_at < self.config_check_interval:
+            return
+        self._version_checked_at = now
+
+        version = get_config_version()
+        if version is None:
+            return
+        if self._version is not None and version != self._version:
+            self._entries.clear()
+        self._version = version
+
+    def _lookup(self, device_id: str, now: float) -> Optional[SNMPCredentialData]:
+        entry = self._entries.get(device_id)
+        if entry is None or entry.expires_at <= now:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(device_id)
+        self.hits += 1
+        return entry.credentials
+
+    def _store(self, snmp_cred: SNMPCredential, now: float) -> SNMPCredentialData:
+        device_id = str(snmp_cred.device_id)
+        fingerprint = _fingerprint(snmp_cred)
+
+        entry = self._entries.get(device_id)
+        if entry is not None and entry.fingerprint == fingerprint:
+            # Unchanged since it was decrypted (possibly expired): just extend it
+            entry.expires_at = now + self.ttl
+            self._entries.move_to_end(device_id)
+            return entry.credentials
+
+        credentials = build_credential_data(snmp_cred)
+        self.decryptions += 1
+
+        self._entries[device_id] = _CacheEntry(credentials, fingerprint, now + self.ttl)
+        self._entries.move_to_end(device_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+        return credentials
+
+    def from_model(self, snmp_cred: SNMPCredential) -> SNMPCredentialData:
+        """
+        Get decrypted credentials for an already loaded row, decrypting only if it changed
+
+        Args:
+            snmp_cred: SNMPCredential database object
+
+        Returns:
+            SNMPCredentialData object
+        """
+        with self._lock:
+            return self._store(snmp_cred, time.monotonic())
+
+    def get(self, device_id: Any, db=None) -> Optional[SNMPCredentialData]:
+        """
+        Get decrypted credentials of one device
+
+        Args:
+            device_id: Device UUID (str or uuid.UUID)
+            db: Optional database session to use on a cache miss
+
+        Returns:
+            SNMPCredentialData or None if the device has no credentials
+        """
+        key = str(device_id)
+        with self._lock:
+            now = time.monotonic()
+            self._sync_config_version(now)
+            credentials = self._lookup(key, now)
+            if credentials is not None:
+                return credentials
+
+        with self._session(db) as session:
+            snmp_cred = session.query(SNMPCredential).filter(SNMPCredential.device_id == device_id).first()
+            if snmp_cred is None:
+                return None
+            return self.from_model(snmp_cred)
+
+    def get_many(self, device_ids: Iterable[Any], db=None) -> Dict[str, SNMPCredentialData]:
+        """
+        Get decrypted credentials of many devices, loading all misses in one query
+
+        Devices without credentials, or whose credentials fail to decrypt, are
+        left out of the result.
+
+        Args:
+            device_ids: Device UUIDs (str or uuid.UUID)
+            db: Optional database session to use for cache misses
+
+        Returns:
+            Dictionary of device ID (str) -> SNMPCredentialData
+        """
+        result: Dict[str, SNMPCredentialData] = {}
+        missing = []
+
+        with self._lock:
+            now = time.monotonic()
+            self._sync_config_version(now)
+            for device_id in device_ids:
+                credentials = self._lookup(str(device_id), now)
+                if credentials is not None:
+                    result[str(device_id)] = credentials
+                else:
+                    missing.append(device_id)
+
+        if missing:
+            with self._session(db) as session:
+                rows = session.query(SNMPCredential).filter(SNMPCredential.device_id.in_(missing)).all()
+                result.update(self._store_rows(rows))
+
+        return result
+
+    def load_all(self, db=None) -> Dict[str, SNMPCredentialData]:
+        """
+        Load the credentials of every device in one query
+
+        Args:
+            db: Optional database session
+
+        Returns:
+            Dictionary of device ID (str) -> SNMPCredentialData
+        """
+        with self._session(db) as session:
+            rows = session.query(SNMPCredential).all()
+            with self._lock:
+                self._sync_config_version(time.monotonic())
+            return self._store_rows(rows)
+
+    def _store_rows(self, rows: Iterable[SNMPCredential]) -> Dict[str, SNMPCredentialData]:
+        result = {}
+        with self._lock:
+            now = time.monotonic()
+            for snmp_cred in rows:
+                try:
+                    result[str(snmp_cred.device_id)] = self._store(snmp_cred, now)
+                except Exception as e:
+                    logger.error(f"Cannot decrypt SNMP credentials of device {snmp_cred.device_id}: {e}")
+        return result
+
+    def invalidate(self, device_id: Optional[Any] = None):
+        """
+        Drop cached credentials
+
+        Args:
+            device_id: Device UUID, or None to drop all devices
+        """
+        with self._lock:
+            if device_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(device_id), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+
+        Returns:
+            Dictionary with size, hits, misses and decryptions
+        """
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "decryptions": self.decryptions,
+        }
+
+
+# Singleton instance
+_credential_service: Optional[CredentialService] = None
+
+
+def get_credential_service() -> CredentialService:
+    """
+    Get or create CredentialService singleton
+
+    Returns:
+        CredentialService instance
+    """
+    global _credential_service
+
+    if _credential_service is None:
+        _credential_service = CredentialService()
+
+    return _credential_service
@@ -0,0 +1,767 @@
+"""
+WARD FLUX - SNMPv2c Fast Path
+
+Minimal BER codec and multiplexed UDP transport for SNMPv2c GET / GETBULK.
+
+pysnmp's general-purpose stack (message processing, dispatcher, pyasn1
+codecs) costs far more CPU per request than the few bytes on the wire need.
+For v2c polling at scale this module encodes GetRequest / GetBulkRequest PDUs
+and decodes Response PDUs directly, and sends every request of a process over
+one UDP socket per address family, matching responses to requests by
+request-id.
+
+Only what polling needs is implemented: v2c, GetRequest, GetBulkRequest and
+Response. SNMPv3 and everything else stays on pysnmp (see SNMPPoller). The
+trap receiver (monitoring/traps.py) also uses the codec to decode v1/v2c
+notifications and acknowledge informs.
+
+Enable with SNMP_BACKEND=fast.
+"""
+
+import os
+import socket
+import random
+import asyncio
+import logging
+import ipaddress
+from dataclasses import dataclass
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNMP_BACKEND = os.getenv("SNMP_BACKEND", "pysnmp")  # "pysnmp" or "fast"
+
+SNMP_VERSION_1 = 0
+SNMP_VERSION_2C = 1
+
+# ASN.1 / SNMP tags
+TAG_INTEGER = 0x02
+TAG_OCTET_STRING = 0x04
+TAG_NULL = 0x05
+TAG_OID = 0x06
+TAG_SEQUENCE = 0x30
+TAG_IP_ADDRESS = 0x40
+TAG_COUNTER32 = 0x41
+TAG_GAUGE32 = 0x42
+TAG_TIMETICKS = 0x43
+TAG_OPAQUE = 0x44
+TAG_COUNTER64 = 0x46
+TAG_NO_SUCH_OBJECT = 0x80
+TAG_NO_SUCH_INSTANCE = 0x81
+TAG_END_OF_MIB_VIEW = 0x82
+
+PDU_GET = 0xA0
+PDU_GET_NEXT = 0xA1
+PDU_RESPONSE = 0xA2
+PDU_TRAP_V1 = 0xA4
+PDU_GET_BULK = 0xA5
+PDU_INFORM = 0xA6
+PDU_TRAP_V2 = 0xA7
+
+# SNMPv2-MIB notification varbinds
+SYS_UPTIME_OID = (1, 3, 6, 1, 2, 1, 1, 3, 0)
+SNMP_TRAP_OID = (1, 3, 6, 1, 6, 3, 1, 1, 4, 1, 0)
+
+# SNMPv1 generic-trap -> SNMPv2 snmpTrapOID (RFC 3584 3.1)
+V1_GENERIC_TRAP_OIDS = {
+    0: (1, 3, 6, 1, 6, 3, 1, 1, 5, 1),  # coldStart
+    1: (1, 3, 6, 1, 6, 3, 1, 1, 5, 2),  # warmStart
+    2: (1, 3, 6, 1, 6, 3, 1, 1, 5, 3),  # linkDown
+    3: (1, 3, 6, 1, 6, 3, 1, 1, 5, 4),  # linkUp
+    4: (1, 3, 6, 1, 6, 3, 1, 1, 5, 5),  # authenticationFailure
+    5: (1, 3, 6, 1, 6, 3, 1, 1, 5, 6),  # egpNeighborLoss
+}
+ENTERPRISE_SPECIFIC_TRAP = 6
+
+# Application tag -> value type, matching SNMPPoller._parse_value
+UNSIGNED_TYPES = {
+    TAG_COUNTER32: "counter32",
+    TAG_GAUGE32: "gauge",
+    TAG_TIMETICKS: "timeticks",
+    TAG_COUNTER64: "counter64",
+}
+
+EXCEPTION_TYPES = {
+    TAG_NO_SUCH_OBJECT: "noSuchObject",
+    TAG_NO_SUCH_INSTANCE: "noSuchInstance",
+    TAG_END_OF_MIB_VIEW: "endOfMibView",
+}
+
+# RFC 3416 error-status names
+ERROR_STATUS_NAMES = (
+    "noError", "tooBig", "noSuchName", "badValue", "readOnly", "genErr", "noAccess",
+    "wrongType", "wrongLength", "wrongEncoding", "wrongValue", "noCreation",
+    "inconsistentValue", "resourceUnavailable", "commitFailed", "undoFailed",
+    "authorizationError", "notWritable", "inconsistentName",
+)
+
+MAX_REQUEST_ID = 2 ** 31 - 1
+
+
+class SNMPDecodeError(ValueError):
+    """Raised for malformed or unsupported SNMP messages"""
+
+
+# ============================================
+# BER Encoding
+# ============================================
+
+def _encode_length(length: int) -> bytes:
+    if length < 0x80:
+        return bytes((length,))
+    body = length.to_bytes((length.bit_length() + 7) // 8, "big")
+    return bytes((0x80 | len(body),)) + body
+
+
+def _encode_tlv(tag: int, body: bytes) -> bytes:
+    return bytes((tag,)) + _encode_length(len(body)) + body
+
+
+def encode_integer(value: int, tag: int = TAG_INTEGER) -> bytes:
+    """Encode a signed INTEGER in minimal two's complement"""
+    size = (value.bit_length() if value >= 0 else (~value).bit_length()) // 8 + 1
+    return _encode_tlv(tag, value.to_bytes(size, "big", signed=True))
+
+
+def encode_oid(oid: str) -> bytes:
+    """
+    Encode an OBJECT IDENTIFIER
+
+    Args:
+        oid: Dotted OID string (leading dot allowed)
+
+    Returns:
+        BER-encoded OID
+    """
+    arcs = [int(arc) for arc in oid.strip(".").split(".")]
+    if len(arcs) < 2 or arcs[0] > 2 or (arcs[0] < 2 and arcs[1] > 39):
+        raise ValueError(f"Invalid OID: {oid}")
+
+    body = bytearray()
+    for arc in [arcs[0] * 40 + arcs[1]] + arcs[2:]:
+        if arc < 0:
+            raise ValueError(f"Invalid OID: {oid}")
+        chunk = [arc & 0x7F]
+        arc >>= 7
+        while arc:
+            chunk.append(0x80 | (arc & 0x7F))
+            arc >>= 7
+        body.extend(reversed(chunk))
+
+    return _encode_tlv(TAG_OID, bytes(body))
+
+
+def encode_request(
+    request_id: int,
+    community: str,
+    oids: List[str],
+    pdu_type: int = PDU_GET,
+    non_repeaters: int = 0,
+    max_repetitions: int = 0,
+) -> bytes:
+    """
+    Encode an SNMPv2c request message
+
+    Args:
+        request_id: PDU request-id
+        community: Community string
+        oids: OIDs to request (values are sent as NULL)
+        pdu_type: PDU_GET, PDU_GET_NEXT or PDU_GET_BULK
+        non_repeaters: GETBULK non-repeaters
+        max_repetitions: GETBULK max-repetitions
+
+    Returns:
+        Encoded message ready to send
+    """
+    null = bytes((TAG_NULL, 0))
+    var_binds = b"".join(_encode_tlv(TAG_SEQUENCE, encode_oid(oid) + null) for oid in oids)
+
+    if pdu_type == PDU_GET_BULK:
+        fields = encode_integer(non_repeaters) + encode_integer(max_repetitions)
+    else:
+        fields = encode_integer(0) + encode_integer(0)  # error-status, error-index
+
+    pdu = _encode_tlv(pdu_type, encode_integer(request_id) + fields + _encode_tlv(TAG_SEQUENCE, var_binds))
+    message = encode_integer(SNMP_VERSION_2C) + _encode_tlv(TAG_OCTET_STRING, community.encode()) + pdu
+    return _encode_tlv(TAG_SEQUENCE, message)
+
+
+# ============================================
+# BER Decoding
+# ============================================
+
+class DecodedValue(NamedTuple):
+    """A decoded varbind value in the (value, value_type) form of SNMPPoller._parse_value"""
+
+    value: Any
+    value_type: str
+
+
+class Response(NamedTuple):
+    """A decoded SNMPv2c Response PDU"""
+
+    request_id: int
+    community: str
+    error_status: int
+    error_index: int
+    var_binds: List[Tuple[Tuple[int, ...], DecodedValue]]
+
+
+class Trap(NamedTuple):
+    """A decoded SNMPv1 Trap, SNMPv2 Trap or InformRequest, normalized to SNMPv2 form"""
+
+    version: int  # SNMP_VERSION_1 or SNMP_VERSION_2C
+    community: str
+    pdu_type: int
+    request_id: int  # 0 for v1 traps
+    trap_oid: Tuple[int, ...]
+    uptime: Optional[int]
+    agent_addr: Optional[str]  # v1 agent-addr field
+    var_binds: List[Tuple[Tuple[int, ...], DecodedValue]]  # without sysUpTime.0 / snmpTrapOID.0
+    raw_var_binds: List[Tuple[Tuple[int, ...], int, bytes]]
+
+
+class Request(NamedTuple):
+    """A decoded SNMPv2c request PDU"""
+
+    request_id: int
+    community: str
+    pdu_type: int
+    non_repeaters: int
+    max_repetitions: int
+    oids: List[Tuple[int, ...]]
+
+
+def _read_tlv(data: bytes, offset: int) -> Tuple[int, int, int]:
+    """
+    Read a tag and length
+
+    Returns:
+        Tuple of (tag, value start offset, value end offset)
+    """
+    try:
+        tag = data[offset]
+        length = data[offset + 1]
+    except IndexError:
+        raise SNMPDecodeError("Truncated message")
+
+    offset += 2
+    if length & 0x80:
+        size = length & 0x7F
+        if size == 0 or size > 4:
+            raise SNMPDecodeError("Unsupported length encoding")
+        length = int.from_bytes(data[offset:offset + size], "big")
+        offset += size
+
+    end = offset + length
+    if end > len(data):
+        raise SNMPDecodeError("Truncated message")
+
+    return tag, offset, end
+
+
+def _expect(data: bytes, offset: int, tag: int) -> Tuple[int, int]:
+    actual, start, end = _read_tlv(data, offset)
+    if actual != tag:
+        raise SNMPDecodeError(f"Expected tag 0x{tag:02x}, got 0x{actual:02x}")
+    return start, end
+
+
+def _decode_int(data: bytes, offset: int) -> Tuple[int, int]:
+    start, end = _expect(data, offset, TAG_INTEGER)
+    return int.from_bytes(data[start:end], "big", signed=True), end
+
+
+def decode_oid(body: bytes) -> Tuple[int, ...]:
+    """Decode the content octets of an OBJECT IDENTIFIER"""
+    arcs = []
+    arc = 0
+    for byte in body:
+        arc = (arc << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            arcs.append(arc)
+            arc = 0
+
+    if not arcs:
+        raise SNMPDecodeError("Empty OID")
+
+    first = arcs[0]
+    if first < 40:
+        head = (0, first)
+    elif first < 80:
+        head = (1, first - 40)
+    else:
+        head = (2, first - 80)
+
+    return head + tuple(arcs[1:])
+
+
+def _decode_value(tag: int, body: bytes) -> DecodedValue:
+    if tag == TAG_INTEGER:
+        return DecodedValue(int.from_bytes(body, "big", signed=True), "integer")
+    if tag in UNSIGNED_TYPES:
+        return DecodedValue(int.from_bytes(body, "big"), UNSIGNED_TYPES[tag])
+    if tag in (TAG_OCTET_STRING, TAG_OPAQUE):
+        # Same decoding as pyasn1 OctetString.__str__ (iso-8859-1 never fails)
+        return DecodedValue(body.decode("iso-8859-1"), "string")
+    if tag == TAG_IP_ADDRESS:
+        return DecodedValue(".".join(str(octet) for octet in body), "string")
+    if tag == TAG_OID:
+        return DecodedValue(".".join(str(arc) for arc in decode_oid(body)), "oid")
+    if tag in EXCEPTION_TYPES:
+        return DecodedValue(None, EXCEPTION_TYPES[tag])
+    if tag == TAG_NULL:
+        return DecodedValue("", "unknown")
+    return DecodedValue(body.hex(), "hex")
+
+
+def _decode_message(data: bytes) -> Tuple[str, int, int, int, int, List[Tuple[Tuple[int, ...], int, bytes]]]:
+    """
+    Decode an SNMPv2c message down to its raw varbinds
+
+    Returns:
+        Tuple of (community, pdu_type, request_id, second field, third field,
+        [(oid, value tag, value bytes)])
+    """
+    start, end = _expect(data, 0, TAG_SEQUENCE)
+
+    version, offset = _decode_int(data, start)
+    if version != SNMP_VERSION_2C:
+        raise SNMPDecodeError(f"Unsupported SNMP version {version}")
+
+    community_start, offset = _expect(data, offset, TAG_OCTET_STRING)
+    community = data[community_start:offset].decode("iso-8859-1")
+
+    pdu_type, offset, pdu_end = _read_tlv(data, offset)
+    request_id, offset = _decode_int(data, offset)
+    field2, offset = _decode_int(data, offset)
+    field3, offset = _decode_int(data, offset)
+
+    return community, pdu_type, request_id, field2, field3, _decode_var_binds(data, offset)
+
+
+def _decode_var_binds(data: bytes, offset: int) -> List[Tuple[Tuple[int, ...], int, bytes]]:
+    """Decode a VarBindList into (oid, value tag, value bytes) tuples"""
+    offset, list_end = _expect(data, offset, TAG_SEQUENCE)
+    var_binds = []
+    while offset < list_end:
+        offset, bind_end = _expect(data, offset, TAG_SEQUENCE)
+        oid_start, offset = _expect(data, offset, TAG_OID)
+        oid = decode_oid(data[oid_start:offset])
+        tag, value_start, offset = _read_tlv(data, offset)
+        var_binds.append((oid, tag, data[value_start:offset]))
+        offset = bind_end
+
+    return var_binds
+
+
+def decode_response(data: bytes) -> Response:
+    """
+    Decode an SNMPv2c Response message
+
+    Args:
+        data: Received datagram
+
+    Returns:
+        Response tuple
+
+    Raises:
+        SNMPDecodeError: For malformed messages, other SNMP versions or non-Response PDUs
+    """
+    community, pdu_type, request_id, error_status, error_index, raw = _decode_message(data)
+    if pdu_type != PDU_RESPONSE:
+        raise SNMPDecodeError(f"Unexpected PDU type 0x{pdu_type:02x}")
+
+    var_binds = [(oid, _decode_value(tag, body)) for oid, tag, body in raw]
+    return Response(request_id, community, error_status, error_index, var_binds)
+
+
+def decode_request(data: bytes) -> Request:
+    """
+    Decode an SNMPv2c GetRequest / GetNextRequest / GetBulkRequest message
+
+    Used by the agent simulator (monitoring.benchmarks.simulator).
+
+    Args:
+        data: Received datagram
+
+    Returns:
+        Request tuple (non_repeaters / max_repetitions are 0 for non-bulk PDUs)
+
+    Raises:
+        SNMPDecodeError: For malformed messages or unsupported PDUs
+    """
+    community, pdu_type, request_id, field2, field3, raw = _decode_message(data)
+    if pdu_type not in (PDU_GET, PDU_GET_NEXT, PDU_GET_BULK):
+        raise SNMPDecodeError(f"Unsupported PDU type 0x{pdu_type:02x}")
+
+    if pdu_type != PDU_GET_BULK:
+        field2 = field3 = 0
+
+    return Request(request_id, community, pdu_type, field2, field3, [oid for oid, _, _ in raw])
+
+
+def decode_trap(data: bytes) -> Trap:
+    """
+    Decode an SNMPv1 Trap, SNMPv2c Trap or SNMPv2c InformRequest message
+
+    v1 traps are translated to SNMPv2 form (RFC 3584): the generic/specific
+    trap fields become trap_oid and time-stamp becomes uptime.
+
+    Args:
+        data: Received datagram
+
+    Returns:
+        Trap tuple
+
+    Raises:
+        SNMPDecodeError: For malformed messages and anything that is not a notification
+    """
+    start, end = _expect(data, 0, TAG_SEQUENCE)
+
+    version, offset = _decode_int(data, start)
+    if version not in (SNMP_VERSION_1, SNMP_VERSION_2C):
+        raise SNMPDecodeError(f"Unsupported SNMP version {version}")
+
+    community_start, offset = _expect(data, offset, TAG_OCTET_STRING)
+    community = data[community_start:offset].decode("iso-8859-1")
+
+    pdu_type, offset, pdu_end = _read_tlv(data, offset)
+
+    if version == SNMP_VERSION_1 and pdu_type == PDU_TRAP_V1:
+        enterprise_start, offset = _expect(data, offset, TAG_OID)
+        enterprise = decode_oid(data[enterprise_start:offset])
+        addr_start, offset = _expect(data, offset, TAG_IP_ADDRESS)
+        agent_addr = ".".join(str(octet) for octet in data[addr_start:offset])
+        generic, offset = _decode_int(data, offset)
+        specific, offset = _decode_int(data, offset)
+        stamp_start, offset = _expect(data, offset, TAG_TIMETICKS)
+        uptime = int.from_bytes(data[stamp_start:offset], "big")
+        raw = _decode_var_binds(data, offset)
+
+        if generic == ENTERPRISE_SPECIFIC_TRAP:
+            trap_oid = enterprise + (0, specific)
+        elif generic in V1_GENERIC_TRAP_OIDS:
+            trap_oid = V1_GENERIC_TRAP_OIDS[generic]
+        else:
+            raise SNMPDecodeError(f"Unknown generic-trap {generic}")
+
+        var_binds = [(oid, _decode_value(tag, body)) for oid, tag, body in raw]
+        return Trap(version, community, pdu_type, 0, trap_oid, uptime, agent_addr, var_binds, raw)
+
+    if version == SNMP_VERSION_2C and pdu_type in (PDU_TRAP_V2, PDU_INFORM):
+        request_id, offset = _decode_int(data, offset)
+        _, offset = _decode_int(data, offset)
+        _, offset = _decode_int(data, offset)
+        raw = _decode_var_binds(data, offset)
+
+        uptime = None
+        trap_oid = None
+        var_binds = []
+        for oid, tag, body in raw:
+            value = _decode_value(tag, body)
+            if oid == SYS_UPTIME_OID and tag == TAG_TIMETICKS:
+                uptime = value.value
+            elif oid == SNMP_TRAP_OID and tag == TAG_OID:
+                trap_oid = decode_oid(body)
+            else:
+                var_binds.append((oid, value))
+
+        if trap_oid is None:
+            raise SNMPDecodeError("Notification without snmpTrapOID.0")
+
+        return Trap(version, community, pdu_type, request_id, trap_oid, uptime, None, var_binds, raw)
+
+    raise SNMPDecodeError(f"Not a notification: version {version}, PDU type 0x{pdu_type:02x}")
+
+
+def encode_inform_response(trap: Trap) -> bytes:
+    """
+    Encode the Response acknowledging an InformRequest (varbinds are echoed back)
+
+    Args:
+        trap: Decoded InformRequest
+
+    Returns:
+        Encoded message ready to send
+    """
+    var_binds = [
+        (encode_oid(".".join(map(str, oid))), _encode_tlv(tag, body)) for oid, tag, body in trap.raw_var_binds
+    ]
+    return encode_response(trap.request_id, trap.community, var_binds)
+
+
+def encode_value(tag: int, value: Any) -> bytes:
+    """
+    Encode a varbind value
+
+    Args:
+        tag: Value tag (TAG_INTEGER, TAG_COUNTER32, TAG_OCTET_STRING, ...)
+        value: int for numeric tags, str/bytes for strings, dotted str for OIDs
+               and IP addresses, ignored for NULL and exception tags
+
+    Returns:
+        BER-encoded value
+    """
+    if tag == TAG_INTEGER or tag in UNSIGNED_TYPES:
+        return encode_integer(int(value), tag)
+    if tag in (TAG_OCTET_STRING, TAG_OPAQUE):
+        return _encode_tlv(tag, value if isinstance(value, bytes) else str(value).encode())
+    if tag == TAG_IP_ADDRESS:
+        return _encode_tlv(tag, bytes(int(octet) for octet in str(value).split(".")))
+    if tag == TAG_OID:
+        return encode_oid(str(value))
+    return bytes((tag, 0))
+
+
+def encode_response(
+    request_id: int,
+    community: str,
+    var_binds: List[Tuple[Any, bytes]],
+    error_status: int = 0,
+    error_index: int = 0,
+) -> bytes:
+    """
+    Encode an SNMPv2c Response message
+
+    Args:
+        request_id: request-id of the request being answered
+        community: Community string
+        var_binds: List of (dotted OID or encode_oid() bytes, encode_value() bytes)
+        error_status: RFC 3416 error-status
+        error_index: 1-based index of the failing varbind
+
+    Returns:
+        Encoded message ready to send
+    """
+    body = b"".join(
+        _encode_tlv(TAG_SEQUENCE, (oid if isinstance(oid, bytes) else encode_oid(oid)) + value) for oid, value in var_binds
+    )
+    pdu = _encode_tlv(
+        PDU_RESPONSE,
+        encode_integer(request_id) + encode_integer(error_status) + encode_integer(error_index) + _encode_tlv(TAG_SEQUENCE, body),
+    )
+    message = encode_integer(SNMP_VERSION_2C) + _encode_tlv(TAG_OCTET_STRING, community.encode()) + pdu
+    return _encode_tlv(TAG_SEQUENCE, message)
+
+
+def error_status_name(error_status: int) -> str:
+    """Get the RFC 3416 name of an error-status value"""
+    if 0 <= error_status < len(ERROR_STATUS_NAMES):
+        return ERROR_STATUS_NAMES[error_status]
+    return f"error-status {error_status}"
+
+
+class ObjectName:
+    """Decoded OID with the parts of the pysnmp ObjectName interface SNMPPoller uses"""
+
+    __slots__ = ("arcs",)
+
+    def __init__(self, arcs: Tuple[int, ...]):
+        self.arcs = arcs
+
+    def asTuple(self) -> Tuple[int, ...]:
+        return self.arcs
+
+    def __str__(self) -> str:
+        return ".".join(str(arc) for arc in self.arcs)
+
+    def __repr__(self) -> str:
+        return f"ObjectName('{self}')"
+
+
+class ErrorStatus(int):
+    """error-status with the pysnmp prettyPrint() interface"""
+
+    def prettyPrint(self) -> str:
+        return error_status_name(self)
+
+
+# ============================================
+# Transport
+# ============================================
+
+@dataclass
+class FastTarget:
+    """Fast-path equivalent of a pysnmp UdpTransportTarget plus v2c community"""
+
+    ip: str
+    port: int
+    community: str
+    timeout: float = 5  # seconds per attempt
+    retries: int = 2
+
+
+class SNMPTimeout(Exception):
+    """No response after all retries"""
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, transport: "FastTransport"):
+        self.owner = transport
+
+    def datagram_received(self, data: bytes, addr):
+        self.owner._on_datagram(data, addr)
+
+    def error_received(self, exc):
+        logger.debug(f"SNMP fast path socket error: {exc}")
+
+
+class FastTransport:
+    """
+    Sends v2c requests over one shared UDP socket per address family
+
+    Responses are matched to waiting requests by request-id and source address;
+    anything else (late, duplicate, spoofed or malformed datagrams) is dropped.
+    """
+
+    def __init__(self):
+        self._sockets: Dict[int, asyncio.DatagramTransport] = {}
+        self._pending: Dict[int, Tuple[asyncio.Future, Tuple[str, int]]] = {}
+        self._next_id = random.randint(1, MAX_REQUEST_ID)
+        self.requests = 0
+        self.timeouts = 0
+        self.dropped = 0
+
+    async def _socket_for(self, family: int) -> asyncio.DatagramTransport:
+        transport = self._sockets.get(family)
+        if transport is None or transport.is_closing():
+            loop = asyncio.get_running_loop()
+            transport, _ = await loop.create_datagram_endpoint(lambda: _DatagramProtocol(self), family=family)
+            self._sockets[family] = transport
+        return transport
+
+    def _allocate_id(self) -> int:
+        while True:
+            self._next_id = self._next_id % MAX_REQUEST_ID + 1
+            if self._next_id not in self._pending:
+                return self._next_id
+
+    async def _resolve(self, ip: str, port: int) -> Tuple[int, Tuple[str, int]]:
+        try:
+            address = ipaddress.ip_address(ip)
+            family = socket.AF_INET6 if address.version == 6 else socket.AF_INET
+            return family, (str(address), port)
+        except ValueError:
+            infos = await asyncio.get_running_loop().getaddrinfo(ip, port, type=socket.SOCK_DGRAM)
+            family, _, _, _, sockaddr = infos[0]
+            return family, (sockaddr[0], port)
+
+    def _on_datagram(self, data: bytes, addr):
+        try:
+            response = decode_response(data)
+        except SNMPDecodeError as e:
+            self.dropped += 1
+            logger.debug(f"Dropping undecodable SNMP datagram from {addr}: {e}")
+            return
+
+        entry = self._pending.get(response.request_id)
+        if entry is None or entry[1] != (addr[0], addr[1]) or entry[0].done():
+            self.dropped += 1
+            return
+
+        entry[0].set_result(response)
+
+    async def request(
+        self,
+        target: FastTarget,
+        oids: List[str],
+        pdu_type: int = PDU_GET,
+        non_repeaters: int = 0,
+        max_repetitions: int = 0,
+    ) -> Response:
+        """
+        Send a request and wait for the matching response
+
+        Retries resend the same request-id, so a late answer to an earlier
+        attempt is accepted.
+
+        Args:
+            target: Target device and community
+            oids: OIDs to request
+            pdu_type: PDU_GET or PDU_GET_BULK
+            non_repeaters: GETBULK non-repeaters
+            max_repetitions: GETBULK max-repetitions
+
+        Returns:
+            Decoded response
+
+        Raises:
+            SNMPTimeout: If no response arrived after all retries
+        """
+        response, _ = await self.exchange(target, oids, pdu_type, non_repeaters, max_repetitions)
+        return response
+
+    async def exchange(
+        self,
+        target: FastTarget,
+        oids: List[str],
+        pdu_type: int = PDU_GET,
+        non_repeaters: int = 0,
+        max_repetitions: int = 0,
+        timeout: Optional[float] = None,
+    ) -> Tuple[Response, int]:
+        """
+        Like request(), also reporting which attempt the response arrived in
+
+        Args:
+            target: Target device and community
+            oids: OIDs to request
+            pdu_type: PDU_GET or PDU_GET_BULK
+            non_repeaters: GETBULK non-repeaters
+            max_repetitions: GETBULK max-repetitions
+            timeout: Per-attempt timeout in seconds (defaults to target.timeout)
+
+        Returns:
+            (decoded response, zero-based attempt number)
+
+        Raises:
+            SNMPTimeout: If no response arrived after all retries
+        """
+        family, addr = await self._resolve(target.ip, target.port)
+        sock = await self._socket_for(family)
+
+        request_id = self._allocate_id()
+        packet = encode_request(request_id, target.community, oids, pdu_type, non_repeaters, max_repetitions)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = (future, addr)
+        self.requests += 1
+
+        try:
+            for attempt in range(target.retries + 1):
+                sock.sendto(packet, addr)
+                try:
+                    response = await asyncio.wait_for(asyncio.shield(future), timeout or target.timeout)
+                    return response, attempt
+                except asyncio.TimeoutError:
+                    continue
+        finally:
+            self._pending.pop(request_id, None)
+            future.cancel()
+
+        self.timeouts += 1
+        raise SNMPTimeout(f"No SNMP response from {target.ip}:{target.port}")
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get transport statistics
+
+        Returns:
+            Dictionary with request, timeout, dropped and in-flight counts
+        """
+        return {
+            "sockets": len(self._sockets),
+            "in_flight": len(self._pending),
+            "requests": self.requests,
+            "timeouts": self.timeouts,
+            "dropped": self.dropped,
+        }
+
+    def close(self):
+        """Close the sockets and fail all waiting requests"""
+        for future, _ in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        for transport in self._sockets.values():
+            transport.close()
+        self._sockets.clear()
@@ -0,0 +1,231 @@
+"""
+WARD FLUX - SNMP Device Health Tracking
+
+Per-device adaptive timeouts and dead-device circuit breaker for SNMPPoller.
+
+Timeouts follow the TCP retransmission-timeout estimator (RFC 6298): a
+smoothed RTT and RTT variance are kept per device and the timeout is
+SRTT + 4 * RTTVAR, clamped to [min_timeout, max_timeout].
+
+The circuit breaker opens after `failure_threshold` consecutive timeouts.
+While open, requests to the device fail immediately; once the backoff has
+elapsed a single probe request is let through (half-open). A successful
+probe closes the breaker, a failed one re-opens it with doubled backoff.
+"""
+
+import os
+import time
+import logging
+from dataclasses import dataclass, asdict
+from typing import Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+SNMP_MIN_TIMEOUT = float(os.getenv("SNMP_MIN_TIMEOUT", "0.5"))  # seconds
+SNMP_MAX_TIMEOUT = float(os.getenv("SNMP_MAX_TIMEOUT", "5"))  # seconds
+SNMP_BREAKER_THRESHOLD = int(os.getenv("SNMP_BREAKER_THRESHOLD", "3"))  # consecutive failures
+SNMP_BREAKER_BASE_BACKOFF = float(os.getenv("SNMP_BREAKER_BASE_BACKOFF", "30"))  # seconds
+SNMP_BREAKER_MAX_BACKOFF = float(os.getenv("SNMP_BREAKER_MAX_BACKOFF", "900"))  # seconds
+
+
+@dataclass
+class DeviceHealth:
+    """Health state of one SNMP target"""
+
+    srtt: Optional[float] = None  # smoothed RTT, seconds
+    rttvar: float = 0.0
+    consecutive_failures: int = 0
+    state: str = BREAKER_CLOSED
+    backoff: float = 0.0
+    open_until: float = 0.0
+    probe_in_flight: bool = False
+    requests: int = 0
+    failures: int = 0
+    skipped: int = 0
+    last_success: Optional[float] = None
+    last_failure: Optional[float] = None
+    last_error: Optional[str] = None
+
+
+class DeviceHealthTracker:
+    """
+    Tracks RTT and breaker state per SNMP target
+
+    A failure_threshold of 0 disables the circuit breaker (adaptive timeouts still apply).
+    """
+
+    def __init__(
+        self,
+        min_timeout: float = SNMP_MIN_TIMEOUT,
+        max_timeout: float = SNMP_MAX_TIMEOUT,
+        failure_threshold: int = SNMP_BREAKER_THRESHOLD,
+        base_backoff: float = SNMP_BREAKER_BASE_BACKOFF,
+        max_backoff: float = SNMP_BREAKER_MAX_BACKOFF,
+        alpha: float = 0.125,
+        beta: float = 0.25,
+    ):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.alpha = alpha
+        self.beta = beta
+        self._devices: Dict[Hashable, DeviceHealth] = {}
+
+    def _get(self, key: Hashable) -> DeviceHealth:
+        health = self._devices.get(key)
+        if health is None:
+            health = self._devices[key] = DeviceHealth()
+        return health
+
+    def timeout_for(self, key: Hashable) -> float:
+        """
+        Get the adaptive timeout for a target
+
+        Args:
+            key: Target key, e.g. (ip, port)
+
+        Returns:
+            Timeout in seconds (max_timeout until an RTT has been observed)
+        """
+        health = self._devices.get(key)
+        if health is None or health.srtt is None:
+            return self.max_timeout
+
+        return min(self.max_timeout, max(self.min_timeout, health.srtt + 4 * health.rttvar))
+
+    def allow(self, key: Hashable) -> bool:
+        """
+        Check whether a request may be sent to a target
+
+        Args:
+            key: Target key
+
+        Returns:
+            True if the breaker is closed, or if this request is the half-open probe
+        """
+        health = self._get(key)
+
+        if health.state == BREAKER_CLOSED:
+            return True
+
+        if health.state == BREAKER_OPEN and time.time() >= health.open_until:
+            health.state = BREAKER_HALF_OPEN
+
+        if health.state == BREAKER_HALF_OPEN and not health.probe_in_flight:
+            health.probe_in_flight = True
+            return True
+
+        health.skipped += 1
+        return False
+
+    def record_success(self, key: Hashable, rtt: Optional[float]):
+        """
+        Record a response and update the RTT estimate
+
+        Args:
+            key: Target key
+            rtt: Observed round-trip time in seconds (None if the answer came after a retry)
+        """
+        health = self._get(key)
+        health.requests += 1
+        health.last_success = time.time()
+        health.consecutive_failures = 0
+        health.probe_in_flight = False
+
+        if rtt is not None and health.srtt is None:
+            health.srtt = rtt
+            health.rttvar = rtt / 2
+        elif rtt is not None:
+            health.rttvar = (1 - self.beta) * health.rttvar + self.beta * abs(health.srtt - rtt)
+            health.srtt = (1 - self.alpha) * health.srtt + self.alpha * rtt
+
+        if health.state != BREAKER_CLOSED:
+            logger.info(f"SNMP target {key} recovered, closing circuit breaker")
+            health.state = BREAKER_CLOSED
+            health.backoff = 0.0
+
+    def record_failure(self, key: Hashable, error: str):
+        """
+        Record a timeout/transport failure
+
+        Args:
+            key: Target key
+            error: Error description
+        """
+        health = self._get(key)
+        health.requests += 1
+        health.failures += 1
+        health.consecutive_failures += 1
+        health.last_failure = time.time()
+        health.last_error = error
+        health.probe_in_flight = False
+
+        if health.state == BREAKER_HALF_OPEN:
+            self._open(key, health, min(self.max_backoff, health.backoff * 2))
+        elif health.state == BREAKER_CLOSED and self.failure_threshold and health.consecutive_failures >= self.failure_threshold:
+            self._open(key, health, self.base_backoff)
+
+    def release(self, key: Hashable):
+        """
+        End a half-open probe without recording an outcome
+
+        Called once a request finishes however it ended (cancelled, failed before
+        sending, or answered with a non-timeout error), so the breaker can let
+        another probe through.
+
+        Args:
+            key: Target key
+        """
+        health = self._devices.get(key)
+        if health is not None:
+            health.probe_in_flight = False
+
+    def _open(self, key: Hashable, health: DeviceHealth, backoff: float):
+        health.state = BREAKER_OPEN
+        health.backoff = backoff
+        health.open_until = time.time() + backoff
+        logger.warning(
+            f"SNMP target {key} marked down after {health.consecutive_failures} consecutive failures, "
+            f"next probe in {backoff:.0f}s"
+        )
+
+    def get_stats(self, only_unhealthy: bool = False) -> List[Dict]:
+        """
+        Get per-target health statistics
+
+        Args:
+            only_unhealthy: Only include targets whose breaker is not closed
+
+        Returns:
+            List of dictionaries (target, state, RTT, timeout, counters)
+        """
+        stats = []
+        for key, health in self._devices.items():
+            if only_unhealthy and health.state == BREAKER_CLOSED:
+                continue
+
+            entry = asdict(health)
+            entry.pop("probe_in_flight")
+            entry["target"] = ":".join(str(part) for part in key) if isinstance(key, tuple) else str(key)
+            entry["timeout"] = round(self.timeout_for(key), 3)
+            stats.append(entry)
+
+        return stats
+
+    def get_summary(self) -> Dict[str, int]:
+        """
+        Get breaker state counts
+
+        Returns:
+            Dictionary with number of tracked, closed, open and half-open targets
+        """
+        summary = {"tracked": len(self._devices), BREAKER_CLOSED: 0, BREAKER_OPEN: 0, BREAKER_HALF_OPEN: 0}
+        for health in self._devices.values():
+            summary[health.state] += 1
+        return summary
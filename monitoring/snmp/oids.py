@@ -12,7 +12,7 @@ Architecture:
 """
 
 import logging
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
@@ -592,6 +592,93 @@ WINDOWS_OIDS: Dict[str, OIDDefinition] = {
 }
 
 
+# ═══════════════════════════════════════════════════════════════════
+# OID PREFIX TRIE
+# Longest-prefix lookups in O(depth) for vendor detection and for
+# translating walked OIDs to (name, index)
+# ═══════════════════════════════════════════════════════════════════
+
+
+_EMPTY = object()  # Marks trie nodes that are only intermediate arcs
+
+
+def _oid_arcs(oid: str) -> List[str]:
+    return oid.strip().strip(".").split(".")
+
+
+class OIDTrie:
+    """Prefix tree keyed by OID arcs"""
+
+    __slots__ = ("_root", "size")
+
+    def __init__(self):
+        # Node: [children by arc, value or _EMPTY]
+        self._root: list = [{}, _EMPTY]
+        self.size = 0
+
+    def insert(self, oid: str, value: Any, replace: bool = False):
+        """
+        Add an OID
+
+        Args:
+            oid: Dotted OID
+            value: Value returned for this OID and OIDs below it
+            replace: Overwrite an existing value (otherwise the first insert wins)
+        """
+        node = self._root
+        for arc in _oid_arcs(oid):
+            node = node[0].setdefault(arc, [{}, _EMPTY])
+
+        if node[1] is _EMPTY:
+            self.size += 1
+        elif not replace:
+            return
+        node[1] = value
+
+    def longest_prefix(self, oid: str) -> Optional[Tuple[Any, int]]:
+        """
+        Find the longest inserted OID that is a prefix of oid (on arc boundaries)
+
+        Args:
+            oid: Dotted OID
+
+        Returns:
+            (value, number of arcs matched) or None
+        """
+        node = self._root
+        match = None
+        for depth, arc in enumerate(_oid_arcs(oid), 1):
+            node = node[0].get(arc)
+            if node is None:
+                break
+            if node[1] is not _EMPTY:
+                match = (node[1], depth)
+        return match
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def _build_vendor_trie() -> OIDTrie:
+    trie = OIDTrie()
+    for oid_prefix, vendor_name in VENDOR_DETECTION.items():
+        trie.insert(oid_prefix, vendor_name)
+    return trie
+
+
+def _build_oid_trie() -> OIDTrie:
+    trie = OIDTrie()
+    # Universal definitions first so they win over vendor tables that repeat them
+    for table in (UNIVERSAL_OIDS, CISCO_OIDS, FORTINET_OIDS, JUNIPER_OIDS, HP_OIDS, MIKROTIK_OIDS, LINUX_OIDS, WINDOWS_OIDS):
+        for name, definition in table.items():
+            trie.insert(definition.oid, (name, definition))
+    return trie
+
+
+VENDOR_TRIE = _build_vendor_trie()
+OID_TRIE = _build_oid_trie()
+
+
 # ═══════════════════════════════════════════════════════════════════
 # OID LIBRARY FUNCTIONS
 # ═══════════════════════════════════════════════════════════════════
@@ -607,15 +694,35 @@ def detect_vendor_from_oid(sys_object_id: str) -> Optional[str]:
     Returns:
         Vendor name or None if unknown
     """
-    for oid_prefix, vendor_name in VENDOR_DETECTION.items():
-        if sys_object_id.startswith(oid_prefix):
-            logger.info(f"Detected vendor: {vendor_name} (OID: {sys_object_id})")
-            return vendor_name
+    match = VENDOR_TRIE.longest_prefix(sys_object_id)
+    if match is not None:
+        vendor_name = match[0]
+        logger.info(f"Detected vendor: {vendor_name} (OID: {sys_object_id})")
+        return vendor_name
 
     logger.warning(f"Unknown vendor for sysObjectID: {sys_object_id}")
     return None
 
 
+def resolve_oid(oid: str) -> Optional[Tuple[str, str]]:
+    """
+    Translate a numeric OID (e.g. from a walk) to its library name and instance index
+
+    Args:
+        oid: Dotted OID, e.g. "1.3.6.1.2.1.2.2.1.10.3"
+
+    Returns:
+        (name, index) such as ("ifInOctets", "3"), with index "" for an exact
+        match, or None if no known OID is a prefix of it
+    """
+    match = OID_TRIE.longest_prefix(oid)
+    if match is None:
+        return None
+
+    (name, _), depth = match
+    return name, ".".join(_oid_arcs(oid)[depth:])
+
+
 def get_vendor_oids(vendor: str) -> Dict[str, OIDDefinition]:
     """
     Get vendor-specific OIDs plus universal OIDs
@@ -4,19 +4,71 @@ WARD FLUX - Async SNMP Poller
 High-performance asynchronous SNMP polling engine with multi-vendor support.
 """
 
+import os
+import time
 import logging
 import asyncio
-from typing import Dict, List, Optional, Tuple, Any
-from dataclasses import dataclass
+import weakref
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple, Any
+from dataclasses import dataclass, astuple
 from pysnmp.hlapi.asyncio import *
 from pysnmp.proto.rfc1902 import Integer, OctetString, Counter32, Counter64, Gauge32, TimeTicks
+from pysnmp.proto.rfc1905 import EndOfMibView, NoSuchObject, NoSuchInstance, endOfMibView, noSuchObject, noSuchInstance
+from pysnmp.proto import errind
+from pysnmp.entity.config import usmKeyTypeMaster
 from pyasn1.type.univ import ObjectIdentifier
 
 from monitoring.snmp.oids import detect_vendor_from_oid, get_vendor_oids, classify_device_type, OIDDefinition
 from monitoring.snmp.credentials import decrypt_credential
+from monitoring.snmp.health import DeviceHealthTracker, SNMP_BREAKER_THRESHOLD
+from monitoring.snmp.ratelimit import RateLimiter
+from monitoring.snmp.usm import get_usm_cache, SNMP_ENGINE_ID_OID, SNMP_ENGINE_BOOTS_OID
+from monitoring.snmp.fastpath import (
+    SNMP_BACKEND,
+    PDU_GET,
+    PDU_GET_BULK,
+    DecodedValue,
+    ErrorStatus,
+    FastTarget,
+    FastTransport,
+    ObjectName,
+    SNMPTimeout,
+)
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of cached (ip, port, credential) transport/auth entries
+TARGET_CACHE_SIZE = int(os.getenv("SNMP_TARGET_CACHE_SIZE", "4096"))
+
+# Default rows requested per GETBULK PDU
+DEFAULT_MAX_REPETITIONS = int(os.getenv("SNMP_MAX_REPETITIONS", "25"))
+
+# Initial varbinds per GET PDU for batched device polling (shrunk per device on tooBig)
+DEFAULT_MAX_VARBINDS = int(os.getenv("SNMP_MAX_VARBINDS", "30"))
+
+CIRCUIT_OPEN_ERROR = "Device unreachable (circuit breaker open)"
+
+# SNMPv3 error indications that mean cached engine info or keys are stale
+USM_ERRORS = (
+    errind.UnknownEngineID,
+    errind.NotInTimeWindow,
+    errind.WrongDigest,
+    errind.UnknownUserName,
+    errind.DecryptionError,
+)
+
+# Fast-path exception values -> pysnmp singletons, so callers need only one isinstance check
+FAST_EXCEPTION_VALUES = {
+    "noSuchObject": noSuchObject,
+    "noSuchInstance": noSuchInstance,
+    "endOfMibView": endOfMibView,
+}
+
+# SNMP error-status values (RFC 3416)
+ERROR_STATUS_TOO_BIG = 1
+ERROR_STATUS_NO_SUCH_NAME = 2
+
 
 @dataclass
 class SNMPCredentialData:
@@ -50,10 +102,59 @@ class SNMPPoller:
     Supports SNMPv2c and SNMPv3 with automatic vendor detection.
     """
 
-    def __init__(self):
-        """Initialize SNMP poller"""
+    def __init__(
+        self,
+        target_cache_size: int = TARGET_CACHE_SIZE,
+        circuit_breaker: bool = True,
+        backend: str = SNMP_BACKEND,
+        rate_limits: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Initialize SNMP poller
+
+        Args:
+            target_cache_size: Maximum number of cached per-target transport/auth entries
+            circuit_breaker: Skip devices after consecutive timeouts (disable for discovery,
+                             where timeouts usually mean a wrong community)
+            backend: "pysnmp", or "fast" to send v2c requests through the native
+                     fast-path codec (v3 always uses pysnmp)
+            rate_limits: RateLimiter keyword overrides (global_rate, device_concurrency,
+                         subnet_concurrency, ...); defaults come from the environment
+        """
         self.timeout = 5  # seconds
         self.retries = 2
+        self.target_cache_size = target_cache_size
+        self.backend = backend
+
+        # Global request budget and per-device/per-subnet concurrency, one limiter per event loop
+        self.rate_limits = rate_limits or {}
+        self._rate_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, RateLimiter]" = weakref.WeakKeyDictionary()
+
+        # One fast-path transport (shared UDP socket) per event loop
+        self._fast_transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, FastTransport]" = weakref.WeakKeyDictionary()
+
+        # One long-lived SnmpEngine per event loop (engines are bound to the loop they run on)
+        self._engines: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, SnmpEngine]" = weakref.WeakKeyDictionary()
+
+        # LRU cache: (ip, port, credential key) -> (auth_data, transport target)
+        self._targets: "OrderedDict[Tuple, Tuple[Any, UdpTransportTarget]]" = OrderedDict()
+        self._auth_cache: Dict[Tuple, Any] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # Learned maximum varbinds per GET PDU: (ip, port) -> count
+        self.max_varbinds = DEFAULT_MAX_VARBINDS
+        self._pdu_sizes: Dict[Tuple[str, int], int] = {}
+
+        # SNMPv3 master keys and discovered engine IDs (shared by all pollers)
+        self.usm = get_usm_cache()
+
+        # Adaptive timeouts and circuit breaker per (ip, port)
+        self.health = DeviceHealthTracker(
+            max_timeout=self.timeout,
+            failure_threshold=SNMP_BREAKER_THRESHOLD if circuit_breaker else 0,
+        )
+
         logger.info("SNMP Poller initialized")
 
     async def get(
@@ -71,18 +172,20 @@ class SNMPPoller:
         Returns:
             SNMPResult object
         """
+        if not self.health.allow((ip, port)):
+            return SNMPResult(oid=oid, value=None, value_type="error", success=False, error=CIRCUIT_OPEN_ERROR)
+
         try:
-            # Build SNMP auth data
-            auth_data = self._build_auth_data(credentials)
-            target = UdpTransportTarget((ip, port), timeout=self.timeout, retries=self.retries)
+            auth_data, target = self._get_target(ip, port, credentials)
 
             # Perform GET
-            error_indication, error_status, error_index, var_binds = await getCmd(
-                SnmpEngine(),
+            error_indication, error_status, error_index, var_binds = await self._send(
+                getCmd,
+                ip,
+                port,
                 auth_data,
                 target,
-                ContextData(),
-                ObjectType(ObjectIdentity(oid))
+                [oid]
             )
 
             if error_indication:
@@ -104,6 +207,8 @@ class SNMPPoller:
             return SNMPResult(oid=oid, value=None, value_type="none", success=False, error="No data returned")
 
         except Exception as e:
+            # _get_target can fail before _send runs; do not leave a half-open probe pending
+            self.health.release((ip, port))
             logger.error(f"SNMP GET exception for {ip} OID {oid}: {e}")
             return SNMPResult(oid=oid, value=None, value_type="error", success=False, error=str(e))
 
@@ -113,6 +218,8 @@ class SNMPPoller:
         """
         Perform SNMP WALK operation
 
+        Collects the rows produced by bulk_walk (GETBULK) into a list.
+
         Args:
             ip: Target IP address
             oid: Starting OID to walk
@@ -123,56 +230,132 @@ class SNMPPoller:
         Returns:
             List of SNMPResult objects
         """
+        results = [result async for result in self.bulk_walk(ip, oid, credentials, port, max_results=max_results)]
+
+        logger.info(f"SNMP WALK {ip} {oid}: {len(results)} results")
+        return results
+
+    async def bulk_walk(
+        self,
+        ip: str,
+        oid: str,
+        credentials: SNMPCredentialData,
+        port: int = 161,
+        max_results: int = 1000,
+        max_repetitions: int = DEFAULT_MAX_REPETITIONS,
+    ) -> AsyncIterator[SNMPResult]:
+        """
+        Walk an OID subtree with GETBULK, yielding rows as they arrive
+
+        Each round trip requests up to max_repetitions rows, capped by the number
+        of rows still allowed by max_results, so the agent is never asked for more
+        rows than will be consumed.
+
+        Args:
+            ip: Target IP address
+            oid: Root OID of the subtree to walk
+            credentials: SNMP credentials
+            port: SNMP port (default 161)
+            max_results: Maximum results to yield
+            max_repetitions: Maximum rows requested per GETBULK PDU
+
+        Yields:
+            SNMPResult objects in OID order. On failure a single error result is
+            yielded and the walk stops.
+
+        Example:
+            async for row in poller.bulk_walk(ip, "1.3.6.1.2.1.2.2.1.10", creds):
+                print(row.oid, row.value)
+        """
+        root = tuple(int(part) for part in oid.strip(".").split("."))
+        current = oid
+        last_oid: Tuple[int, ...] = root
+        yielded = 0
+
+        if not self.health.allow((ip, port)):
+            yield SNMPResult(oid=oid, value=None, value_type="error", success=False, error=CIRCUIT_OPEN_ERROR)
+            return
+
         try:
-            results = []
-            auth_data = self._build_auth_data(credentials)
-            target = UdpTransportTarget((ip, port), timeout=self.timeout, retries=self.retries)
+            auth_data, target = self._get_target(ip, port, credentials)
+
+            while yielded < max_results:
+                repetitions = max(1, min(max_repetitions, max_results - yielded))
+
+                error_indication, error_status, error_index, var_bind_table = await self._send(
+                    bulkCmd,
+                    ip,
+                    port,
+                    auth_data,
+                    target,
+                    [current],
+                    0,  # nonRepeaters
+                    repetitions,
+                )
 
-            # Perform WALK
-            async for (error_indication, error_status, error_index, var_binds) in nextCmd(
-                SnmpEngine(),
-                auth_data,
-                target,
-                ContextData(),
-                ObjectType(ObjectIdentity(oid)),
-                lexicographicMode=False
-            ):
                 if error_indication:
-                    logger.warning(f"SNMP WALK error for {ip} OID {oid}: {error_indication}")
-                    break
+                    logger.warning(f"SNMP BULK WALK error for {ip} OID {oid}: {error_indication}")
+                    yield SNMPResult(oid=current, value=None, value_type="error", success=False, error=str(error_indication))
+                    return
 
                 if error_status:
-                    logger.warning(f"SNMP WALK error status for {ip} OID {oid}: {error_status.prettyPrint()}")
-                    break
+                    logger.warning(f"SNMP BULK WALK error status for {ip} OID {oid}: {error_status.prettyPrint()}")
+                    yield SNMPResult(oid=current, value=None, value_type="error", success=False, error=error_status.prettyPrint())
+                    return
+
+                if not var_bind_table:
+                    return
 
-                # Extract values
-                for var_bind in var_binds:
+                for var_bind in self._flatten_var_binds(var_bind_table):
                     oid_result, value = var_bind
-                    value_str, value_type = self._parse_value(value)
+                    oid_tuple = tuple(oid_result.asTuple())
 
-                    results.append(
-                        SNMPResult(oid=str(oid_result), value=value_str, value_type=value_type, success=True)
-                    )
+                    # Stop at the end of the subtree, end of MIB, or a non-increasing OID
+                    if (
+                        oid_tuple[:len(root)] != root
+                        or isinstance(value, (EndOfMibView, NoSuchObject, NoSuchInstance))
+                        or oid_tuple <= last_oid
+                    ):
+                        return
 
-                    if len(results) >= max_results:
-                        logger.warning(f"SNMP WALK limit reached for {ip} OID {oid}: {max_results} results")
-                        break
+                    last_oid = oid_tuple
+                    value_str, value_type = self._parse_value(value)
+                    yield SNMPResult(oid=str(oid_result), value=value_str, value_type=value_type, success=True)
 
-                if len(results) >= max_results:
-                    break
+                    yielded += 1
+                    if yielded >= max_results:
+                        logger.warning(f"SNMP BULK WALK limit reached for {ip} OID {oid}: {max_results} results")
+                        return
 
-            logger.info(f"SNMP WALK {ip} {oid}: {len(results)} results")
-            return results
+                current = ".".join(str(part) for part in last_oid)
 
         except Exception as e:
-            logger.error(f"SNMP WALK exception for {ip} OID {oid}: {e}")
-            return [SNMPResult(oid=oid, value=None, value_type="error", success=False, error=str(e))]
+            # _get_target can fail before _send runs; do not leave a half-open probe pending
+            self.health.release((ip, port))
+            logger.error(f"SNMP BULK WALK exception for {ip} OID {oid}: {e}")
+            yield SNMPResult(oid=current, value=None, value_type="error", success=False, error=str(e))
 
-    async def bulk_get(
+    @staticmethod
+    def _flatten_var_binds(var_bind_table) -> List[Any]:
+        """
+        Flatten a GETBULK response into a list of var-binds
+
+        Depending on the pysnmp version, bulkCmd returns either a table
+        (list of rows) or a flat list of var-binds.
+        """
+        flat = []
+        for entry in var_bind_table:
+            if isinstance(entry, (list, tuple)) and entry and isinstance(entry[0], (list, tuple, ObjectType)):
+                flat.extend(entry)
+            else:
+                flat.append(entry)
+        return flat
+
+    async def get_many(
         self, ip: str, oids: List[str], credentials: SNMPCredentialData, port: int = 161
     ) -> List[SNMPResult]:
         """
-        Perform bulk SNMP GET for multiple OIDs
+        Perform a single SNMP GET carrying multiple OIDs
 
         Args:
             ip: Target IP address
@@ -183,28 +366,28 @@ class SNMPPoller:
         Returns:
             List of SNMPResult objects
         """
-        try:
-            auth_data = self._build_auth_data(credentials)
-            target = UdpTransportTarget((ip, port), timeout=self.timeout, retries=self.retries)
+        if not self.health.allow((ip, port)):
+            return [SNMPResult(oid=oid, value=None, value_type="error", success=False, error=CIRCUIT_OPEN_ERROR) for oid in oids]
 
-            # Build OID objects
-            oid_objects = [ObjectType(ObjectIdentity(oid)) for oid in oids]
+        try:
+            auth_data, target = self._get_target(ip, port, credentials)
 
-            # Perform GETBULK
-            error_indication, error_status, error_index, var_binds = await getCmd(
-                SnmpEngine(),
+            # Perform multi-OID GET
+            error_indication, error_status, error_index, var_binds = await self._send(
+                getCmd,
+                ip,
+                port,
                 auth_data,
                 target,
-                ContextData(),
-                *oid_objects
+                oids
             )
 
             if error_indication:
-                logger.warning(f"SNMP BULK GET error for {ip}: {error_indication}")
+                logger.warning(f"SNMP MULTI GET error for {ip}: {error_indication}")
                 return [SNMPResult(oid=oid, value=None, value_type="error", success=False, error=str(error_indication)) for oid in oids]
 
             if error_status:
-                logger.warning(f"SNMP BULK GET error status for {ip}: {error_status.prettyPrint()}")
+                logger.warning(f"SNMP MULTI GET error status for {ip}: {error_status.prettyPrint()}")
                 return [SNMPResult(oid=oid, value=None, value_type="error", success=False, error=error_status.prettyPrint()) for oid in oids]
 
             # Parse results
@@ -217,13 +400,161 @@ class SNMPPoller:
                     SNMPResult(oid=str(oid_result), value=value_str, value_type=value_type, success=True)
                 )
 
-            logger.info(f"SNMP BULK GET {ip}: {len(results)} results")
+            logger.info(f"SNMP MULTI GET {ip}: {len(results)} results")
             return results
 
         except Exception as e:
-            logger.error(f"SNMP BULK GET exception for {ip}: {e}")
+            # _get_target can fail before _send runs; do not leave a half-open probe pending
+            self.health.release((ip, port))
+            logger.error(f"SNMP MULTI GET exception for {ip}: {e}")
             return [SNMPResult(oid=oid, value=None, value_type="error", success=False, error=str(e)) for oid in oids]
 
+    # Backwards-compatible name: this has always been a multi-OID GET, not GETBULK
+    bulk_get = get_many
+
+    async def get_batch(
+        self, ip: str, oids: List[str], credentials: SNMPCredentialData, port: int = 161
+    ) -> List[SNMPResult]:
+        """
+        GET all of a device's OIDs in as few PDUs as the agent accepts
+
+        OIDs are packed into PDUs of up to the learned varbind count for the device.
+        A tooBig response halves the chunk and remembers the smaller size for the
+        device; a noSuchName/genErr response drops the offending varbind (by
+        error-index) and retries the rest of the chunk.
+
+        Args:
+            ip: Target IP address
+            oids: List of OIDs to query
+            credentials: SNMP credentials
+            port: SNMP port
+
+        Returns:
+            List of SNMPResult objects, one per requested OID, in request order
+        """
+        if not oids:
+            return []
+
+        device_key = (ip, port)
+        if not self.health.allow(device_key):
+            return [SNMPResult(oid=oid, value=None, value_type="error", success=False, error=CIRCUIT_OPEN_ERROR) for oid in oids]
+
+        # For v3, piggyback snmpEngineID/snmpEngineBoots to keep the engine cache current
+        requested = len(oids)
+        if credentials.version == "v3":
+            oids = list(oids) + [SNMP_ENGINE_ID_OID, SNMP_ENGINE_BOOTS_OID]
+
+        chunk_size = self._pdu_sizes.get(device_key, self.max_varbinds)
+        results: List[Optional[SNMPResult]] = [None] * len(oids)
+        round_trips = 0
+
+        pending: Deque[List[int]] = deque(
+            list(range(start, min(start + chunk_size, len(oids)))) for start in range(0, len(oids), chunk_size)
+        )
+
+        try:
+            auth_data, target = self._get_target(ip, port, credentials)
+
+            while pending:
+                indexes = pending.popleft()
+                round_trips += 1
+
+                error_indication, error_status, error_index, var_binds = await self._send(
+                    getCmd,
+                    ip,
+                    port,
+                    auth_data,
+                    target,
+                    [oids[i] for i in indexes]
+                )
+
+                if error_indication:
+                    logger.warning(f"SNMP BATCH GET error for {ip}: {error_indication}")
+
+                    # A timed-out device won't answer the remaining chunks either
+                    if isinstance(error_indication, errind.RequestTimedOut):
+                        while pending:
+                            indexes.extend(pending.popleft())
+
+                    for i in indexes:
+                        results[i] = SNMPResult(oid=oids[i], value=None, value_type="error", success=False, error=str(error_indication))
+                    continue
+
+                if error_status:
+                    status_code = int(error_status)
+                    bad = int(error_index) - 1 if error_index else -1
+
+                    if status_code == ERROR_STATUS_TOO_BIG and len(indexes) > 1:
+                        half = len(indexes) // 2
+                        learned = min(self._pdu_sizes.get(device_key, self.max_varbinds), half)
+                        self._pdu_sizes[device_key] = learned
+                        logger.info(f"SNMP tooBig from {ip}: splitting PDU, max varbinds now {learned}")
+                        pending.extendleft([indexes[half:], indexes[:half]])
+                        continue
+
+                    if status_code != ERROR_STATUS_TOO_BIG and 0 <= bad < len(indexes) and len(indexes) > 1:
+                        # Drop the offending varbind and retry the rest of the chunk
+                        failed = indexes[bad]
+                        results[failed] = SNMPResult(oid=oids[failed], value=None, value_type="error", success=False, error=error_status.prettyPrint())
+                        pending.appendleft(indexes[:bad] + indexes[bad + 1:])
+                        continue
+
+                    if len(indexes) > 1:
+                        half = len(indexes) // 2
+                        pending.extendleft([indexes[half:], indexes[:half]])
+                        continue
+
+                    logger.warning(f"SNMP BATCH GET error status for {ip} OID {oids[indexes[0]]}: {error_status.prettyPrint()}")
+                    results[indexes[0]] = SNMPResult(oid=oids[indexes[0]], value=None, value_type="error", success=False, error=error_status.prettyPrint())
+                    continue
+
+                for i, var_bind in zip(indexes, var_binds):
+                    oid_result, value = var_bind
+                    if isinstance(value, (NoSuchObject, NoSuchInstance, EndOfMibView)):
+                        results[i] = SNMPResult(oid=oids[i], value=None, value_type="none", success=False, error=value.__class__.__name__)
+                        continue
+
+                    value_str, value_type = self._parse_value(value)
+                    results[i] = SNMPResult(oid=oids[i], value=value_str, value_type=value_type, success=True)
+
+        except Exception as e:
+            # _get_target can fail before _send runs; do not leave a half-open probe pending
+            self.health.release((ip, port))
+            logger.error(f"SNMP BATCH GET exception for {ip}: {e}")
+            for i, oid in enumerate(oids):
+                if results[i] is None:
+                    results[i] = SNMPResult(oid=oid, value=None, value_type="error", success=False, error=str(e))
+
+        logger.debug(f"SNMP BATCH GET {ip}: {len(oids)} OIDs in {round_trips} round trips")
+
+        if len(oids) > requested:
+            self._update_engine_info(ip, port, credentials, results[requested], results[requested + 1])
+
+        return [
+            result or SNMPResult(oid=oid, value=None, value_type="none", success=False, error="No data returned")
+            for oid, result in zip(oids[:requested], results[:requested])
+        ]
+
+    def _update_engine_info(
+        self,
+        ip: str,
+        port: int,
+        credentials: SNMPCredentialData,
+        engine_id_result: Optional[SNMPResult],
+        boots_result: Optional[SNMPResult],
+    ):
+        """Record polled snmpEngineID/Boots; rebuild the target's auth data if they changed"""
+        if not engine_id_result or not engine_id_result.success:
+            return
+
+        engine_id = engine_id_result.value
+        if engine_id_result.value_type == "string":
+            engine_id = str(engine_id).encode("latin-1", errors="ignore").hex()
+        boots = int(boots_result.value) if boots_result and boots_result.success else None
+
+        if self.usm.update_engine(ip, port, credentials.username or "", str(engine_id), boots):
+            self._targets.pop((ip, port, astuple(credentials)), None)
+
     async def detect_device(
         self, ip: str, credentials: SNMPCredentialData, port: int = 161
     ) -> Dict[str, Optional[str]]:
@@ -255,7 +586,7 @@ class SNMPPoller:
                 "sysUpTime": "1.3.6.1.2.1.1.3.0",
             }
 
-            results = await self.bulk_get(ip, list(oids.values()), credentials, port)
+            results = await self.get_many(ip, list(oids.values()), credentials, port)
 
             # Parse results
             sys_info = {}
@@ -300,12 +631,315 @@ class SNMPPoller:
                 "error": str(e),
             }
 
-    def _build_auth_data(self, credentials: SNMPCredentialData):
+    async def _send(self, command, ip: str, port: int, auth_data, target, oids: List[str], *args):
+        """
+        Send one SNMP request with the device's adaptive timeout and record the outcome
+
+        Args:
+            command: pysnmp command coroutine (getCmd, bulkCmd)
+            ip: Target IP address
+            port: SNMP port
+            auth_data: pysnmp auth data (None for fast-path targets)
+            target: Transport target (UdpTransportTarget or FastTarget)
+            oids: OIDs to request
+            *args: Command arguments preceding the varbinds (non-repeaters, max-repetitions)
+
+        Returns:
+            The command's (error_indication, error_status, error_index, var_binds) tuple
+        """
+        key = (ip, port)
+
+        try:
+            # Wait for the rate limiter before starting the clock so queueing is not counted as RTT
+            async with self._get_rate_limiter().slot(ip):
+                timeout = self.health.timeout_for(key)
+                started = time.monotonic()
+
+                try:
+                    if isinstance(target, FastTarget):
+                        response, attempt = await self._send_fast(command, target, oids, timeout, *args)
+                    else:
+                        response, attempt = await self._send_pysnmp(command, auth_data, target, oids, timeout, *args)
+                except Exception as e:
+                    self.health.record_failure(key, str(e))
+                    raise
+
+                rtt = time.monotonic() - started
+
+            error_indication = response[0]
+            if isinstance(error_indication, errind.RequestTimedOut):
+                self.health.record_failure(key, str(error_indication))
+            elif not error_indication:
+                # Only a first-attempt answer measures the path; later ones include the retry wait
+                self.health.record_success(key, rtt if attempt == 0 else None)
+        finally:
+            # Cancellation, rate limiter errors and non-timeout error indications end the probe too
+            self.health.release(key)
+
+        if isinstance(error_indication, USM_ERRORS):
+            # Engine rebooted/replaced or keys rotated: rediscover on the next request
+            logger.info(f"SNMPv3 USM error from {ip}:{port} ({error_indication}), dropping cached engine info")
+            self.invalidate_credentials(ip, port)
+
+        return response
+
+    async def _send_pysnmp(self, command, auth_data, target, oids: List[str], timeout: float, *args):
+        """
+        Send a request through pysnmp, retrying here under the adaptive deadline
+
+        The transport target keeps the fixed self.timeout and no retries of its own:
+        pysnmp keys its LCD transport address rows on the timeout, so changing it
+        per request would add a row every time.
+
+        Returns:
+            (pysnmp response tuple, zero-based attempt number)
+        """
+        var_binds = [ObjectType(ObjectIdentity(oid)) for oid in oids]
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = await asyncio.wait_for(
+                    command(self._get_engine(), auth_data, target, ContextData(), *args, *var_binds), timeout
+                )
+            except asyncio.TimeoutError:
+                continue
+
+            # pysnmp's own (fixed) timeout may fire first if it is below the adaptive one
+            if not isinstance(response[0], errind.RequestTimedOut):
+                return response, attempt
+
+        return (errind.requestTimedOut, ErrorStatus(0), 0, []), self.retries
+
+    async def _send_fast(self, command, target: FastTarget, oids: List[str], timeout: float, *args):
+        """
+        Send a v2c request through the fast-path transport
+
+        Returns:
+            (pysnmp-shaped response tuple, zero-based attempt number)
+        """
+        pdu_type = PDU_GET_BULK if command is bulkCmd else PDU_GET
+
+        try:
+            response, attempt = await self._get_fast_transport().exchange(target, oids, pdu_type, *args, timeout=timeout)
+        except SNMPTimeout:
+            return (errind.requestTimedOut, ErrorStatus(0), 0, []), target.retries
+
+        var_binds = [
+            (ObjectName(oid), FAST_EXCEPTION_VALUES.get(value.value_type, value))
+            for oid, value in response.var_binds
+        ]
+        return (None, ErrorStatus(response.error_status), response.error_index, var_binds), attempt
+
+    def _get_fast_transport(self) -> FastTransport:
+        """
+        Get the fast-path transport bound to the running event loop, creating it on first use
+
+        Returns:
+            FastTransport instance
+        """
+        loop = asyncio.get_running_loop()
+        transport = self._fast_transports.get(loop)
+
+        if transport is None:
+            transport = FastTransport()
+            self._fast_transports[loop] = transport
+            logger.debug(f"Created SNMP fast-path transport for event loop {id(loop)}")
+
+        return transport
+
+    def _get_rate_limiter(self) -> RateLimiter:
+        """
+        Get the rate limiter bound to the running event loop, creating it on first use
+
+        Returns:
+            RateLimiter instance
+        """
+        loop = asyncio.get_running_loop()
+        limiter = self._rate_limiters.get(loop)
+
+        if limiter is None:
+            limiter = RateLimiter(**self.rate_limits)
+            self._rate_limiters[loop] = limiter
+
+        return limiter
+
+    def get_rate_limit_stats(self) -> List[Dict[str, Any]]:
+        """
+        Get rate limiter queue depths and throttle counters
+
+        Returns:
+            One statistics dictionary per event loop the poller has run on
+        """
+        return [limiter.get_stats() for limiter in self._rate_limiters.values()]
+
+    def get_device_stats(self, only_unhealthy: bool = False) -> Dict[str, Any]:
+        """
+        Get per-device RTT, timeout and circuit breaker statistics
+
+        Args:
+            only_unhealthy: Only list devices whose breaker is open or half-open
+
+        Returns:
+            Dictionary with a breaker summary and per-device entries
+        """
+        return {
+            "summary": self.health.get_summary(),
+            "devices": self.health.get_stats(only_unhealthy=only_unhealthy),
+        }
+
+    def _get_engine(self) -> SnmpEngine:
+        """
+        Get the SnmpEngine bound to the running event loop, creating it on first use
+
+        Returns:
+            SnmpEngine instance
+        """
+        loop = asyncio.get_running_loop()
+        engine = self._engines.get(loop)
+
+        if engine is None:
+            engine = SnmpEngine()
+            self._engines[loop] = engine
+            logger.debug(f"Created SnmpEngine for event loop {id(loop)}")
+
+        return engine
+
+    def _get_target(
+        self, ip: str, port: int, credentials: SNMPCredentialData
+    ) -> Tuple[Any, UdpTransportTarget]:
+        """
+        Get cached auth data and transport target for a device
+
+        Entries are kept in LRU order and evicted once target_cache_size is exceeded.
+        A cache size of 0 disables caching.
+
+        Args:
+            ip: Target IP address
+            port: SNMP port
+            credentials: SNMP credentials
+
+        Returns:
+            Tuple of (auth_data, transport target)
+        """
+        if self.target_cache_size <= 0:
+            if self._use_fast_path(credentials):
+                return None, self._build_fast_target(ip, port, credentials)
+            target = UdpTransportTarget((ip, port), timeout=self.timeout, retries=0)
+            return self._build_auth_data(credentials, ip, port), target
+
+        cred_key = astuple(credentials)
+        key = (ip, port, cred_key)
+
+        entry = self._targets.get(key)
+        if entry is not None:
+            self._targets.move_to_end(key)
+            self.cache_hits += 1
+            return entry
+
+        self.cache_misses += 1
+
+        if self._use_fast_path(credentials):
+            entry = (None, self._build_fast_target(ip, port, credentials))
+            self._store_target(key, entry)
+            return entry
+
+        if credentials.version == "v3":
+            # v3 auth data carries the device's engine ID, so it is per target
+            auth_data = self._build_auth_data(credentials, ip, port)
+        else:
+            auth_data = self._auth_cache.get(cred_key)
+            if auth_data is None:
+                auth_data = self._build_auth_data(credentials)
+                self._auth_cache[cred_key] = auth_data
+
+        target = UdpTransportTarget((ip, port), timeout=self.timeout, retries=0)
+        entry = (auth_data, target)
+        self._store_target(key, entry)
+
+        # Drop auth data that no cached target refers to any more
+        if len(self._auth_cache) > self.target_cache_size:
+            live_keys = {k[2] for k in self._targets}
+            self._auth_cache = {k: v for k, v in self._auth_cache.items() if k in live_keys}
+
+        return entry
+
+    def _store_target(self, key: Tuple, entry: Tuple[Any, Any]):
+        """Insert a target cache entry, evicting the least recently used ones"""
+        self._targets[key] = entry
+        while len(self._targets) > self.target_cache_size:
+            self._targets.popitem(last=False)
+
+    def _use_fast_path(self, credentials: SNMPCredentialData) -> bool:
+        """Whether requests with these credentials go through the fast-path codec"""
+        return self.backend == "fast" and credentials.version == "v2c"
+
+    def _build_fast_target(self, ip: str, port: int, credentials: SNMPCredentialData) -> FastTarget:
+        return FastTarget(
+            ip=ip,
+            port=port,
+            community=credentials.community or "public",
+            timeout=self.timeout,
+            retries=self.retries,
+        )
+
+    def get_cache_stats(self) -> Dict[str, int]:
+        """
+        Get transport/auth cache statistics
+
+        Returns:
+            Dictionary with cache size, hits, misses and engine count
+        """
+        return {
+            "targets_cached": len(self._targets),
+            "auth_cached": len(self._auth_cache),
+            "max_targets": self.target_cache_size,
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "engines": len(self._engines),
+            "pdu_sizes_learned": len(self._pdu_sizes),
+            "usm": self.usm.get_stats(),
+            "backend": self.backend,
+            "fast_path": [transport.get_stats() for transport in self._fast_transports.values()],
+            "rate_limit": self.get_rate_limit_stats(),
+        }
+
+    def clear_cache(self):
+        """Drop all cached transport targets and auth data"""
+        self._targets.clear()
+        self._auth_cache.clear()
+
+    def invalidate_credentials(self, ip: Optional[str] = None, port: Optional[int] = None):
+        """
+        Drop cached auth data, transport targets and SNMPv3 engine info
+
+        Call after a device's credentials are created, rotated or deleted.
+
+        Args:
+            ip: Only this device (all devices if None)
+            port: Only this port (all ports if None)
+        """
+        if ip is None:
+            self.clear_cache()
+            self.usm.clear_keys()
+        else:
+            for key in [k for k in self._targets if k[0] == ip and (port is None or k[1] == port)]:
+                del self._targets[key]
+
+        self.usm.invalidate(ip=ip, port=port)
+        logger.info(f"SNMP credential caches invalidated for {ip or 'all devices'}")
+
+    def _build_auth_data(self, credentials: SNMPCredentialData, ip: Optional[str] = None, port: int = 161):
         """
         Build pysnmp authentication data from credentials
 
+        For SNMPv3, passphrases are converted to cached master keys so pysnmp
+        only has to localize them, and the device's engine ID is supplied when
+        it has already been discovered.
+
         Args:
             credentials: SNMPCredentialData object
+            ip: Target IP address (used to look up the cached SNMPv3 engine ID)
+            port: SNMP port
 
         Returns:
             pysnmp auth data object
@@ -337,12 +971,34 @@ class SNMPPoller:
             auth_protocol = auth_protocol_map.get(credentials.auth_protocol, usmNoAuthProtocol)
             priv_protocol = priv_protocol_map.get(credentials.priv_protocol, usmNoPrivProtocol)
 
+            username = credentials.username or ""
+            options = {}
+
+            auth_key = credentials.auth_key
+            priv_key = credentials.priv_key
+            if auth_protocol is not usmNoAuthProtocol:
+                auth_master = self.usm.master_key(credentials.auth_key, credentials.auth_protocol)
+                if auth_master is not None:
+                    auth_key = auth_master
+                    options["authKeyType"] = usmKeyTypeMaster
+
+                # The priv key is derived with the auth protocol's hash
+                priv_master = self.usm.master_key(credentials.priv_key, credentials.auth_protocol)
+                if priv_master is not None and priv_protocol is not usmNoPrivProtocol:
+                    priv_key = priv_master
+                    options["privKeyType"] = usmKeyTypeMaster
+
+            engine = self.usm.get_engine(ip, port, username) if ip else None
+            if engine is not None:
+                options["securityEngineId"] = OctetString(hexValue=engine.engine_id)
+
             return UsmUserData(
-                userName=credentials.username or "",
-                authKey=credentials.auth_key,
-                privKey=credentials.priv_key,
+                userName=username,
+                authKey=auth_key,
+                privKey=priv_key,
                 authProtocol=auth_protocol,
                 privProtocol=priv_protocol,
+                **options,
             )
 
         else:
@@ -360,7 +1016,10 @@ class SNMPPoller:
         Returns:
             Tuple of (parsed_value, value_type)
         """
-        if isinstance(value, Integer):
+        if isinstance(value, DecodedValue):
+            # Already decoded by the fast-path codec
+            return value.value, value.value_type
+        elif isinstance(value, Integer):
             return int(value), "integer"
         elif isinstance(value, Counter32):
             return int(value), "counter32"
@@ -0,0 +1,267 @@
+"""
+WARD FLUX - SNMP Rate Limiting
+
+Keeps concurrent polling from overloading weak devices and WAN links:
+
+- a global token bucket caps SNMP requests (PDUs) per second across the poller,
+- per-device and per-subnet semaphores cap requests in flight to one agent or
+  one branch subnet.
+
+Requests over a limit wait in FIFO order (asyncio locks and semaphores wake
+waiters first-come first-served); nothing is dropped. Queue depths and
+throttle counters are exposed through get_stats() for tuning.
+"""
+
+import os
+import time
+import asyncio
+import ipaddress
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 0 disables a limit
+SNMP_GLOBAL_RATE = float(os.getenv("SNMP_GLOBAL_RATE", "0"))  # requests/sec across the poller
+SNMP_GLOBAL_BURST = float(os.getenv("SNMP_GLOBAL_BURST", "0"))  # bucket size (defaults to one second of rate)
+SNMP_DEVICE_CONCURRENCY = int(os.getenv("SNMP_DEVICE_CONCURRENCY", "4"))  # requests in flight per device
+SNMP_SUBNET_CONCURRENCY = int(os.getenv("SNMP_SUBNET_CONCURRENCY", "0"))  # requests in flight per subnet
+SNMP_SUBNET_PREFIX = int(os.getenv("SNMP_SUBNET_PREFIX", "24"))  # IPv4 prefix length grouping a subnet
+SNMP_SUBNET_PREFIX_V6 = int(os.getenv("SNMP_SUBNET_PREFIX_V6", "64"))
+
+# A request counts as throttled if it waited at least this long for a limit
+THROTTLE_THRESHOLD = 0.001  # seconds
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket with FIFO waiters
+
+    Tokens refill continuously at `rate` per second up to `burst`. acquire()
+    takes one token, waiting in arrival order when the bucket is empty.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Initialize bucket
+
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity (defaults to one second of rate, at least 1)
+        """
+        self.rate = rate
+        self.burst = max(1.0, burst or rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waiting = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Take one token, waiting for it if necessary"""
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    self._refill(time.monotonic())
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+        finally:
+            self.waiting -= 1
+
+    @property
+    def tokens(self) -> float:
+        self._refill(time.monotonic())
+        return self._tokens
+
+
+class _KeyedLimit:
+    """Concurrency limit per key (device or subnet); idle keys are dropped"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._users: Dict[str, int] = {}
+        self.waiting = 0
+        self.max_waiting = 0
+
+    async def acquire(self, key: str):
+        semaphore = self._slots.get(key)
+        if semaphore is None:
+            semaphore = self._slots[key] = asyncio.Semaphore(self.limit)
+        self._users[key] = self._users.get(key, 0) + 1
+
+        if semaphore.locked():
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            try:
+                await semaphore.acquire()
+            except BaseException:
+                self._leave(key)
+                raise
+            finally:
+                self.waiting -= 1
+        else:
+            await semaphore.acquire()
+
+    def release(self, key: str):
+        self._slots[key].release()
+        self._leave(key)
+
+    def _leave(self, key: str):
+        self._users[key] -= 1
+        if not self._users[key]:
+            del self._users[key]
+            del self._slots[key]
+
+    @property
+    def active_keys(self) -> int:
+        return len(self._slots)
+
+
+class RateLimiter:
+    """
+    Global request budget plus per-device and per-subnet concurrency limits
+
+    Limits are taken in the order device -> subnet -> global token, so a busy
+    device queues on its own slots without holding subnet slots or global
+    tokens it cannot use yet. Bound to one event loop.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = SNMP_GLOBAL_RATE,
+        global_burst: float = SNMP_GLOBAL_BURST,
+        device_concurrency: int = SNMP_DEVICE_CONCURRENCY,
+        subnet_concurrency: int = SNMP_SUBNET_CONCURRENCY,
+        subnet_prefix: int = SNMP_SUBNET_PREFIX,
+        subnet_prefix_v6: int = SNMP_SUBNET_PREFIX_V6,
+    ):
+        """
+        Initialize limiter
+
+        Args:
+            global_rate: Requests per second across all devices (0 = unlimited)
+            global_burst: Token bucket size (0 = one second of global_rate)
+            device_concurrency: Requests in flight per device (0 = unlimited)
+            subnet_concurrency: Requests in flight per subnet (0 = unlimited)
+            subnet_prefix: IPv4 prefix length that defines a subnet
+            subnet_prefix_v6: IPv6 prefix length that defines a subnet
+        """
+        self.bucket = TokenBucket(global_rate, global_burst or None) if global_rate > 0 else None
+        self.devices = _KeyedLimit(device_concurrency) if device_concurrency > 0 else None
+        self.subnets = _KeyedLimit(subnet_concurrency) if subnet_concurrency > 0 else None
+        self.subnet_prefix = subnet_prefix
+        self.subnet_prefix_v6 = subnet_prefix_v6
+        self._subnet_keys: Dict[str, str] = {}
+
+        self.requests = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self.max_wait = 0.0
+        self.queued = 0
+        self.max_queued = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.bucket or self.devices or self.subnets)
+
+    def _subnet_key(self, ip: str) -> str:
+        key = self._subnet_keys.get(ip)
+        if key is None:
+            try:
+                address = ipaddress.ip_address(ip)
+                prefix = self.subnet_prefix if address.version == 4 else self.subnet_prefix_v6
+                key = str(ipaddress.ip_network(f"{ip}/{prefix}", strict=False))
+            except ValueError:
+                key = ip  # Hostname: treat as its own subnet
+            if len(self._subnet_keys) > 65536:
+                self._subnet_keys.clear()
+            self._subnet_keys[ip] = key
+        return key
+
+    @asynccontextmanager
+    async def slot(self, ip: str) -> AsyncIterator[None]:
+        """
+        Hold a request slot for one device while the block runs
+
+        Args:
+            ip: Device IP address
+        """
+        if not self.enabled:
+            self.requests += 1
+            yield
+            return
+
+        subnet = self._subnet_key(ip) if self.subnets else None
+        started = time.monotonic()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+
+        device_held = subnet_held = False
+        try:
+            if self.devices:
+                await self.devices.acquire(ip)
+                device_held = True
+            if self.subnets:
+                await self.subnets.acquire(subnet)
+                subnet_held = True
+            if self.bucket:
+                await self.bucket.acquire()
+        except BaseException:
+            self.queued -= 1
+            if subnet_held:
+                self.subnets.release(subnet)
+            if device_held:
+                self.devices.release(ip)
+            raise
+
+        self.queued -= 1
+        self.requests += 1
+        waited = time.monotonic() - started
+        if waited >= THROTTLE_THRESHOLD:
+            self.throttled += 1
+            self.wait_seconds += waited
+            self.max_wait = max(self.max_wait, waited)
+
+        try:
+            yield
+        finally:
+            if subnet_held:
+                self.subnets.release(subnet)
+            if device_held:
+                self.devices.release(ip)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get limiter statistics
+
+        Returns:
+            Dictionary with limits, queue depths and throttle counters
+        """
+        return {
+            "global_rate": self.bucket.rate if self.bucket else 0,
+            "global_burst": self.bucket.burst if self.bucket else 0,
+            "global_tokens": round(self.bucket.tokens, 2) if self.bucket else None,
+            "global_waiting": self.bucket.waiting if self.bucket else 0,
+            "device_concurrency": self.devices.limit if self.devices else 0,
+            "device_waiting": self.devices.waiting if self.devices else 0,
+            "device_max_waiting": self.devices.max_waiting if self.devices else 0,
+            "devices_active": self.devices.active_keys if self.devices else 0,
+            "subnet_concurrency": self.subnets.limit if self.subnets else 0,
+            "subnet_waiting": self.subnets.waiting if self.subnets else 0,
+            "subnet_max_waiting": self.subnets.max_waiting if self.subnets else 0,
+            "subnets_active": self.subnets.active_keys if self.subnets else 0,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "wait_seconds_total": round(self.wait_seconds, 3),
+            "max_wait_seconds": round(self.max_wait, 3),
+        }
@@ -0,0 +1,228 @@
+"""
+WARD FLUX - SNMPv3 USM Key and Engine-ID Cache
+
+Password-to-key conversion (RFC 3414 A.2, RFC 7860 for SHA-2) hashes a
+megabyte of repeated passphrase per key, which pysnmp redoes every time a
+UsmUserData is configured. This module caches the resulting master keys per
+(protocol, passphrase) and the authoritative engine ID / boots discovered per
+(device, user), so v3 requests only pay for one cheap key localization.
+
+Cached engine info is invalidated when snmpEngineBoots or the engine ID of a
+device changes, when the device answers with a USM error, or when a credential
+is rotated.
+"""
+
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# SNMP-FRAMEWORK-MIB scalars
+SNMP_ENGINE_ID_OID = "1.3.6.1.6.3.10.2.1.1.0"
+SNMP_ENGINE_BOOTS_OID = "1.3.6.1.6.3.10.2.1.2.0"
+
+# Auth protocol name -> hashlib algorithm
+AUTH_HASHES = {
+    "MD5": "md5",
+    "SHA": "sha1",
+    "SHA224": "sha224",
+    "SHA256": "sha256",
+    "SHA384": "sha384",
+    "SHA512": "sha512",
+}
+
+_PASSWORD_TO_KEY_LENGTH = 1048576  # 1 MB, RFC 3414 A.2
+
+
+def password_to_key(passphrase: str, auth_protocol: str) -> Optional[bytes]:
+    """
+    Convert a passphrase to a (non-localized) master key
+
+    Args:
+        passphrase: Auth or priv passphrase
+        auth_protocol: Auth protocol name (the priv key also uses the auth hash)
+
+    Returns:
+        Master key bytes, or None for unknown protocols / empty passphrases
+    """
+    hash_name = AUTH_HASHES.get((auth_protocol or "").upper())
+    if not hash_name or not passphrase:
+        return None
+
+    password = passphrase.encode()
+    repeated = password * (_PASSWORD_TO_KEY_LENGTH // len(password) + 1)
+
+    digest = hashlib.new(hash_name)
+    digest.update(repeated[:_PASSWORD_TO_KEY_LENGTH])
+    return digest.digest()
+
+
+@dataclass
+class EngineInfo:
+    """Authoritative SNMP engine of a device"""
+
+    engine_id: str  # hex
+    boots: Optional[int]
+    discovered_at: float
+
+
+class UsmCache:
+    """
+    Process-wide cache of SNMPv3 master keys and discovered engine IDs
+    """
+
+    def __init__(self, max_keys: int = 4096):
+        """
+        Initialize cache
+
+        Args:
+            max_keys: Maximum number of cached master keys (LRU)
+        """
+        self.max_keys = max_keys
+        self._keys: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._engines: Dict[Tuple[str, int, str], EngineInfo] = {}
+        self._lock = threading.Lock()
+        self.key_hits = 0
+        self.key_misses = 0
+        self.engine_changes = 0
+
+    def master_key(self, passphrase: Optional[str], auth_protocol: Optional[str]) -> Optional[bytes]:
+        """
+        Get the master key for a passphrase, computing it once
+
+        Args:
+            passphrase: Auth or priv passphrase
+            auth_protocol: Auth protocol name
+
+        Returns:
+            Master key bytes or None if it cannot be derived
+        """
+        if not passphrase or not auth_protocol:
+            return None
+
+        cache_key = (auth_protocol.upper(), passphrase)
+        with self._lock:
+            key = self._keys.get(cache_key)
+            if key is not None:
+                self._keys.move_to_end(cache_key)
+                self.key_hits += 1
+                return key
+
+        key = password_to_key(passphrase, auth_protocol)
+        if key is None:
+            return None
+
+        with self._lock:
+            self.key_misses += 1
+            self._keys[cache_key] = key
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+
+        return key
+
+    def get_engine(self, ip: str, port: int, username: str) -> Optional[EngineInfo]:
+        """
+        Get the cached authoritative engine of a device for a user
+
+        Args:
+            ip: Device IP
+            port: SNMP port
+            username: USM user name
+
+        Returns:
+            EngineInfo or None if not yet discovered
+        """
+        return self._engines.get((ip, port, username))
+
+    def update_engine(self, ip: str, port: int, username: str, engine_id: str, boots: Optional[int]) -> bool:
+        """
+        Record the engine ID and boots polled from a device
+
+        Args:
+            ip: Device IP
+            port: SNMP port
+            username: USM user name
+            engine_id: snmpEngineID as hex
+            boots: snmpEngineBoots
+
+        Returns:
+            True if this is new or changed engine info (callers should rebuild auth data)
+        """
+        key = (ip, port, username)
+        previous = self._engines.get(key)
+
+        if previous is not None and previous.engine_id == engine_id and previous.boots == boots:
+            return False
+
+        if previous is not None:
+            self.engine_changes += 1
+            logger.info(
+                f"SNMPv3 engine changed for {ip}:{port} user {username}: "
+                f"{previous.engine_id}/boots={previous.boots} -> {engine_id}/boots={boots}"
+            )
+
+        self._engines[key] = EngineInfo(engine_id=engine_id, boots=boots, discovered_at=time.time())
+        return True
+
+    def invalidate(self, ip: Optional[str] = None, port: Optional[int] = None, username: Optional[str] = None):
+        """
+        Forget cached engine info
+
+        Args:
+            ip: Only entries of this device (all devices if None)
+            port: Only entries on this port
+            username: Only entries of this user
+        """
+        with self._lock:
+            for key in list(self._engines):
+                if ip is not None and key[0] != ip:
+                    continue
+                if port is not None and key[1] != port:
+                    continue
+                if username is not None and key[2] != username:
+                    continue
+                del self._engines[key]
+
+    def clear_keys(self):
+        """Drop all cached master keys (e.g. after credentials were rotated)"""
+        with self._lock:
+            self._keys.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get cache statistics
+
+        Returns:
+            Dictionary with key/engine cache sizes and counters
+        """
+        return {
+            "master_keys": len(self._keys),
+            "engines": len(self._engines),
+            "key_hits": self.key_hits,
+            "key_misses": self.key_misses,
+            "engine_changes": self.engine_changes,
+        }
+
+
+# Singleton instance
+_usm_cache: Optional[UsmCache] = None
+
+
+def get_usm_cache() -> UsmCache:
+    """
+    Get or create UsmCache singleton
+
+    Returns:
+        UsmCache instance
+    """
+    global _usm_cache
+
+    if _usm_cache is None:
+        _usm_cache = UsmCache()
+
+    return _usm_cache
@@ -4,108 +4,96 @@ WARD FLUX - Celery Tasks
 Background tasks for distributed monitoring.
 """
 
+import os
 import logging
 import asyncio
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from celery import shared_task
+from celery.signals import worker_process_shutdown
 
 from database import SessionLocal
-from monitoring.snmp.poller import get_snmp_poller, SNMPCredentialData
-from monitoring.snmp.credentials import decrypt_credential
+from monitoring.snmp.poller import get_snmp_poller
 from monitoring.snmp.oids import get_vendor_oids
-from monitoring.victoria.client import get_victoria_client
-from monitoring.models import MonitoringItem, SNMPCredential, AlertRule, AlertHistory, MonitoringProfile, MonitoringMode
+from monitoring.victoria.writer import get_metrics_writer
+from monitoring.poll_plan import get_plan_cache, build_plan_metrics
+from monitoring.alerting.evaluator import get_alert_evaluator
+from monitoring.icmp import build_ping_metrics, get_icmp_engine
+from monitoring.onboarding import BULK_DETECT_CONCURRENCY, apply_detection_results, detect_devices, load_detection_targets
+from monitoring.models import AlertHistory, MonitoringProfile, MonitoringMode
 
 logger = logging.getLogger(__name__)
 
+# Fan-out settings: devices per batched task and devices handled at once inside one task
+POLL_CHUNK_SIZE = int(os.getenv("POLL_CHUNK_SIZE", "250"))
+PING_CHUNK_SIZE = int(os.getenv("PING_CHUNK_SIZE", "5000"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "200"))
 
-@shared_task(bind=True, name="monitoring.tasks.poll_device_snmp")
-def poll_device_snmp(self, device_id: str):
+# Per-process event loop reused across tasks so the poller's SnmpEngine and caches stay warm
+_event_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _run_async(coro):
     """
-    Poll a single device via SNMP and store metrics
+    Run a coroutine on this worker process's persistent event loop
 
     Args:
-        device_id: Device UUID
+        coro: Coroutine to run
+
+    Returns:
+        Coroutine result
     """
-    try:
-        db = SessionLocal()
-        logger.info(f"Polling device: {device_id}")
+    global _event_loop
 
-        # Check if standalone monitoring is enabled
-        profile = db.query(MonitoringProfile).filter_by(is_active=True).first()
-        if not profile or profile.mode == MonitoringMode.ZABBIX:
-            logger.debug(f"Standalone monitoring not active, skipping device {device_id}")
-            db.close()
-            return
+    if _event_loop is None or _event_loop.is_closed():
+        _event_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_event_loop)
 
-        # Get device monitoring items
-        items = db.query(MonitoringItem).filter_by(device_id=device_id, enabled=True).all()
+    return _event_loop.run_until_complete(coro)
 
-        if not items:
-            logger.warning(f"No monitoring items found for device {device_id}")
-            db.close()
-            return
 
-        # Get SNMP credentials
-        snmp_cred = db.query(SNMPCredential).filter_by(device_id=device_id).first()
+@worker_process_shutdown.connect
+def _flush_metrics_on_shutdown(**kwargs):
+    """Flush buffered samples when a prefork child exits (billiard skips atexit handlers)"""
+    get_metrics_writer().close()
 
-        if not snmp_cred:
-            logger.error(f"No SNMP credentials found for device {device_id}")
-            db.close()
-            return
 
-        # Build credential data
-        credentials = _build_credential_data(snmp_cred)
+def _chunks(items: List[Any], size: int) -> List[List[Any]]:
+    """Split items into lists of at most size elements"""
+    size = max(1, size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
 
-        # Get device info
-        device = items[0].device
-        device_ip = device.ip
 
-        # Initialize clients
-        snmp_poller = get_snmp_poller()
-        vm_client = get_victoria_client()
+@shared_task(bind=True, name="monitoring.tasks.poll_device_snmp")
+def poll_device_snmp(self, device_id: str):
+    """
+    Poll a single device via SNMP and store metrics
 
-        # Poll each monitoring item
-        metrics_to_write = []
+    Uses the device's compiled poll plan (monitoring/poll_plan.py), so no
+    database queries are made unless the monitoring configuration changed.
 
-        for item in items:
-            try:
-                # Run async SNMP GET
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                result = loop.run_until_complete(snmp_poller.get(device_ip, item.oid, credentials))
-                loop.close()
-
-                if result.success and result.value is not None:
-                    # Prepare metric for VictoriaMetrics
-                    metric = {
-                        "metric_name": _sanitize_metric_name(item.name),
-                        "value": float(result.value) if result.value_type in ["integer", "gauge", "counter32", "counter64"] else 0,
-                        "labels": {
-                            "device": device.name or device_ip,
-                            "device_id": str(device_id),
-                            "ip": device_ip,
-                            "item": item.name,
-                            "oid": item.oid,
-                        },
-                        "timestamp": datetime.utcnow(),
-                    }
-
-                    metrics_to_write.append(metric)
-                    logger.debug(f"Polled {device_ip} - {item.name}: {result.value}")
-                else:
-                    logger.warning(f"Failed to poll {device_ip} - {item.name}: {result.error}")
+    Args:
+        device_id: Device UUID
+    """
+    try:
+        logger.info(f"Polling device: {device_id}")
 
-            except Exception as e:
-                logger.error(f"Error polling item {item.name} for device {device_id}: {e}")
+        plan = get_plan_cache().get_device_plan(device_id)
+        if plan is None:
+            logger.debug(f"No poll plan for device {device_id} (monitoring inactive, no items or no credentials)")
+            return
+
+        snmp_poller = get_snmp_poller()
+
+        # Poll all monitoring items in as few PDUs as the device accepts
+        results = _run_async(snmp_poller.get_batch(plan.ip, list(plan.request_oids), plan.credentials))
+        metrics_to_write = build_plan_metrics(plan, results, datetime.utcnow(), rates=False)
 
-        # Write metrics to VictoriaMetrics in bulk
+        # Queue metrics for the background VictoriaMetrics writer
         if metrics_to_write:
-            vm_client.write_metrics_bulk(metrics_to_write)
-            logger.info(f"Wrote {len(metrics_to_write)} metrics for device {device_id}")
+            get_metrics_writer().add(metrics_to_write)
+            logger.info(f"Queued {len(metrics_to_write)} metrics for device {device_id}")
 
-        db.close()
         return {"device_id": device_id, "metrics_written": len(metrics_to_write)}
 
     except Exception as e:
@@ -119,29 +107,75 @@ def poll_all_devices_snmp():
     Poll all devices with SNMP monitoring items
     """
     try:
-        db = SessionLocal()
+        device_ids = get_plan_cache().get_device_ids()
+        chunks = _chunks(device_ids, POLL_CHUNK_SIZE)
 
-        # Check if standalone monitoring is enabled
-        profile = db.query(MonitoringProfile).filter_by(is_active=True).first()
-        if not profile or profile.mode == MonitoringMode.ZABBIX:
-            db.close()
-            return
+        logger.info(f"Polling {len(device_ids)} devices in {len(chunks)} batches")
 
-        # Get all devices with monitoring items
-        devices = db.query(MonitoringItem.device_id).distinct().all()
-        device_ids = [str(d.device_id) for d in devices]
+        # One message per chunk; each batch polls its devices concurrently
+        for chunk in chunks:
+            poll_devices_snmp_batch.delay(chunk)
 
-        logger.info(f"Polling {len(device_ids)} devices")
+        return {"devices_scheduled": len(device_ids), "batches": len(chunks)}
 
-        # Schedule individual polling tasks
-        for device_id in device_ids:
-            poll_device_snmp.delay(device_id)
+    except Exception as e:
+        logger.error(f"Error in poll_all_devices_snmp: {e}")
+        raise
 
-        db.close()
-        return {"devices_scheduled": len(device_ids)}
+
+@shared_task(bind=True, name="monitoring.tasks.poll_devices_snmp_batch")
+def poll_devices_snmp_batch(self, device_ids: List[str]):
+    """
+    Poll a chunk of devices concurrently on the worker's event loop
+
+    All samples of the chunk are handed to the background writer at once.
+    Counter "<metric>_rate" series are not produced here: chunks land on any
+    prefork child, so no process sees every poll of a device. Rates come from
+    the poller service (monitoring/poller_service.py).
+
+    Args:
+        device_ids: Device UUIDs
+    """
+    try:
+        plan_cache = get_plan_cache()
+        plans = [plan for plan in (plan_cache.get_device_plan(device_id) for device_id in device_ids) if plan is not None]
+
+        snmp_poller = get_snmp_poller()
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        failed = []
+
+        async def poll(plan) -> List[Dict[str, Any]]:
+            try:
+                async with semaphore:
+                    results = await snmp_poller.get_batch(plan.ip, list(plan.request_oids), plan.credentials)
+                return build_plan_metrics(plan, results, datetime.utcnow(), rates=False)
+            except Exception as e:
+                logger.error(f"Error polling device {plan.device_id} ({plan.ip}): {e}")
+                failed.append(plan.device_id)
+                return []
+
+        async def poll_all():
+            return await asyncio.gather(*(poll(plan) for plan in plans))
+
+        metrics_to_write = [metric for metrics in _run_async(poll_all()) for metric in metrics]
+
+        if metrics_to_write:
+            get_metrics_writer().add(metrics_to_write)
+
+        logger.info(
+            f"Polled batch of {len(plans)} devices ({len(device_ids) - len(plans)} without plan, "
+            f"{len(failed)} failed): {len(metrics_to_write)} metrics"
+        )
+        return {
+            "devices": len(device_ids),
+            "polled": len(plans) - len(failed),
+            "skipped": len(device_ids) - len(plans),
+            "failed": failed,
+            "metrics_written": len(metrics_to_write),
+        }
 
     except Exception as e:
-        logger.error(f"Error in poll_all_devices_snmp: {e}")
+        logger.error(f"Error in poll_devices_snmp_batch: {e}")
         raise
 
 
@@ -155,33 +189,11 @@ def ping_device(device_id: str, device_ip: str):
         device_ip: Device IP address
     """
     try:
-        from icmplib import ping
-
-        # Perform ping
-        host = ping(device_ip, count=5, interval=0.2, timeout=2, privileged=False)
-
-        # Write metrics to VictoriaMetrics
-        vm_client = get_victoria_client()
-
-        metrics = [
-            {
-                "metric_name": "ping_rtt_ms",
-                "value": host.avg_rtt,
-                "labels": {"device_id": device_id, "ip": device_ip},
-            },
-            {
-                "metric_name": "ping_packet_loss",
-                "value": host.packet_loss,
-                "labels": {"device_id": device_id, "ip": device_ip},
-            },
-            {
-                "metric_name": "ping_is_alive",
-                "value": 1 if host.is_alive else 0,
-                "labels": {"device_id": device_id, "ip": device_ip},
-            },
-        ]
+        host = _run_async(get_icmp_engine().ping_addresses([device_ip])).get(device_ip)
+        if host is None:
+            raise ValueError(f"Cannot ping {device_ip!r}")
 
-        vm_client.write_metrics_bulk(metrics)
+        get_metrics_writer().add(build_ping_metrics(device_id, device_ip, host))
         logger.debug(f"Pinged {device_ip}: RTT={host.avg_rtt}ms, Loss={host.packet_loss}%")
 
         return {
@@ -216,77 +228,62 @@ def ping_all_devices():
 
         devices = db.query(Device).filter_by(is_active=True).all()
 
-        logger.info(f"Pinging {len(devices)} devices")
+        targets = [[str(device.id), device.ip] for device in devices if device.ip]
+        chunks = _chunks(targets, PING_CHUNK_SIZE)
+
+        logger.info(f"Pinging {len(targets)} devices in {len(chunks)} batches")
 
-        # Schedule individual ping tasks
-        for device in devices:
-            if device.ip:
-                ping_device.delay(str(device.id), device.ip)
+        # One message per chunk; each batch pings its devices concurrently
+        for chunk in chunks:
+            ping_devices_batch.delay(chunk)
 
         db.close()
-        return {"devices_scheduled": len(devices)}
+        return {"devices_scheduled": len(targets), "batches": len(chunks)}
 
     except Exception as e:
         logger.error(f"Error in ping_all_devices: {e}")
         raise
 
 
-@shared_task(name="monitoring.tasks.check_alert_rules")
-def check_alert_rules():
+@shared_task(name="monitoring.tasks.ping_devices_batch")
+def ping_devices_batch(devices: List[List[str]]):
     """
-    Check all alert rules and trigger alerts if conditions met
+    Ping a chunk of devices concurrently with the async ICMP engine
+
+    All samples of the chunk are handed to the background writer at once.
+
+    Args:
+        devices: [device_id, device_ip] pairs
     """
     try:
-        db = SessionLocal()
+        metrics, summary = _run_async(get_icmp_engine().ping_devices([(device_id, ip) for device_id, ip in devices]))
 
-        # Get all enabled alert rules
-        rules = db.query(AlertRule).filter_by(enabled=True).all()
+        if metrics:
+            get_metrics_writer().add(metrics)
 
-        logger.info(f"Checking {len(rules)} alert rules")
+        logger.info(f"Pinged batch of {summary['devices']} devices: {summary['alive']} alive")
+        summary["metrics_written"] = len(metrics)
+        return summary
 
-        vm_client = get_victoria_client()
-        triggered_alerts = 0
+    except Exception as e:
+        logger.error(f"Error in ping_devices_batch: {e}")
+        raise
 
-        for rule in rules:
-            try:
-                # Query VictoriaMetrics with rule expression
-                # This is a simplified version - full implementation would parse expression
-                result = vm_client.query(rule.expression)
-
-                if result and result.get("status") == "success":
-                    data = result.get("data", {}).get("result", [])
-
-                    # If query returns data, condition is met
-                    if data:
-                        # Check if alert already exists
-                        existing = (
-                            db.query(AlertHistory)
-                            .filter_by(rule_id=rule.id, resolved_at=None)
-                            .first()
-                        )
-
-                        if not existing:
-                            # Create new alert
-                            alert = AlertHistory(
-                                rule_id=rule.id,
-                                device_id=rule.device_id,
-                                severity=rule.severity,
-                                message=f"Alert: {rule.name}",
-                                details={"query_result": data},
-                            )
-                            db.add(alert)
-                            db.commit()
-
-                            triggered_alerts += 1
-                            logger.warning(f"Alert triggered: {rule.name}")
-
-                            # TODO: Send notifications via configured channels
 
-            except Exception as e:
-                logger.error(f"Error checking alert rule {rule.name}: {e}")
+@shared_task(name="monitoring.tasks.check_alert_rules")
+def check_alert_rules(metrics: Optional[List[str]] = None):
+    """
+    Evaluate due alert rules and record alert state changes
 
-        db.close()
-        return {"rules_checked": len(rules), "alerts_triggered": triggered_alerts}
+    Rules are evaluated by the batched AlertEvaluator, which honours each
+    rule's evaluation_interval and for_duration.
+
+    Args:
+        metrics: Metric names whose rules are evaluated now even if not due
+                 (queued by the trap receiver on link events)
+    """
+    try:
+        return get_alert_evaluator().run_cycle(metrics)
 
     except Exception as e:
         logger.error(f"Error in check_alert_rules: {e}")
@@ -330,50 +327,50 @@ def cleanup_old_data():
         raise
 
 
-def _build_credential_data(snmp_cred: SNMPCredential) -> SNMPCredentialData:
+@shared_task(bind=True, name="monitoring.tasks.bulk_detect_devices")
+def bulk_detect_devices(self, device_ids: Optional[List[str]] = None, assign_templates: bool = True, concurrency: Optional[int] = None):
     """
-    Build SNMPCredentialData from database model
+    Detect vendor/type of many devices concurrently and assign default templates
 
-    Args:
-        snmp_cred: SNMPCredential database object
+    Progress is reported through the task state ("PROGRESS" with done/total).
 
-    Returns:
-        SNMPCredentialData object
+    Args:
+        device_ids: Device UUIDs, or None for every enabled standalone device
+        assign_templates: Create monitoring items from the vendors' default templates
+        concurrency: Devices detected at once (defaults to BULK_DETECT_CONCURRENCY)
     """
-    if snmp_cred.version == "v2c":
-        return SNMPCredentialData(
-            version="v2c", community=decrypt_credential(snmp_cred.community_encrypted) if snmp_cred.community_encrypted else "public"
-        )
-    else:  # v3
-        return SNMPCredentialData(
-            version="v3",
-            username=snmp_cred.username,
-            auth_protocol=snmp_cred.auth_protocol,
-            auth_key=decrypt_credential(snmp_cred.auth_key_encrypted) if snmp_cred.auth_key_encrypted else None,
-            priv_protocol=snmp_cred.priv_protocol,
-            priv_key=decrypt_credential(snmp_cred.priv_key_encrypted) if snmp_cred.priv_key_encrypted else None,
-            security_level=snmp_cred.security_level,
-        )
-
+    db = SessionLocal()
+    try:
+        targets, skipped = load_detection_targets(db, device_ids)
+        logger.info(f"Bulk detection of {len(targets)} devices ({len(skipped)} skipped)")
 
-def _sanitize_metric_name(name: str) -> str:
-    """
-    Sanitize metric name for Prometheus/VictoriaMetrics
+        def report(done: int, total: int):
+            self.update_state(state="PROGRESS", meta={"done": done, "total": total, "skipped": len(skipped)})
 
-    Args:
-        name: Metric name
+        report(0, len(targets))
+        outcomes = _run_async(
+            detect_devices(get_snmp_poller(), targets, concurrency or BULK_DETECT_CONCURRENCY, on_progress=report)
+        )
+        summary = apply_detection_results(db, outcomes, assign_templates)
 
-    Returns:
-        Sanitized metric name
-    """
-    # Replace spaces and special characters with underscores
-    sanitized = name.lower().replace(" ", "_").replace("-", "_").replace("(", "").replace(")", "")
+        summary["total"] = len(targets)
+        summary["skipped"] = skipped
+        summary["failed"] = [
+            {"device_id": outcome.device_id, "ip": outcome.ip, "error": outcome.error} for outcome in outcomes if not outcome.success
+        ]
 
-    # Remove consecutive underscores
-    while "__" in sanitized:
-        sanitized = sanitized.replace("__", "_")
+        logger.info(
+            f"Bulk detection complete: {summary['devices_detected']} detected, {summary['devices_failed']} failed, "
+            f"{summary['items_created']} items created"
+        )
+        return summary
 
-    return sanitized.strip("_")
+    except Exception as e:
+        logger.error(f"Error in bulk_detect_devices: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
 
 
 # ============================================
@@ -0,0 +1,426 @@
+"""
+WARD FLUX - SNMP Trap Receiver
+
+Asyncio UDP listener for SNMPv1/v2c traps and v2c informs. linkDown, linkUp,
+coldStart and warmStart notifications from monitored devices are written to
+VictoriaMetrics immediately. Link events then queue an alert evaluation of the
+rules on the affected metrics, bypassing their evaluation_interval, so link
+flaps are detected without polling ifOperStatus at a high rate. With
+ALERT_STREAMING=true the link samples are also published to the poller
+service's streaming engine, which owns threshold rules in that mode.
+
+A notification is accepted only if its source address (or the v1 agent-addr)
+belongs to a monitored device and its community matches that device's stored
+SNMP credential. SNMPv3 notifications are not supported and are dropped.
+
+linkUp/linkDown samples continue the device's ifOperStatus item series (same
+metric name and labels as the poller writes), so dashboards and alert rules
+see trap and poll data as one series. Every accepted notification is also
+counted in the snmp_trap_events series.
+
+Usage:
+    python -m monitoring.traps
+
+Set TRAP_STATUS_POLL_INTERVAL for the poller service to poll ifOperStatus
+items less often while this receiver runs.
+"""
+
+import os
+import hmac
+import json
+import signal
+import asyncio
+import logging
+import argparse
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import redis.asyncio as aioredis
+
+from database import SessionLocal
+from monitoring.alerting.stream import ALERT_SAMPLES_CHANNEL, ALERT_STREAMING
+from monitoring.models import MonitoringItem, MonitoringProfile, MonitoringMode, StandaloneDevice
+from monitoring.poller_service import MetricsBatcher
+from monitoring.snmp.credential_service import get_credential_service
+from monitoring.snmp.fastpath import (
+    PDU_INFORM,
+    SNMPDecodeError,
+    Trap,
+    decode_trap,
+    encode_inform_response,
+)
+from monitoring.snmp.oids import UNIVERSAL_OIDS
+from monitoring.poll_plan import item_labels, sanitize_metric_name
+from monitoring.sharding import REDIS_URL
+from monitoring.tasks import check_alert_rules
+
+logger = logging.getLogger(__name__)
+
+# Receiver settings
+TRAP_BIND_ADDRESS = os.getenv("SNMP_TRAP_BIND_ADDRESS", "0.0.0.0")
+TRAP_PORT = int(os.getenv("SNMP_TRAP_PORT", "162"))
+TRAP_REFRESH_INTERVAL = float(os.getenv("SNMP_TRAP_REFRESH_INTERVAL", "60"))  # Seconds between device reloads
+TRAP_QUEUE_SIZE = int(os.getenv("SNMP_TRAP_QUEUE_SIZE", "10000"))  # Datagrams buffered before dropping
+TRAP_ALERT_DEBOUNCE = float(os.getenv("SNMP_TRAP_ALERT_DEBOUNCE", "5"))  # Min seconds between triggered evaluations
+
+# Standard notifications (SNMPv2-MIB / IF-MIB)
+COLD_START = (1, 3, 6, 1, 6, 3, 1, 1, 5, 1)
+WARM_START = (1, 3, 6, 1, 6, 3, 1, 1, 5, 2)
+LINK_DOWN = (1, 3, 6, 1, 6, 3, 1, 1, 5, 3)
+LINK_UP = (1, 3, 6, 1, 6, 3, 1, 1, 5, 4)
+
+TRAP_NAMES = {
+    COLD_START: "coldStart",
+    WARM_START: "warmStart",
+    LINK_DOWN: "linkDown",
+    LINK_UP: "linkUp",
+}
+
+IF_INDEX_OID = (1, 3, 6, 1, 2, 1, 2, 2, 1, 1)
+IF_OPER_STATUS_OID = (1, 3, 6, 1, 2, 1, 2, 2, 1, 8)
+
+IF_STATUS_UP = 1
+IF_STATUS_DOWN = 2
+
+TRAP_EVENTS_METRIC = "snmp_trap_events"
+
+
+@dataclass
+class TrapDevice:
+    """A monitored device that may send notifications"""
+
+    device_id: str
+    name: str
+    ip: str
+    community: Optional[str]  # None for v3 devices (their notifications are dropped)
+    status_items: Dict[int, Tuple[str, str]] = field(default_factory=dict)  # ifIndex -> (item name, OID)
+
+
+def load_trap_devices() -> Dict[str, TrapDevice]:
+    """
+    Load monitored devices, their v2c communities and ifOperStatus items
+
+    Returns:
+        Dictionary of device IP -> TrapDevice (empty if standalone monitoring is inactive)
+    """
+    db = SessionLocal()
+    try:
+        profile = db.query(MonitoringProfile).filter_by(is_active=True).first()
+        if not profile or profile.mode == MonitoringMode.ZABBIX:
+            return {}
+
+        devices = db.query(StandaloneDevice).filter_by(enabled=True).all()
+        creds = get_credential_service().load_all(db)
+        status_prefix = UNIVERSAL_OIDS["ifOperStatus"].oid + "."
+        items = db.query(MonitoringItem).filter(MonitoringItem.oid.like(f"{status_prefix}%"), MonitoringItem.enabled == True).all()
+
+        by_ip: Dict[str, TrapDevice] = {}
+        by_id: Dict[Any, TrapDevice] = {}
+        for device in devices:
+            cred = creds.get(str(device.id))
+            if not device.ip or not cred:
+                continue
+
+            community = cred.community if cred.version == "v2c" else None
+            trap_device = TrapDevice(device_id=str(device.id), name=device.name or device.ip, ip=device.ip, community=community)
+            by_ip[device.ip] = trap_device
+            by_id[device.id] = trap_device
+
+        for item in items:
+            trap_device = by_id.get(item.device_id)
+            if trap_device is None:
+                continue
+            try:
+                if_index = int(item.oid[len(status_prefix):])
+            except ValueError:
+                continue
+            trap_device.status_items[if_index] = (item.oid_name, item.oid)
+
+        return by_ip
+    finally:
+        db.close()
+
+
+class _TrapProtocol(asyncio.DatagramProtocol):
+    def __init__(self, receiver: "TrapReceiver"):
+        self.receiver = receiver
+
+    def connection_made(self, transport):
+        self.receiver._transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        try:
+            self.receiver._queue.put_nowait((data, addr))
+        except asyncio.QueueFull:
+            self.receiver.stats["dropped"] += 1
+
+
+class TrapReceiver:
+    """
+    Asyncio SNMP notification receiver
+
+    Datagrams are queued by the socket callback and processed by a worker
+    task, which validates them against the device map, acknowledges informs,
+    queues samples on a MetricsBatcher and schedules alert evaluation.
+    """
+
+    def __init__(
+        self,
+        bind_address: str = TRAP_BIND_ADDRESS,
+        port: int = TRAP_PORT,
+        refresh_interval: float = TRAP_REFRESH_INTERVAL,
+        alert_debounce: float = TRAP_ALERT_DEBOUNCE,
+    ):
+        self.bind_address = bind_address
+        self.port = port
+        self.refresh_interval = refresh_interval
+        self.alert_debounce = alert_debounce
+        self.batcher = MetricsBatcher(flush_interval=1.0)
+
+        self._devices: Dict[str, TrapDevice] = {}
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=TRAP_QUEUE_SIZE)
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._stop = asyncio.Event()
+        self._link_event = asyncio.Event()
+        self._link_metrics: Set[str] = set()  # Metric names touched by link events since the last check
+        self._link_samples: List[Dict[str, Any]] = []  # Link samples waiting to be published (ALERT_STREAMING)
+        self._redis: Optional[aioredis.Redis] = None
+        self._last_alert_check = 0.0
+
+        self.stats: Dict[str, int] = {
+            "received": 0,
+            "accepted": 0,
+            "malformed": 0,
+            "unknown_source": 0,
+            "bad_community": 0,
+            "informs_acknowledged": 0,
+            "dropped": 0,
+            "alert_checks": 0,
+            "samples_published": 0,
+        }
+
+    async def refresh_devices(self):
+        """Reload the device map from the database"""
+        loop = asyncio.get_running_loop()
+        try:
+            self._devices = await loop.run_in_executor(None, load_trap_devices)
+            logger.debug(f"Trap receiver knows {len(self._devices)} devices")
+        except Exception as e:
+            logger.error(f"Failed to load trap devices: {e}")
+
+    async def run(self):
+        """Run the receiver until stop() is called"""
+        loop = asyncio.get_running_loop()
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except NotImplementedError:
+                pass
+
+        await self.refresh_devices()
+        await loop.create_datagram_endpoint(lambda: _TrapProtocol(self), local_addr=(self.bind_address, self.port))
+        logger.info(f"SNMP trap receiver listening on {self.bind_address}:{self.port}")
+
+        flusher = asyncio.create_task(self.batcher.run(self._stop))
+        worker = asyncio.create_task(self._process_loop())
+        refresher = asyncio.create_task(self._refresh_loop())
+        link_events = asyncio.create_task(self._link_event_loop())
+
+        await self._stop.wait()
+
+        for task in (worker, refresher, link_events):
+            task.cancel()
+        await asyncio.gather(worker, refresher, link_events, return_exceptions=True)
+        await flusher
+        await self.batcher.flush()
+
+        if self._transport:
+            self._transport.close()
+        if self._redis is not None:
+            await self._redis.aclose()
+
+        logger.info(f"SNMP trap receiver stopped: {self.stats}")
+
+    def stop(self):
+        """Request a graceful shutdown"""
+        self._stop.set()
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh_devices()
+
+    async def _process_loop(self):
+        while True:
+            data, addr = await self._queue.get()
+            try:
+                await self.handle_datagram(data, addr)
+            except Exception as e:
+                logger.error(f"Error handling SNMP notification from {addr[0]}: {e}")
+
+    async def handle_datagram(self, data: bytes, addr):
+        """
+        Validate and process one received datagram
+
+        Args:
+            data: Datagram payload
+            addr: Sender (ip, port)
+        """
+        self.stats["received"] += 1
+
+        try:
+            trap = decode_trap(data)
+        except SNMPDecodeError as e:
+            self.stats["malformed"] += 1
+            logger.debug(f"Dropping undecodable notification from {addr[0]}: {e}")
+            return
+
+        device = self._devices.get(addr[0]) or (self._devices.get(trap.agent_addr) if trap.agent_addr else None)
+        if device is None:
+            self.stats["unknown_source"] += 1
+            logger.debug(f"Dropping notification from unmonitored address {addr[0]}")
+            return
+
+        if device.community is None or not hmac.compare_digest(device.community.encode(), trap.community.encode()):
+            self.stats["bad_community"] += 1
+            logger.warning(f"Dropping notification from {device.name} ({addr[0]}): community mismatch")
+            return
+
+        if trap.pdu_type == PDU_INFORM and self._transport is not None:
+            self._transport.sendto(encode_inform_response(trap), addr)
+            self.stats["informs_acknowledged"] += 1
+
+        self.stats["accepted"] += 1
+        metrics = self.build_metrics(device, trap, datetime.utcnow())
+        await self.batcher.add(metrics)
+
+        if trap.trap_oid in (LINK_DOWN, LINK_UP):
+            # Handled by _link_event_loop so datagram processing never waits on the writer
+            self._link_metrics.update(metric["metric_name"] for metric in metrics)
+            if ALERT_STREAMING:
+                self._link_samples.extend(metrics)
+            self._link_event.set()
+
+    def build_metrics(self, device: TrapDevice, trap: Trap, timestamp: datetime) -> List[Dict[str, Any]]:
+        """
+        Build VictoriaMetrics samples for an accepted notification
+
+        Args:
+            device: Sending device
+            trap: Decoded notification
+            timestamp: Receive time
+
+        Returns:
+            List of metric dictionaries for write_metrics_bulk
+        """
+        trap_name = TRAP_NAMES.get(trap.trap_oid, ".".join(map(str, trap.trap_oid)))
+        device_labels = {"device": device.name, "device_id": device.device_id, "ip": device.ip}
+
+        if_index, status = self._link_state(trap)
+        event_labels = dict(device_labels, trap=trap_name)
+        if if_index is not None:
+            event_labels["ifindex"] = str(if_index)
+
+        metrics = [{"metric_name": TRAP_EVENTS_METRIC, "value": 1.0, "labels": event_labels, "timestamp": timestamp}]
+
+        if status is not None and if_index in device.status_items:
+            item_name, oid = device.status_items[if_index]
+            labels = item_labels(device.name, device.device_id, device.ip, item_name, oid)
+            metrics.append({"metric_name": sanitize_metric_name(item_name), "value": float(status), "labels": labels, "timestamp": timestamp})
+
+        logger.info(f"SNMP {trap_name} from {device.name}" + (f" ifIndex {if_index}" if if_index is not None else ""))
+        return metrics
+
+    @staticmethod
+    def _link_state(trap: Trap) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Extract (ifIndex, ifOperStatus) from a linkUp/linkDown notification
+
+        Returns:
+            ifIndex and status, either None if not present / not a link notification
+        """
+        if trap.trap_oid not in (LINK_DOWN, LINK_UP):
+            return None, None
+
+        if_index = None
+        status = None
+        for oid, value in trap.var_binds:
+            if oid[:-1] == IF_INDEX_OID and value.value_type == "integer":
+                if_index = value.value
+            elif oid[:-1] == IF_OPER_STATUS_OID and value.value_type == "integer":
+                if_index = oid[-1]
+                status = value.value
+
+        if status is None:
+            status = IF_STATUS_DOWN if trap.trap_oid == LINK_DOWN else IF_STATUS_UP
+
+        return if_index, status
+
+    async def _link_event_loop(self):
+        """
+        Hand link events to alerting, at most once per alert_debounce seconds
+
+        Each round publishes the samples to the streaming engine (ALERT_STREAMING),
+        flushes them to VictoriaMetrics and queues a forced check_alert_rules for
+        the affected metrics. Events arriving meanwhile are coalesced into the next round.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._link_event.wait()
+
+            delay = self._last_alert_check + self.alert_debounce - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._link_event.clear()
+
+            metric_names, self._link_metrics = self._link_metrics, set()
+            samples, self._link_samples = self._link_samples, []
+
+            if samples:
+                await self._publish_samples(samples)
+
+            # Make link events visible to alerting without waiting for the next periodic flush
+            try:
+                await self.batcher.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush link events: {e}")
+            await self._trigger_alert_check(metric_names)
+
+    async def _publish_samples(self, samples: List[Dict[str, Any]]):
+        """Publish link samples for the poller service's streaming alert engine"""
+        try:
+            if self._redis is None:
+                self._redis = aioredis.from_url(REDIS_URL)
+            await self._redis.publish(ALERT_SAMPLES_CHANNEL, json.dumps(samples, default=str))
+            self.stats["samples_published"] += len(samples)
+        except Exception as e:
+            logger.error(f"Failed to publish link samples for streaming alerts: {e}")
+
+    async def _trigger_alert_check(self, metric_names: Set[str]):
+        loop = asyncio.get_running_loop()
+        self._last_alert_check = loop.time()
+        try:
+            # Forced: rules on these metrics are evaluated even if their evaluation_interval has not elapsed
+            await loop.run_in_executor(None, lambda: check_alert_rules.delay(metrics=sorted(metric_names)))
+            self.stats["alert_checks"] += 1
+        except Exception as e:
+            logger.error(f"Failed to queue alert evaluation: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WARD FLUX SNMP trap receiver")
+    parser.add_argument("--bind", default=TRAP_BIND_ADDRESS, help="Address to listen on")
+    parser.add_argument("--port", type=int, default=TRAP_PORT, help="UDP port to listen on")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="[%(asctime)s: %(levelname)s/%(name)s] %(message)s",
+    )
+    asyncio.run(TrapReceiver(bind_address=args.bind, port=args.port).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""
+WARD FLUX - Async VictoriaMetrics Client
+
+httpx-based sibling of VictoriaMetricsClient for async code (FastAPI routes),
+with the same write/query/query_range API. One pooled AsyncClient keeps
+keep-alive connections to VictoriaMetrics; every call accepts its own timeout.
+Many queries can be awaited concurrently (asyncio.gather) without threads.
+
+Range queries share the step-aligned QueryRangeCache logic of the sync client,
+and get_latest_values uses the same regex-matcher batching.
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import httpx
+
+from monitoring.victoria.client import (
+    LATEST_QUERY_CONCURRENCY,
+    QUERY_CACHE_SIZE,
+    QueryRangeCache,
+    build_selector_queries,
+    format_series,
+    get_series_cache,
+    parse_step,
+    split_latest_results,
+)
+
+logger = logging.getLogger(__name__)
+
+VM_ASYNC_MAX_CONNECTIONS = int(os.getenv("VM_ASYNC_MAX_CONNECTIONS", "100"))  # Concurrent connections
+VM_ASYNC_MAX_KEEPALIVE = int(os.getenv("VM_ASYNC_MAX_KEEPALIVE", "20"))  # Idle connections kept open
+VM_ASYNC_TIMEOUT = float(os.getenv("VM_ASYNC_TIMEOUT", "10"))  # Default seconds per call
+
+# Sentinel: use the client's default timeout
+_DEFAULT = object()
+
+
+class AsyncVictoriaMetricsClient:
+    """
+    Async VictoriaMetrics HTTP API client
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        max_connections: int = VM_ASYNC_MAX_CONNECTIONS,
+        max_keepalive: int = VM_ASYNC_MAX_KEEPALIVE,
+        timeout: float = VM_ASYNC_TIMEOUT,
+    ):
+        """
+        Initialize async VictoriaMetrics client
+
+        Args:
+            base_url: VictoriaMetrics base URL (defaults to env VICTORIA_URL)
+            max_connections: Maximum concurrent connections
+            max_keepalive: Maximum idle keep-alive connections
+            timeout: Default timeout in seconds for each call
+        """
+        self.base_url = base_url or os.getenv("VICTORIA_URL", "http://localhost:8428")
+        self.timeout = timeout
+        self.query_cache = QueryRangeCache() if QUERY_CACHE_SIZE > 0 else None
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+            timeout=timeout,
+        )
+
+        logger.info(f"Async VictoriaMetrics client initialized: {self.base_url}")
+
+    def _timeout(self, timeout) -> Any:
+        return self.timeout if timeout is _DEFAULT else timeout
+
+    async def write_metric(
+        self,
+        metric_name: str,
+        value: float,
+        labels: Optional[Dict[str, str]] = None,
+        timestamp: Optional[datetime] = None,
+        timeout: Optional[float] = _DEFAULT,
+    ) -> bool:
+        """
+        Write a single metric to VictoriaMetrics
+
+        Args:
+            metric_name: Metric name (e.g., "cpu_usage")
+            value: Metric value
+            labels: Optional metric labels
+            timestamp: Optional timestamp (defaults to now)
+            timeout: Seconds for this call (None = no timeout)
+
+        Returns:
+            True if successful, False otherwise
+        """
+        ts_ms = int((timestamp or datetime.utcnow()).timestamp() * 1000)
+        line = f"{format_series(metric_name, labels)} {value} {ts_ms}"
+        return await self._import(line.encode(), 1, timeout)
+
+    async def write_metrics_bulk(self, metrics: List[Dict[str, Any]], timeout: Optional[float] = _DEFAULT) -> bool:
+        """
+        Write multiple metrics in a single request
+
+        Args:
+            metrics: Metric dictionaries as accepted by VictoriaMetricsClient.write_metrics_bulk
+            timeout: Seconds for this call (None = no timeout)
+
+        Returns:
+            True if successful, False otherwise
+        """
+        data = bytearray()
+        count = get_series_cache().render(metrics, data)
+        return await self._import(bytes(data), count, timeout)
+
+    async def _import(self, data: bytes, count: int, timeout) -> bool:
+        try:
+            response = await self.client.post("/api/v1/import/prometheus", content=data, timeout=self._timeout(timeout))
+
+            if response.status_code == 204:
+                logger.debug(f"Bulk write successful: {count} metrics")
+                return True
+            else:
+                logger.error(f"Bulk write failed: {response.status_code} - {response.text}")
+                return False
+
+        except Exception as e:
+            logger.error(f"Error writing bulk metrics: {e}")
+            return False
+
+    async def query(self, query: str, time: Optional[datetime] = None, timeout: Optional[float] = _DEFAULT) -> Optional[Dict]:
+        """
+        Execute instant query (PromQL)
+
+        Args:
+            query: PromQL query string
+            time: Optional query time (defaults to now)
+            timeout: Seconds for this call (None = no timeout)
+
+        Returns:
+            Query result as dictionary or None on error
+        """
+        try:
+            params = {"query": query}
+            if time:
+                params["time"] = int(time.timestamp())
+
+            response = await self.client.get("/api/v1/query", params=params, timeout=self._timeout(timeout))
+
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.error(f"Query failed: {response.status_code} - {response.text}")
+                return None
+
+        except Exception as e:
+            logger.error(f"Error executing query '{query}': {e}")
+            return None
+
+    async def query_range(
+        self, query: str, start: datetime, end: datetime, step: str = "60s", timeout: Optional[float] = _DEFAULT
+    ) -> Optional[Dict]:
+        """
+        Execute range query (PromQL), served from the step-aligned range cache
+
+        Args:
+            query: PromQL query string
+            start: Start time
+            end: End time
+            step: Query resolution (e.g., "60s", "5m", "1h")
+            timeout: Seconds per VictoriaMetrics request (None = no timeout)
+
+        Returns:
+            Query result as dictionary or None on error
+        """
+        start_ts, end_ts = int(start.timestamp()), int(end.timestamp())
+        step_seconds = parse_step(step) if self.query_cache else None
+        if step_seconds is None:
+            return await self._query_range(query, start_ts, end_ts, step, timeout)
+
+        plan = self.query_cache.plan(query, start_ts, end_ts, step_seconds)
+        if plan is None:
+            return await self._query_range(query, start_ts, end_ts, step_seconds, timeout)
+
+        results = await asyncio.gather(
+            *(self._query_range(query, fetch_start, fetch_end, step_seconds, timeout) for fetch_start, fetch_end in plan.missing)
+        )
+
+        fetched: List[Dict[str, Any]] = []
+        for result in results:
+            if not result or result.get("status") != "success":
+                return result
+            data = result.get("data", {})
+            if data.get("resultType") != "matrix":
+                return await self._query_range(query, start_ts, end_ts, step_seconds, timeout)
+            fetched.extend(data.get("result", []))
+
+        return self.query_cache.merge(plan, fetched)
+
+    async def _query_range(self, query: str, start: int, end: int, step, timeout) -> Optional[Dict]:
+        """Execute a range query against VictoriaMetrics (epoch-second bounds)"""
+        try:
+            params = {"query": query, "start": start, "end": end, "step": step}
+            response = await self.client.get("/api/v1/query_range", params=params, timeout=self._timeout(timeout))
+
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.error(f"Range query failed: {response.status_code} - {response.text}")
+                return None
+
+        except Exception as e:
+            logger.error(f"Error executing range query '{query}': {e}")
+            return None
+
+    async def get_latest_value(
+        self, metric_name: str, labels: Optional[Dict[str, str]] = None, timeout: Optional[float] = _DEFAULT
+    ) -> Optional[float]:
+        """
+        Get latest value for a metric
+
+        Args:
+            metric_name: Metric name
+            labels: Optional label filters
+            timeout: Seconds for this call (None = no timeout)
+
+        Returns:
+            Latest metric value or None
+        """
+        result = await self.query(format_series(metric_name, labels), timeout=timeout)
+
+        if result and result.get("status") == "success":
+            result_data = result.get("data", {}).get("result", [])
+            if result_data:
+                value = result_data[0].get("value", [None, None])[1]
+                try:
+                    return float(value) if value is not None else None
+                except ValueError:
+                    return None
+
+        return None
+
+    async def get_latest_values(
+        self,
+        selectors: List[Tuple[str, Mapping[str, Any]]],
+        concurrency: int = LATEST_QUERY_CONCURRENCY,
+        timeout: Optional[float] = _DEFAULT,
+    ) -> List[Optional[float]]:
+        """
+        Get latest values for many series in as few instant queries as possible
+
+        Args:
+            selectors: (metric name, labels) pairs
+            concurrency: Maximum queries in flight
+            timeout: Seconds per query (None = no timeout)
+
+        Returns:
+            Latest value per selector (None if missing or on error), in selector order
+        """
+        values: List[Optional[float]] = [None] * len(selectors)
+        queries = build_selector_queries(selectors)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(query: str) -> Optional[Dict]:
+            async with semaphore:
+                return await self.query(query, timeout=timeout)
+
+        results = await asyncio.gather(*(run(query) for query, _, _ in queries))
+        split_latest_results(queries, results, values)
+        return values
+
+    async def health_check(self, timeout: Optional[float] = 5.0) -> bool:
+        """
+        Check if VictoriaMetrics is healthy
+
+        Returns:
+            True if healthy, False otherwise
+        """
+        try:
+            response = await self.client.get("/health", timeout=timeout)
+            return response.status_code == 200
+
+        except Exception as e:
+            logger.error(f"Health check failed: {e}")
+            return False
+
+    async def delete_metrics(self, match: str, timeout: Optional[float] = _DEFAULT) -> bool:
+        """
+        Delete metrics matching selector
+
+        Args:
+            match: Metric selector (e.g., '{device="router1"}')
+            timeout: Seconds for this call (None = no timeout)
+
+        Returns:
+            True if successful, False otherwise
+
+        Warning: Use with caution! This permanently deletes data.
+        """
+        try:
+            response = await self.client.post(
+                "/api/v1/admin/tsdb/delete_series", params={"match[]": match}, timeout=self._timeout(timeout)
+            )
+
+            if response.status_code == 204:
+                logger.warning(f"Metrics deleted: {match}")
+                return True
+            else:
+                logger.error(f"Delete failed: {response.status_code} - {response.text}")
+                return False
+
+        except Exception as e:
+            logger.error(f"Error deleting metrics '{match}': {e}")
+            return False
+
+    async def aclose(self):
+        """Close pooled connections"""
+        await self.client.aclose()
+        logger.info("Async VictoriaMetrics client closed")
+
+
+# Singleton instance
+_async_vm_client: Optional[AsyncVictoriaMetricsClient] = None
+
+
+def get_async_victoria_client() -> AsyncVictoriaMetricsClient:
+    """
+    Get or create AsyncVictoriaMetricsClient singleton
+
+    Must be used from the application's event loop.
+
+    Returns:
+        AsyncVictoriaMetricsClient instance
+    """
+    global _async_vm_client
+
+    if _async_vm_client is None:
+        _async_vm_client = AsyncVictoriaMetricsClient()
+
+    return _async_vm_client
+
+
+async def close_async_victoria_client():
+    """Close the singleton (application shutdown)"""
+    global _async_vm_client
+
+    if _async_vm_client is not None:
+        await _async_vm_client.aclose()
+        _async_vm_client = None
@@ -5,15 +5,518 @@ HTTP client for VictoriaMetrics API with Prometheus-compatible metrics.
 """
 
 import os
+import re
+import time
 import logging
-from typing import Dict, List, Optional, Any
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Any, Tuple
 from datetime import datetime, timedelta
 import requests
-from urllib.parse import urljoin
+from urllib.parse import quote, urljoin
 
 logger = logging.getLogger(__name__)
 
 
+SERIES_CACHE_SIZE = int(os.getenv("VM_SERIES_CACHE_SIZE", "500000"))  # Rendered series kept per process
+
+# Range query cache
+QUERY_CACHE_SIZE = int(os.getenv("VM_QUERY_CACHE_SIZE", "4096"))  # Cached buckets (0 disables the cache)
+QUERY_CACHE_BUCKET_POINTS = int(os.getenv("VM_QUERY_CACHE_BUCKET_POINTS", "240"))  # Steps per bucket
+QUERY_CACHE_TTL = float(os.getenv("VM_QUERY_CACHE_TTL", "600"))  # seconds before a bucket is refetched (picks up backfill)
+QUERY_CACHE_LAG = float(os.getenv("VM_QUERY_CACHE_LAG", "60"))  # seconds: newer points may still be ingested, never cached
+
+# Batched latest-value lookups
+LATEST_QUERY_MAX_LENGTH = int(os.getenv("VM_LATEST_QUERY_MAX_LENGTH", "6000"))  # URL-encoded query characters per request
+LATEST_QUERY_CONCURRENCY = int(os.getenv("VM_LATEST_QUERY_CONCURRENCY", "8"))  # Queries in flight
+
+STEP_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+STEP_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)(ms|s|m|h|d|w)?$")
+
+_LABEL_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n"})
+_REGEX_ESCAPES = str.maketrans({char: "\\" + char for char in "\\.+*?()|[]{}^$"})
+
+
+def escape_label_value(value: Any) -> str:
+    """
+    Escape a label value for Prometheus exposition format and PromQL selectors
+
+    Args:
+        value: Label value
+
+    Returns:
+        Value with backslashes, double quotes and newlines escaped
+    """
+    return str(value).translate(_LABEL_ESCAPES)
+
+
+def format_series(metric_name: str, labels: Optional[Mapping[str, Any]] = None) -> str:
+    """
+    Render a series identifier in Prometheus exposition format
+
+    Args:
+        metric_name: Metric name
+        labels: Optional metric labels
+
+    Returns:
+        Series string (e.g., 'cpu_usage{device="router1"}')
+    """
+    if not labels:
+        return metric_name
+
+    label_pairs = [f'{key}="{escape_label_value(value)}"' for key, value in labels.items()]
+    return metric_name + "{" + ",".join(label_pairs) + "}"
+
+
+class SeriesCache:
+    """
+    Interned series prefixes
+
+    Maps (metric name, labels) -> encoded 'series ' prefix, so a sample line is
+    rendered by appending the cached prefix plus value and timestamp to a byte
+    buffer. When the cache reaches max_size it is cleared and rebuilt from the
+    series still being written.
+    """
+
+    def __init__(self, max_size: int = SERIES_CACHE_SIZE):
+        """
+        Initialize cache
+
+        Args:
+            max_size: Maximum number of cached series
+        """
+        self.max_size = max_size
+        self._prefixes: Dict[Any, bytes] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def prefix(self, metric: Mapping[str, Any]) -> bytes:
+        """
+        Get the encoded series prefix of a metric dictionary
+
+        Args:
+            metric: Metric dictionary as accepted by write_metrics_bulk
+
+        Returns:
+            Series followed by a space, as bytes
+        """
+        series = metric.get("series")
+        if series is not None:
+            key = series
+        else:
+            labels = metric.get("labels")
+            key = (metric["metric_name"], tuple(labels.items()) if labels else ())
+
+        prefix = self._prefixes.get(key)
+        if prefix is not None:
+            self.hits += 1
+            return prefix
+
+        self.misses += 1
+        prefix = ((series or format_series(metric["metric_name"], metric.get("labels"))) + " ").encode()
+        if len(self._prefixes) >= self.max_size:
+            self._prefixes.clear()
+        self._prefixes[key] = prefix
+        return prefix
+
+    def render(self, metrics: List[Mapping[str, Any]], buffer: bytearray) -> int:
+        """
+        Append metrics as Prometheus text lines to a byte buffer
+
+        Args:
+            metrics: Metric dictionaries as accepted by write_metrics_bulk
+            buffer: Buffer to append to
+
+        Returns:
+            Number of lines appended
+        """
+        now_ms = int(datetime.utcnow().timestamp() * 1000)
+        last_timestamp, last_ms = None, now_ms
+
+        for metric in metrics:
+            timestamp = metric.get("timestamp")
+            if timestamp is None:
+                ts_ms = now_ms
+            elif timestamp is last_timestamp:
+                ts_ms = last_ms  # Samples of one poll share their datetime
+            else:
+                ts_ms = last_ms = int(timestamp.timestamp() * 1000)
+                last_timestamp = timestamp
+
+            buffer += self.prefix(metric)
+            buffer += f"{metric['value']} {ts_ms}\n".encode()
+
+        return len(metrics)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"size": len(self._prefixes), "hits": self.hits, "misses": self.misses}
+
+
+# Singleton instance
+_series_cache: Optional[SeriesCache] = None
+
+
+def get_series_cache() -> SeriesCache:
+    """
+    Get or create SeriesCache singleton
+
+    Returns:
+        SeriesCache instance
+    """
+    global _series_cache
+
+    if _series_cache is None:
+        _series_cache = SeriesCache()
+
+    return _series_cache
+
+
+def parse_step(step: str) -> Optional[int]:
+    """
+    Parse a query_range step into whole seconds
+
+    Args:
+        step: Step as accepted by VictoriaMetrics (e.g., "60s", "5m", "30")
+
+    Returns:
+        Step in seconds, or None if it is not a whole positive number of seconds
+    """
+    match = STEP_PATTERN.match(str(step).strip())
+    if not match:
+        return None
+    seconds = float(match.group(1)) * STEP_UNITS[match.group(2) or "s"]
+    if seconds < 1 or seconds != int(seconds):
+        return None
+    return int(seconds)
+
+
+def build_selector_queries(
+    selectors: List[Tuple[str, Mapping[str, Any]]], max_length: int = LATEST_QUERY_MAX_LENGTH
+) -> List[Tuple[str, Optional[str], Dict[str, List[int]]]]:
+    """
+    Collapse many series selectors into few regex-matcher queries
+
+    Selectors with the same metric and label names are grouped; the label with
+    the most distinct values becomes a regex matcher (e.g. device_id=~"a|b|c")
+    and the others must match exactly. Queries are split so their URL-encoded
+    length stays under max_length.
+
+    Args:
+        selectors: (metric name, labels) pairs
+        max_length: Maximum URL-encoded query length
+
+    Returns:
+        List of (query, regex label or None, regex value -> selector indexes)
+    """
+    groups: Dict[Tuple[str, Tuple[str, ...]], List[int]] = {}
+    for i, (metric_name, labels) in enumerate(selectors):
+        groups.setdefault((metric_name, tuple(sorted(labels or {}))), []).append(i)
+
+    queries = []
+    for (metric_name, keys), indexes in groups.items():
+        if not keys:
+            queries.append((metric_name, None, {"": indexes}))
+            continue
+
+        batch_key = max(keys, key=lambda key: len({str(selectors[i][1][key]) for i in indexes}))
+        fixed_keys = [key for key in keys if key != batch_key]
+
+        # Selectors that differ only in the batch label share a query
+        subgroups: Dict[Tuple[str, ...], Dict[str, List[int]]] = {}
+        for i in indexes:
+            labels = selectors[i][1]
+            fixed = tuple(str(labels[key]) for key in fixed_keys)
+            subgroups.setdefault(fixed, {}).setdefault(str(labels[batch_key]), []).append(i)
+
+        for fixed, by_value in subgroups.items():
+            matchers = "".join(f'{key}="{escape_label_value(value)}",' for key, value in zip(fixed_keys, fixed))
+            prefix = f"{metric_name}{{{matchers}{batch_key}=~\""
+            budget = max_length - len(quote(prefix + '"}'))
+
+            chunk: Dict[str, List[int]] = {}
+            size = 0
+            for value, value_indexes in by_value.items():
+                alternative = escape_label_value(value.translate(_REGEX_ESCAPES))
+                cost = len(quote(alternative)) + len(quote("|"))
+                if chunk and size + cost > budget:
+                    queries.append((_regex_query(prefix, chunk), batch_key, chunk))
+                    chunk, size = {}, 0
+                chunk[value] = value_indexes
+                size += cost
+            if chunk:
+                queries.append((_regex_query(prefix, chunk), batch_key, chunk))
+
+    return queries
+
+
+def _regex_query(prefix: str, chunk: Dict[str, List[int]]) -> str:
+    alternatives = "|".join(escape_label_value(value.translate(_REGEX_ESCAPES)) for value in chunk)
+    return prefix + alternatives + '"}'
+
+
+def split_latest_results(
+    queries: List[Tuple[str, Optional[str], Dict[str, List[int]]]],
+    results: List[Optional[Dict]],
+    values: List[Optional[float]],
+):
+    """
+    Assign instant query results back to the selectors they were built from
+
+    Args:
+        queries: Output of build_selector_queries
+        results: Query response per query (None on error)
+        values: Per-selector values, filled in place
+    """
+    for (_, batch_key, by_value), result in zip(queries, results):
+        if not result or result.get("status") != "success":
+            continue
+
+        for series in result.get("data", {}).get("result", []):
+            labels = series.get("metric", {})
+            indexes = by_value.get(labels.get(batch_key, "")) if batch_key else by_value[""]
+            value = series.get("value", [None, None])[1]
+            if not indexes or value is None:
+                continue
+            for i in indexes:
+                # Like get_latest_value, the first matching series wins
+                if values[i] is None:
+                    try:
+                        values[i] = float(value)
+                    except ValueError:
+                        pass
+
+
+@dataclass
+class RangePlan:
+    """Cached buckets of one range request and the ranges still to fetch"""
+
+    query: str
+    step: int
+    first: int  # First step-aligned point of the request
+    last: int  # Last step-aligned point of the request
+    span: int  # Seconds per bucket
+    cutoff: int  # Newest point that may be cached
+    buckets: Dict[int, Optional["_Bucket"]]
+    missing: List[Tuple[int, int]]  # (start, end) ranges to fetch, oldest first
+
+
+class _Bucket:
+    """Cached points of one (query, step, bucket) key"""
+
+    __slots__ = ("series", "complete_until", "fetched_at")
+
+    def __init__(self):
+        self.series: Dict[Tuple, Dict[str, Any]] = {}  # label key -> {"metric": labels, "values": [[ts, value], ...]}
+        self.complete_until: Optional[int] = None  # Last timestamp (inclusive) known to be final
+        self.fetched_at = time.monotonic()
+
+
+class QueryRangeCache:
+    """
+    Step-aligned LRU cache of query_range results
+
+    Ranges are aligned to the step and split into buckets of bucket_points
+    steps, stored per (query, step, bucket index). A request is served from
+    cached buckets and only the missing part (normally the newest few points)
+    is fetched from VictoriaMetrics and merged in. Points newer than `lag`
+    seconds are returned but not cached, since samples for them may still be
+    in flight; buckets older than `ttl` are refetched to pick up backfilled
+    data.
+    """
+
+    def __init__(
+        self,
+        max_buckets: int = QUERY_CACHE_SIZE,
+        bucket_points: int = QUERY_CACHE_BUCKET_POINTS,
+        ttl: float = QUERY_CACHE_TTL,
+        lag: float = QUERY_CACHE_LAG,
+    ):
+        """
+        Initialize cache
+
+        Args:
+            max_buckets: Maximum cached buckets (LRU eviction)
+            bucket_points: Steps per bucket
+            ttl: Seconds before a bucket is refetched
+            lag: Seconds behind now before points are cached
+        """
+        self.max_buckets = max_buckets
+        self.bucket_points = bucket_points
+        self.ttl = ttl
+        self.lag = lag
+        self._buckets: "OrderedDict[Tuple[str, int, int], _Bucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0  # Requests served without a VictoriaMetrics query
+        self.partial = 0  # Requests that fetched only a missing part
+        self.misses = 0
+        self.points_fetched = 0
+
+    def _get(self, key: Tuple[str, int, int], now: float) -> Optional[_Bucket]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return None
+        if now - bucket.fetched_at > self.ttl:
+            del self._buckets[key]
+            return None
+        self._buckets.move_to_end(key)
+        return bucket
+
+    def _put(self, key: Tuple[str, int, int], bucket: _Bucket):
+        self._buckets[key] = bucket
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+
+    def plan(self, query: str, start: int, end: int, step: int) -> Optional["RangePlan"]:
+        """
+        Look up cached buckets and work out which ranges must be fetched
+
+        Args:
+            query: PromQL query string
+            start: Start (epoch seconds)
+            end: End (epoch seconds)
+            step: Step in seconds
+
+        Returns:
+            RangePlan, or None if the range holds no step-aligned point
+        """
+        first = start - start % step + (step if start % step else 0)  # First step-aligned point >= start
+        last = end - end % step
+        if last < first:
+            return None
+
+        span = step * self.bucket_points
+        indexes = range(first // span, last // span + 1)
+        cutoff = int(time.time() - self.lag)
+        cutoff -= cutoff % step
+        monotonic = time.monotonic()
+
+        with self._lock:
+            buckets = {index: self._get((query, step, index), monotonic) for index in indexes}
+
+        # Each bucket misses everything after its final part, up to the request end
+        missing: List[List[int]] = []
+        for index in indexes:
+            bucket = buckets[index]
+            bucket_last = min(index * span + span - step, last)
+            fetch_from = index * span if bucket is None or bucket.complete_until is None else bucket.complete_until + step
+            if fetch_from > bucket_last:
+                continue
+            if missing and missing[-1][1] + step == fetch_from:
+                missing[-1][1] = bucket_last
+            else:
+                missing.append([fetch_from, bucket_last])
+
+        return RangePlan(query, step, first, last, span, cutoff, buckets, [tuple(r) for r in missing])
+
+    def merge(self, plan: "RangePlan", fetched: List[Dict[str, Any]]) -> Dict:
+        """
+        Store fetched series in the plan's buckets and assemble the response
+
+        Args:
+            plan: RangePlan from plan()
+            fetched: Matrix result series of every range in plan.missing
+
+        Returns:
+            Prometheus-style matrix response covering the requested range
+        """
+        query, step, first, last, span, cutoff = plan.query, plan.step, plan.first, plan.last, plan.span, plan.cutoff
+        buckets = plan.buckets
+        cached = any(bucket is not None for bucket in buckets.values())
+
+        fresh: Dict[Tuple, Dict[str, Any]] = {}
+        with self._lock:
+            for index in buckets:
+                if buckets[index] is None:
+                    buckets[index] = _Bucket()
+
+            for series in fetched:
+                labels = series.get("metric", {})
+                key = tuple(sorted(labels.items()))
+                for point in series.get("values", []):
+                    ts = int(float(point[0]))
+                    self.points_fetched += 1
+                    if ts > cutoff:
+                        fresh.setdefault(key, {"metric": labels, "values": []})["values"].append(point)
+                        continue
+                    bucket = buckets.get(ts // span)
+                    if bucket is None or (bucket.complete_until is not None and ts <= bucket.complete_until):
+                        continue
+                    bucket.series.setdefault(key, {"metric": labels, "values": []})["values"].append(point)
+
+            for index, bucket in buckets.items():
+                final = min(index * span + span - step, last, cutoff)
+                if final >= index * span and (bucket.complete_until is None or final > bucket.complete_until):
+                    bucket.complete_until = final
+                if bucket.complete_until is not None:
+                    self._put((query, step, index), bucket)
+
+            if not plan.missing:
+                self.hits += 1
+            elif cached:
+                self.partial += 1
+            else:
+                self.misses += 1
+
+            # Cached buckets first, then the uncached fresh points
+            merged: Dict[Tuple, Dict[str, Any]] = {}
+            for bucket in buckets.values():
+                for key, series in bucket.series.items():
+                    values = [point for point in series["values"] if first <= int(float(point[0])) <= last]
+                    if values:
+                        merged.setdefault(key, {"metric": series["metric"], "values": []})["values"].extend(values)
+
+        for key, series in fresh.items():
+            values = [point for point in series["values"] if first <= int(float(point[0])) <= last]
+            if values:
+                merged.setdefault(key, {"metric": series["metric"], "values": []})["values"].extend(values)
+
+        return {"status": "success", "data": {"resultType": "matrix", "result": list(merged.values())}}
+
+    def query_range(self, fetch, query: str, start: int, end: int, step: int) -> Optional[Dict]:
+        """
+        Serve a range query from the cache, fetching missing ranges
+
+        Args:
+            fetch: Callable (query, start, end, step) -> VictoriaMetrics response or None
+            query: PromQL query string
+            start: Start (epoch seconds)
+            end: End (epoch seconds)
+            step: Step in seconds
+
+        Returns:
+            Prometheus-style matrix response, or None on error
+        """
+        plan = self.plan(query, start, end, step)
+        if plan is None:
+            return fetch(query, start, end, step)
+
+        # Fetched outside the lock; a concurrent request for the same range may fetch it too
+        fetched: List[Dict[str, Any]] = []
+        for fetch_start, fetch_end in plan.missing:
+            result = fetch(query, fetch_start, fetch_end, step)
+            if not result or result.get("status") != "success":
+                return result
+            data = result.get("data", {})
+            if data.get("resultType") != "matrix":
+                return fetch(query, start, end, step)
+            fetched.extend(data.get("result", []))
+
+        return self.merge(plan, fetched)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "buckets": len(self._buckets),
+            "hits": self.hits,
+            "partial": self.partial,
+            "misses": self.misses,
+            "points_fetched": self.points_fetched,
+        }
+
+
 class VictoriaMetricsClient:
     """
     VictoriaMetrics HTTP API client
@@ -30,6 +533,7 @@ class VictoriaMetricsClient:
             base_url: VictoriaMetrics base URL (defaults to env VICTORIA_URL)
         """
         self.base_url = base_url or os.getenv("VICTORIA_URL", "http://localhost:8428")
+        self.query_cache = QueryRangeCache() if QUERY_CACHE_SIZE > 0 else None
         self.session = requests.Session()
         self.session.headers.update({"Content-Type": "application/x-www-form-urlencoded"})
 
@@ -97,6 +601,8 @@ class VictoriaMetricsClient:
                      - value: float
                      - labels: dict (optional)
                      - timestamp: datetime (optional)
+                     - series: pre-rendered metric_name{labels} (optional,
+                       used instead of metric_name/labels when present)
 
         Returns:
             True if successful, False otherwise
@@ -109,24 +615,12 @@ class VictoriaMetricsClient:
             client.write_metrics_bulk(metrics)
         """
         try:
-            metric_lines = []
-
-            for metric in metrics:
-                metric_name = metric["metric_name"]
-                value = metric["value"]
-                labels = metric.get("labels", {})
-                timestamp = metric.get("timestamp", datetime.utcnow())
-
-                ts_ms = int(timestamp.timestamp() * 1000)
-                labels_str = self._build_labels_string(labels)
-                metric_lines.append(f"{metric_name}{labels_str} {value} {ts_ms}")
-
-            # Join all metrics with newlines
-            data = "\n".join(metric_lines)
+            data = bytearray()
+            get_series_cache().render(metrics, data)
 
             # Write using /api/v1/import/prometheus endpoint
             url = urljoin(self.base_url, "/api/v1/import/prometheus")
-            response = self.session.post(url, data=data)
+            response = self.session.post(url, data=bytes(data))
 
             if response.status_code == 204:
                 logger.info(f"Bulk write successful: {len(metrics)} metrics")
@@ -178,6 +672,9 @@ class VictoriaMetricsClient:
         """
         Execute range query (PromQL)
 
+        Results are served from the step-aligned QueryRangeCache, so repeated
+        refreshes of the same chart only fetch the newest points.
+
         Args:
             query: PromQL query string
             start: Start time
@@ -195,12 +692,21 @@ class VictoriaMetricsClient:
                 step="60s"
             )
         """
+        start_ts, end_ts = int(start.timestamp()), int(end.timestamp())
+        step_seconds = parse_step(step) if self.query_cache else None
+        if step_seconds is None:
+            return self._query_range(query, start_ts, end_ts, step)
+
+        return self.query_cache.query_range(self._query_range, query, start_ts, end_ts, step_seconds)
+
+    def _query_range(self, query: str, start: int, end: int, step) -> Optional[Dict]:
+        """Execute a range query against VictoriaMetrics (epoch-second bounds)"""
         try:
             url = urljoin(self.base_url, "/api/v1/query_range")
             params = {
                 "query": query,
-                "start": int(start.timestamp()),
-                "end": int(end.timestamp()),
+                "start": start,
+                "end": end,
                 "step": step,
             }
 
@@ -250,6 +756,41 @@ class VictoriaMetricsClient:
             logger.error(f"Error getting latest value for {metric_name}: {e}")
             return None
 
+    def get_latest_values(
+        self,
+        selectors: List[Tuple[str, Mapping[str, Any]]],
+        concurrency: int = LATEST_QUERY_CONCURRENCY,
+    ) -> List[Optional[float]]:
+        """
+        Get latest values for many series in as few instant queries as possible
+
+        Args:
+            selectors: (metric name, labels) pairs
+            concurrency: Maximum queries in flight
+
+        Returns:
+            Latest value per selector (None if missing or on error), in selector order
+
+        Example:
+            values = client.get_latest_values([("cpu_usage", {"device_id": d}) for d in device_ids])
+        """
+        values: List[Optional[float]] = [None] * len(selectors)
+        queries = build_selector_queries(selectors)
+        if not queries:
+            return values
+
+        def run(query):
+            return self.query(query[0])
+
+        if len(queries) == 1:
+            results = [run(queries[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(concurrency, len(queries))) as pool:
+                results = list(pool.map(run, queries))
+
+        split_latest_results(queries, results, values)
+        return values
+
     def health_check(self) -> bool:
         """
         Check if VictoriaMetrics is healthy
@@ -279,8 +820,7 @@ class VictoriaMetricsClient:
         if not labels:
             return ""
 
-        label_pairs = [f'{key}="{value}"' for key, value in labels.items()]
-        return "{" + ",".join(label_pairs) + "}"
+        return format_series("", labels)
 
     def delete_metrics(self, match: str) -> bool:
         """
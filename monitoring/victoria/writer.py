@@ -0,0 +1,541 @@
+"""
+WARD FLUX - Buffered VictoriaMetrics Writer
+
+Background writer shared by every producer in a process (Celery poll/ping
+tasks, the poller service, the trap receiver):
+
+- add() renders samples to Prometheus text lines (from the interned series
+  cache in client.py) and returns immediately,
+- a writer thread flushes the buffer when it reaches VM_WRITE_BATCH_SIZE lines
+  or every VM_WRITE_FLUSH_INTERVAL seconds,
+- bodies are gzip-compressed and POSTed with a timeout, retried with
+  exponential backoff,
+- batches that still fail are appended to an on-disk spool (VM_SPOOL_DIR) and
+  replayed oldest-first once VictoriaMetrics accepts writes again. While the
+  spool is not empty new batches are spooled behind it, so data reaches
+  VictoriaMetrics in the order it was produced.
+
+Spool segments are append-only files of length-prefixed gzip bodies; a segment
+is deleted once every record in it has been replayed and a newer segment
+exists. The replay position is kept in a sidecar file so a restart does not
+resend replayed records. All processes on a host share the spool directory;
+DiskSpool serializes them with flock.
+"""
+
+import os
+import gzip
+import time
+import fcntl
+import atexit
+import struct
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+
+from monitoring.victoria.client import get_series_cache
+
+logger = logging.getLogger(__name__)
+
+VM_WRITE_BATCH_SIZE = int(os.getenv("VM_WRITE_BATCH_SIZE", os.getenv("METRICS_BATCH_SIZE", "5000")))  # Lines per request
+VM_WRITE_FLUSH_INTERVAL = float(os.getenv("VM_WRITE_FLUSH_INTERVAL", "5"))  # seconds
+VM_WRITE_TIMEOUT = float(os.getenv("VM_WRITE_TIMEOUT", "10"))  # seconds per request
+VM_WRITE_RETRIES = int(os.getenv("VM_WRITE_RETRIES", "3"))  # Attempts before spooling
+VM_WRITE_BACKOFF = float(os.getenv("VM_WRITE_BACKOFF", "0.5"))  # seconds, doubled per attempt
+VM_WRITE_MAX_BUFFER = int(os.getenv("VM_WRITE_MAX_BUFFER", "500000"))  # Lines held in memory; oldest dropped beyond this
+VM_SPOOL_DIR = os.getenv("VM_SPOOL_DIR", "/var/lib/ward/vm-spool")
+VM_SPOOL_SEGMENT_BYTES = int(os.getenv("VM_SPOOL_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+VM_SPOOL_MAX_BYTES = int(os.getenv("VM_SPOOL_MAX_BYTES", str(1024 * 1024 * 1024)))  # Oldest segments dropped beyond this
+VM_SPOOL_RETRY_INTERVAL = float(os.getenv("VM_SPOOL_RETRY_INTERVAL", "15"))  # seconds between replay attempts
+
+IMPORT_PATH = "/api/v1/import/prometheus"
+RECORD_HEADER = struct.Struct(">I")  # Body length before each spooled record
+SPOOL_LOCK = ".lock"  # flock held around appends, replay steps and size enforcement
+SPOOL_REPLAY_LOCK = ".replay.lock"  # flock held by the one process replaying
+
+
+class DiskSpool:
+    """
+    Append-only on-disk queue of compressed request bodies
+
+    The directory is shared by every process writing metrics on the host (Celery
+    children, poller service, trap receiver, API). Appends, replay steps and size
+    enforcement hold an exclusive flock on the directory's lock file, and only
+    one process replays at a time. The newest segment is never removed because
+    another process may append to it next. Counts are read from disk, so they
+    include records spooled by other processes.
+
+    Not thread-safe within a process; MetricsWriter only touches it from its writer thread.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = VM_SPOOL_SEGMENT_BYTES, max_bytes: int = VM_SPOOL_MAX_BYTES):
+        """
+        Initialize spool
+
+        Args:
+            directory: Spool directory (created if missing)
+            segment_bytes: Size at which a new segment file is started
+            max_bytes: Total size at which the oldest segments are dropped
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.records_dropped = 0
+        os.makedirs(directory, exist_ok=True)
+
+        # segment -> (size, replay offset, complete records, ends cleanly); rescanned when size/offset change
+        self._scans: Dict[str, Tuple[int, int, int, bool]] = {}
+
+    @contextmanager
+    def _locked(self, lock_name: str = SPOOL_LOCK, blocking: bool = True):
+        """Hold an exclusive flock on a lock file in the spool directory; yields False if busy and non-blocking"""
+        with open(self._path(lock_name), "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _segments(self) -> List[str]:
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(".seg"))
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _offset_path(self, name: str) -> str:
+        return self._path(name[:-4] + ".offset")
+
+    def _read_offset(self, name: str) -> int:
+        try:
+            with open(self._offset_path(name)) as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _scan(self, name: str) -> Tuple[int, bool]:
+        """
+        Count complete records after the replay offset by walking the headers
+
+        Returns:
+            (record count, whether the segment ends on a record boundary)
+        """
+        size = os.path.getsize(self._path(name))
+        offset = self._read_offset(name)
+        cached = self._scans.get(name)
+        if cached is not None and cached[:2] == (size, offset):
+            return cached[2], cached[3]
+
+        count = 0
+        position = offset
+        with open(self._path(name), "rb") as f:
+            while position + RECORD_HEADER.size <= size:
+                f.seek(position)
+                (length,) = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+                if position + RECORD_HEADER.size + length > size:
+                    break
+                position += RECORD_HEADER.size + length
+                count += 1
+
+        self._scans[name] = (size, offset, count, position == size)
+        return count, position == size
+
+    def _read_record(self, name: str, offset: int) -> Optional[Tuple[int, bytes]]:
+        """Read the complete record at offset as (end offset, body), or None at the end / a torn tail"""
+        with open(self._path(name), "rb") as f:
+            f.seek(offset)
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return None
+            (length,) = RECORD_HEADER.unpack(header)
+            body = f.read(length)
+            if len(body) < length:
+                return None
+            return f.tell(), body
+
+    @property
+    def pending(self) -> int:
+        """Records waiting to be replayed (from every process sharing the directory)"""
+        with self._locked():
+            segments = self._segments()
+            for name in self._scans.keys() - set(segments):
+                del self._scans[name]
+            return sum(self._scan(name)[0] for name in segments)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(os.path.getsize(self._path(name)) for name in self._segments())
+
+    def append(self, body: bytes):
+        """
+        Append one compressed body
+
+        Args:
+            body: gzip-compressed request body
+        """
+        with self._locked():
+            segments = self._segments()
+            if not segments:
+                name = f"{0:012d}.seg"
+            elif os.path.getsize(self._path(segments[-1])) < self.segment_bytes and self._scan(segments[-1])[1]:
+                name = segments[-1]
+            else:
+                # Full, or ends in a record torn by a crash: records appended after it would be misread
+                name = f"{int(segments[-1].split('.')[0]) + 1:012d}.seg"
+
+            with open(self._path(name), "ab") as f:
+                f.write(RECORD_HEADER.pack(len(body)) + body)
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._enforce_limit()
+
+    def _enforce_limit(self):
+        """Drop the oldest segments beyond max_bytes (caller holds the lock)"""
+        segments = self._segments()
+        while len(segments) > 1 and self.size_bytes > self.max_bytes:
+            oldest = segments.pop(0)
+            dropped = self._scan(oldest)[0]
+            self._remove(oldest)
+            self.records_dropped += dropped
+            logger.error(f"Metrics spool over {self.max_bytes} bytes, dropped {dropped} oldest batches")
+
+    def _remove(self, name: str):
+        for path in (self._path(name), self._offset_path(name)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._scans.pop(name, None)
+
+    def replay(self, send) -> int:
+        """
+        Send spooled bodies oldest-first until one fails
+
+        Returns immediately if another process is replaying. The data lock is
+        only held while reading a record and advancing the offset, not during
+        send, so appends from other processes are not blocked by a slow replay.
+
+        Args:
+            send: Callable taking a body and returning True on success
+
+        Returns:
+            Number of records replayed
+        """
+        replayed = 0
+        with self._locked(SPOOL_REPLAY_LOCK, blocking=False) as acquired:
+            if not acquired:
+                return 0
+
+            while True:
+                with self._locked():
+                    segments = self._segments()
+                    if not segments:
+                        return replayed
+                    name = segments[0]
+                    record = self._read_record(name, self._read_offset(name))
+                    if record is None:
+                        if len(segments) == 1:
+                            return replayed  # Newest segment: others may still append to it
+                        # Every complete record of the segment is out
+                        self._remove(name)
+                        continue
+
+                end, body = record
+                if not send(body):
+                    return replayed
+                replayed += 1
+
+                with self._locked():
+                    # _enforce_limit may have dropped the segment meanwhile (names are never reused)
+                    if os.path.exists(self._path(name)):
+                        with open(self._offset_path(name), "w") as f:
+                            f.write(str(end))
+
+
+class MetricsWriter:
+    """
+    Process-wide buffered, compressed, retrying VictoriaMetrics writer
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        batch_size: int = VM_WRITE_BATCH_SIZE,
+        flush_interval: float = VM_WRITE_FLUSH_INTERVAL,
+        timeout: float = VM_WRITE_TIMEOUT,
+        retries: int = VM_WRITE_RETRIES,
+        backoff: float = VM_WRITE_BACKOFF,
+        spool_dir: Optional[str] = VM_SPOOL_DIR,
+    ):
+        """
+        Initialize writer
+
+        Args:
+            base_url: VictoriaMetrics base URL (defaults to env VICTORIA_URL)
+            batch_size: Lines per request
+            flush_interval: Maximum seconds a sample waits in the buffer
+            timeout: Seconds per HTTP request
+            retries: Attempts per batch before it is spooled
+            backoff: Delay before the first retry, doubled per attempt
+            spool_dir: Spool directory, or None to drop batches that cannot be written
+        """
+        self.base_url = base_url or os.getenv("VICTORIA_URL", "http://localhost:8428")
+        self.url = urljoin(self.base_url, IMPORT_PATH)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.retries = max(1, retries)
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "text/plain", "Content-Encoding": "gzip"})
+
+        self.spool: Optional[DiskSpool] = None
+        if spool_dir:
+            try:
+                self.spool = DiskSpool(spool_dir)
+            except OSError as e:
+                logger.error(f"Metrics spool {spool_dir} unavailable, failed batches will be dropped: {e}")
+
+        self._buffer: List[Tuple[bytes, int]] = []  # Rendered chunks and their line counts
+        self._buffered = 0
+        self._in_flight = 0  # Lines taken by the writer thread and not yet sent or spooled
+        self._body = bytearray()  # Reused request body, only touched by the writer thread
+        self._cond = threading.Condition()
+        self._flush_requested = False
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._next_replay = 0.0
+
+        self.samples_written = 0
+        self.samples_spooled = 0
+        self.samples_dropped = 0
+        self.batches_replayed = 0
+        self.requests = 0
+        self.retried = 0
+        self.bytes_sent = 0
+
+    # ============================================
+    # Producer side
+    # ============================================
+
+    def add(self, metrics: List[Dict[str, Any]]):
+        """
+        Queue samples for writing (non-blocking)
+
+        Args:
+            metrics: Metric dictionaries as accepted by write_metrics_bulk
+        """
+        if not metrics:
+            return
+
+        chunk = bytearray()
+        count = get_series_cache().render(metrics, chunk)
+
+        with self._cond:
+            self._ensure_thread()
+            self._buffer.append((bytes(chunk), count))
+            self._buffered += count
+
+            # Writer thread is stuck retrying; bound memory instead of blocking producers
+            dropped = 0
+            while self._buffered > VM_WRITE_MAX_BUFFER and len(self._buffer) > 1:
+                _, oldest = self._buffer.pop(0)
+                self._buffered -= oldest
+                dropped += oldest
+            if dropped:
+                self.samples_dropped += dropped
+                logger.error(f"Metrics buffer full, dropped {dropped} oldest samples")
+
+            if self._buffered >= self.batch_size:
+                self._cond.notify()
+
+    def flush(self, timeout: Optional[float] = None):
+        """
+        Ask the writer thread to send everything buffered and wait for it,
+        including a batch the thread already took and is still sending
+
+        Args:
+            timeout: Maximum seconds to wait
+        """
+        with self._cond:
+            # A forked child has no writer thread until its first add()
+            if self._thread is None or self._pid != os.getpid():
+                return
+            if not self._buffer and not self._in_flight:
+                return
+            if self._buffer:
+                self._flush_requested = True
+                self._cond.notify()
+            self._cond.wait_for(lambda: not self._flush_requested and not self._in_flight, timeout=timeout)
+
+    def close(self, timeout: float = 30.0):
+        """Flush and stop the writer thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        self.session.close()
+
+    def _ensure_thread(self):
+        # Forked Celery workers inherit the object but not the thread
+        if self._thread is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._in_flight = 0  # The parent's batch, if any, is sent by the parent
+            self._thread = threading.Thread(target=self._run, name="vm-writer", daemon=True)
+            self._thread.start()
+
+    # ============================================
+    # Writer thread
+    # ============================================
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or self._flush_requested or self._buffered >= self.batch_size,
+                    timeout=self.flush_interval,
+                )
+                chunks, self._buffer, self._in_flight, self._buffered = self._buffer, [], self._buffered, 0
+                flush_requested, closing = self._flush_requested, self._closed
+
+            # Concatenate chunks into batches of at least batch_size lines
+            count = 0
+            for chunk, lines in chunks:
+                self._body += chunk
+                count += lines
+                if count >= self.batch_size:
+                    self._write_batch(count)
+                    count = 0
+            if count:
+                self._write_batch(count)
+
+            if self.spool is not None and self.spool.pending and time.monotonic() >= self._next_replay:
+                self._replay()
+
+            with self._cond:
+                if flush_requested:
+                    self._flush_requested = False
+                self._in_flight = 0
+                self._cond.notify_all()
+                if closing and not self._buffer:
+                    return
+
+    def _post(self, body: bytes) -> bool:
+        """POST one compressed body; True on success"""
+        self.requests += 1
+        try:
+            response = self.session.post(self.url, data=body, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.warning(f"Metrics write failed: {e}")
+            return False
+
+        if response.status_code in (200, 204):
+            self.bytes_sent += len(body)
+            return True
+
+        logger.warning(f"Metrics write failed: {response.status_code} - {response.text[:200]}")
+        return False
+
+    def _send(self, body: bytes) -> bool:
+        """POST with retries and exponential backoff"""
+        delay = self.backoff
+        for attempt in range(self.retries):
+            if attempt:
+                self.retried += 1
+                time.sleep(delay)
+                delay *= 2
+            if self._post(body):
+                return True
+        return False
+
+    def _write_batch(self, count: int):
+        """Compress and send self._body (count lines), then reset it"""
+        body = gzip.compress(self._body, compresslevel=5)
+        self._body.clear()
+
+        # Keep order: nothing new goes out while older data is still spooled
+        if self.spool is not None and self.spool.pending:
+            self._spool(body, count)
+            return
+
+        if self._send(body):
+            self.samples_written += count
+            logger.debug(f"Wrote {count} samples ({len(body)} bytes compressed)")
+        else:
+            self._spool(body, count)
+
+    def _spool(self, body: bytes, count: int):
+        if self.spool is None:
+            self.samples_dropped += count
+            logger.error(f"Dropped {count} samples: VictoriaMetrics unavailable and no spool configured")
+            return
+
+        try:
+            self.spool.append(body)
+            self.samples_spooled += count
+        except OSError as e:
+            self.samples_dropped += count
+            logger.error(f"Dropped {count} samples: cannot spool to {self.spool.directory}: {e}")
+
+    def _replay(self):
+        replayed = self.spool.replay(self._post)
+        if self.spool.pending:
+            self._next_replay = time.monotonic() + VM_SPOOL_RETRY_INTERVAL
+        if replayed:
+            self.batches_replayed += replayed
+            logger.info(f"Replayed {replayed} spooled batches, {self.spool.pending} remaining")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get writer statistics
+
+        Returns:
+            Dictionary with buffer, throughput and spool counters
+        """
+        return {
+            "buffered": self._buffered,
+            "in_flight": self._in_flight,
+            "samples_written": self.samples_written,
+            "samples_spooled": self.samples_spooled,
+            "samples_dropped": self.samples_dropped,
+            "batches_replayed": self.batches_replayed,
+            "requests": self.requests,
+            "retried": self.retried,
+            "bytes_sent": self.bytes_sent,
+            "spool_pending": self.spool.pending if self.spool else 0,
+            "spool_dropped": self.spool.records_dropped if self.spool else 0,
+            "series_cache": get_series_cache().get_stats(),
+        }
+
+
+# Singleton instance
+_metrics_writer: Optional[MetricsWriter] = None
+
+
+def get_metrics_writer() -> MetricsWriter:
+    """
+    Get or create MetricsWriter singleton
+
+    Buffered samples are flushed at interpreter exit.
+
+    Returns:
+        MetricsWriter instance
+    """
+    global _metrics_writer
+
+    if _metrics_writer is None:
+        _metrics_writer = MetricsWriter()
+        atexit.register(_metrics_writer.close)
+
+    return _metrics_writer
@@ -14,6 +14,7 @@ from pydantic import BaseModel, Field, IPvAnyAddress
 
 from database import get_db, User
 from auth import get_current_active_user
+from monitoring.config_version import bump_config_version
 from monitoring.models import StandaloneDevice
 
 logger = logging.getLogger(__name__)
@@ -169,6 +170,7 @@ def create_device(
 
     db.add(new_device)
     db.commit()
+    bump_config_version("device created")
     db.refresh(new_device)
 
     logger.info(f"Created standalone device: {new_device.name} ({new_device.ip})")
@@ -219,6 +221,7 @@ def update_device(
 
     device.updated_at = datetime.utcnow()
     db.commit()
+    bump_config_version("device updated")
     db.refresh(device)
 
     logger.info(f"Updated standalone device: {device.name} ({device.ip})")
@@ -242,6 +245,7 @@ def delete_device(
 
     db.delete(device)
     db.commit()
+    bump_config_version("device deleted")
 
     logger.info(f"Deleted standalone device: {device_name} ({device_ip})")
     return {"success": True, "message": f"Device {device_name} deleted"}
@@ -294,6 +298,7 @@ def bulk_create_devices(
 
     if created_devices:
         db.commit()
+        bump_config_version("devices created")
         for device in created_devices:
             db.refresh(device)
 
@@ -322,6 +327,7 @@ def bulk_enable_devices(
             updated_count += 1
 
     db.commit()
+    bump_config_version("devices enabled")
     logger.info(f"Bulk enabled {updated_count} devices")
 
     return {"success": True, "updated_count": updated_count}
@@ -344,6 +350,7 @@ def bulk_disable_devices(
             updated_count += 1
 
     db.commit()
+    bump_config_version("devices disabled")
     logger.info(f"Bulk disabled {updated_count} devices")
 
     return {"success": True, "updated_count": updated_count}
@@ -20,9 +20,12 @@ from monitoring.models import (
     MonitoringItem,
     MonitoringMode,
 )
+from monitoring.config_version import bump_config_version
 from monitoring.snmp.oids import UNIVERSAL_OIDS, get_vendor_oids
 from monitoring.snmp.poller import get_snmp_poller, SNMPCredentialData
-from monitoring.snmp.crypto import encrypt_credential, decrypt_credential
+from monitoring.snmp.credential_service import get_credential_service
+from monitoring.snmp.crypto import encrypt_credential
+from monitoring.sharding import get_published_stats
 
 logger = logging.getLogger(__name__)
 
@@ -172,6 +175,7 @@ def create_profile(
 
     db.add(new_profile)
     db.commit()
+    bump_config_version("profile created")
     db.refresh(new_profile)
 
     logger.info(f"Created monitoring profile: {new_profile.name} (mode={new_profile.mode})")
@@ -193,6 +197,7 @@ def activate_profile(
     db.query(MonitoringProfile).update({"is_active": False})
     profile.is_active = True
     db.commit()
+    bump_config_version("profile activated")
 
     logger.info(f"Activated monitoring profile: {profile.name} (mode={profile.mode})")
     return {"success": True, "active_profile": profile.name, "mode": profile.mode.value}
@@ -246,8 +251,12 @@ def create_snmp_credential(
 
     db.add(new_cred)
     db.commit()
+    bump_config_version("credential created")
     db.refresh(new_cred)
 
+    get_snmp_poller().invalidate_credentials(device.get("ip"))
+    get_credential_service().invalidate(device_uuid)
+
     logger.info(f"Created SNMP credentials for {device['hostname']} ({credential.version})")
     return new_cred
 
@@ -279,6 +288,10 @@ def delete_credential(
 
     db.delete(cred)
     db.commit()
+    bump_config_version("credential deleted")
+    # The Zabbix host IP is not stored with the credential, so drop all cached auth data
+    get_snmp_poller().invalidate_credentials()
+    get_credential_service().invalidate(cred.device_id)
     logger.info(f"Deleted SNMP credentials {credential_id}")
     return {"success": True, "message": "Credentials deleted"}
 
@@ -353,22 +366,10 @@ async def detect_device(
 
     # Get SNMP credentials
     device_uuid = uuid.uuid5(uuid.NAMESPACE_DNS, f"zabbix-host-{hostid}")
-    cred = db.query(SNMPCredential).filter_by(device_id=device_uuid).first()
-    if not cred:
+    cred_data = get_credential_service().get(device_uuid, db)
+    if not cred_data:
         raise HTTPException(status_code=400, detail="No SNMP credentials configured. Please add credentials first.")
 
-    # Build credential data
-    cred_data = SNMPCredentialData(version=cred.version)
-    if cred.version == "v2c":
-        cred_data.community = decrypt_credential(cred.community_encrypted)
-    else:
-        cred_data.username = cred.username
-        cred_data.auth_protocol = cred.auth_protocol
-        cred_data.auth_key = decrypt_credential(cred.auth_key_encrypted) if cred.auth_key_encrypted else None
-        cred_data.priv_protocol = cred.priv_protocol
-        cred_data.priv_key = decrypt_credential(cred.priv_key_encrypted) if cred.priv_key_encrypted else None
-        cred_data.security_level = cred.security_level
-
     # Detect device
     poller = get_snmp_poller()
     try:
@@ -425,6 +426,7 @@ def create_monitoring_item(
 
     db.add(new_item)
     db.commit()
+    bump_config_version("item created")
     db.refresh(new_item)
 
     logger.info(f"Created monitoring item {item.oid_name} for {device['hostname']}")
@@ -456,6 +458,7 @@ def delete_monitoring_item(
 
     db.delete(item)
     db.commit()
+    bump_config_version("item deleted")
     logger.info(f"Deleted monitoring item {item_id}")
     return {"success": True, "message": "Monitoring item deleted"}
 
@@ -480,8 +483,8 @@ async def poll_device(
 
     # Get credentials
     device_uuid = uuid.uuid5(uuid.NAMESPACE_DNS, f"zabbix-host-{hostid}")
-    cred = db.query(SNMPCredential).filter_by(device_id=device_uuid).first()
-    if not cred:
+    cred_data = get_credential_service().get(device_uuid, db)
+    if not cred_data:
         raise HTTPException(status_code=400, detail="No SNMP credentials configured")
 
     # Get monitoring items
@@ -489,24 +492,12 @@ async def poll_device(
     if not items:
         raise HTTPException(status_code=400, detail="No monitoring items configured")
 
-    # Build credential data
-    cred_data = SNMPCredentialData(version=cred.version)
-    if cred.version == "v2c":
-        cred_data.community = decrypt_credential(cred.community_encrypted)
-    else:
-        cred_data.username = cred.username
-        cred_data.auth_protocol = cred.auth_protocol
-        cred_data.auth_key = decrypt_credential(cred.auth_key_encrypted) if cred.auth_key_encrypted else None
-        cred_data.priv_protocol = cred.priv_protocol
-        cred_data.priv_key = decrypt_credential(cred.priv_key_encrypted) if cred.priv_key_encrypted else None
-        cred_data.security_level = cred.security_level
-
     # Poll all items
     poller = get_snmp_poller()
     oids = [item.oid for item in items]
 
     try:
-        results = await poller.bulk_get(device_ip, oids, cred_data)
+        results = await poller.get_batch(device_ip, oids, cred_data)
 
         # Format results
         poll_results = []
@@ -573,6 +564,36 @@ def list_vendors(current_user: User = Depends(get_current_active_user)):
     }
 
 
+# ============================================
+# Poller Statistics
+# ============================================
+
+@router.get("/poller/stats")
+def get_poller_stats(
+    only_unhealthy: bool = True,
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    SNMP poller device health: adaptive timeouts and circuit breaker state
+
+    Returns this API process's poller stats plus the snapshots published by
+    running poller service nodes, so skipped (circuit-open) devices are visible.
+    """
+    poller = get_snmp_poller()
+    local = {
+        "cache": poller.get_cache_stats(),
+        "devices": poller.get_device_stats(only_unhealthy=only_unhealthy),
+    }
+
+    try:
+        nodes = get_published_stats()
+    except Exception as e:
+        logger.warning(f"Could not read poller node stats from Redis: {e}")
+        nodes = {}
+
+    return {"api": local, "nodes": nodes}
+
+
 # ============================================
 # Health Check
 # ============================================
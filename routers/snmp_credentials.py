@@ -11,6 +11,7 @@ Provides CRUD operations for SNMP credentials with:
 
 import logging
 import uuid
+from dataclasses import asdict
 from typing import List, Optional
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -18,9 +19,12 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from database import get_db, User
+from monitoring.celery_app import app as celery_app
+from monitoring.config_version import bump_config_version
 from monitoring.models import SNMPCredential, StandaloneDevice, MonitoringTemplate, MonitoringItem
-from monitoring.snmp.crypto import encrypt_credential, decrypt_credential
-from monitoring.snmp.poller import test_snmp_connection, detect_vendor
+from monitoring.snmp.credential_service import get_credential_service
+from monitoring.snmp.crypto import encrypt_credential
+from monitoring.snmp.poller import test_snmp_connection, detect_vendor, get_snmp_poller
 from routers.auth import get_current_active_user
 
 logger = logging.getLogger(__name__)
@@ -86,6 +90,12 @@ class SNMPTestRequest(BaseModel):
     test_oid: Optional[str] = "1.3.6.1.2.1.1.1.0"  # sysDescr
 
 
+class BulkDetectRequest(BaseModel):
+    device_ids: Optional[List[str]] = None  # None = all enabled devices
+    assign_templates: bool = True
+    concurrency: Optional[int] = None
+
+
 class SNMPTestResponse(BaseModel):
     success: bool
     device_ip: str
@@ -133,8 +143,12 @@ def create_snmpv2c_credential(
 
     db.add(new_credential)
     db.commit()
+    bump_config_version("credential created")
     db.refresh(new_credential)
 
+    get_snmp_poller().invalidate_credentials(device.ip)
+    get_credential_service().invalidate(device.id)
+
     logger.info(f"Created SNMPv2c credential for device: {device.name}")
     return SNMPCredentialResponse.from_orm(new_credential)
 
@@ -179,8 +193,12 @@ def create_snmpv3_credential(
 
     db.add(new_credential)
     db.commit()
+    bump_config_version("credential created")
     db.refresh(new_credential)
 
+    get_snmp_poller().invalidate_credentials(device.ip)
+    get_credential_service().invalidate(device.id)
+
     logger.info(f"Created SNMPv3 credential for device: {device.name}")
     return SNMPCredentialResponse.from_orm(new_credential)
 
@@ -214,6 +232,12 @@ def delete_device_credential(
 
     db.delete(credential)
     db.commit()
+    bump_config_version("credential deleted")
+
+    get_credential_service().invalidate(credential.device_id)
+    device = db.query(StandaloneDevice).filter_by(id=credential.device_id).first()
+    if device:
+        get_snmp_poller().invalidate_credentials(device.ip)
 
     logger.info(f"Deleted SNMP credential for device: {device_id}")
     return {"success": True, "message": "SNMP credential deleted"}
@@ -255,30 +279,12 @@ async def test_snmp_credential(
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
 
-    # Get credential
-    credential = db.query(SNMPCredential).filter_by(device_id=device.id).first()
-    if not credential:
+    # Get credential (cached, decrypted)
+    credentials = get_credential_service().get(device.id, db)
+    if not credentials:
         raise HTTPException(status_code=404, detail="SNMP credential not found for this device")
 
-    # Prepare SNMP parameters
-    if credential.version == "v2c":
-        community = decrypt_credential(credential.community_encrypted)
-        snmp_params = {
-            "version": "v2c",
-            "community": community,
-        }
-    else:  # v3
-        snmp_params = {
-            "version": "v3",
-            "username": credential.username,
-            "security_level": credential.security_level,
-        }
-        if credential.auth_key_encrypted:
-            snmp_params["auth_protocol"] = credential.auth_protocol
-            snmp_params["auth_key"] = decrypt_credential(credential.auth_key_encrypted)
-        if credential.priv_key_encrypted:
-            snmp_params["priv_protocol"] = credential.priv_protocol
-            snmp_params["priv_key"] = decrypt_credential(credential.priv_key_encrypted)
+    snmp_params = asdict(credentials)
 
     # Test SNMP connection
     try:
@@ -329,27 +335,12 @@ async def detect_device_vendor(
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
 
-    # Get credential
-    credential = db.query(SNMPCredential).filter_by(device_id=device.id).first()
-    if not credential:
+    # Get credential (cached, decrypted)
+    credentials = get_credential_service().get(device.id, db)
+    if not credentials:
         raise HTTPException(status_code=404, detail="SNMP credential not found. Please add credentials first.")
 
-    # Prepare SNMP parameters
-    if credential.version == "v2c":
-        community = decrypt_credential(credential.community_encrypted)
-        snmp_params = {"version": "v2c", "community": community}
-    else:
-        snmp_params = {
-            "version": "v3",
-            "username": credential.username,
-            "security_level": credential.security_level,
-        }
-        if credential.auth_key_encrypted:
-            snmp_params["auth_protocol"] = credential.auth_protocol
-            snmp_params["auth_key"] = decrypt_credential(credential.auth_key_encrypted)
-        if credential.priv_key_encrypted:
-            snmp_params["priv_protocol"] = credential.priv_protocol
-            snmp_params["priv_key"] = decrypt_credential(credential.priv_key_encrypted)
+    snmp_params = asdict(credentials)
 
     # Query sysDescr
     try:
@@ -449,6 +440,7 @@ def auto_assign_template(
         created_items.append(item_def["name"])
 
     db.commit()
+    bump_config_version("template assigned")
 
     logger.info(f"Auto-assigned template '{template.name}' to device {device.name}: {len(created_items)} items created")
 
@@ -462,6 +454,52 @@ def auto_assign_template(
     }
 
 
+@router.post("/bulk-detect", status_code=status.HTTP_202_ACCEPTED)
+def start_bulk_detection(
+    request: BulkDetectRequest,
+    current_user: User = Depends(get_current_active_user),
+):
+    """Start vendor detection and template auto-assignment for many devices"""
+    if request.device_ids is not None:
+        try:
+            device_ids = [str(uuid.UUID(device_id)) for device_id in request.device_ids]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid device ID format")
+    else:
+        device_ids = None
+
+    task = celery_app.send_task(
+        "monitoring.tasks.bulk_detect_devices",
+        kwargs={
+            "device_ids": device_ids,
+            "assign_templates": request.assign_templates,
+            "concurrency": request.concurrency,
+        },
+    )
+
+    logger.info(f"Started bulk detection task {task.id} ({len(device_ids) if device_ids is not None else 'all'} devices)")
+    return {"task_id": task.id, "status": "PENDING"}
+
+
+@router.get("/bulk-detect/{task_id}")
+def get_bulk_detection_status(
+    task_id: str,
+    current_user: User = Depends(get_current_active_user),
+):
+    """Get progress or result of a bulk detection task"""
+    result = celery_app.AsyncResult(task_id)
+
+    response = {"task_id": task_id, "status": result.state}
+    if result.state == "PROGRESS":
+        response["progress"] = result.info
+    elif result.state == "SUCCESS":
+        response["result"] = result.result
+    elif result.state == "FAILURE":
+        response["error"] = str(result.result)
+
+    return response
+
+
 # ============================================
 # Manual OID Query
 # ============================================
@@ -480,27 +518,12 @@ async def query_oid_manual(
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
 
-    # Get credential
-    credential = db.query(SNMPCredential).filter_by(device_id=device.id).first()
-    if not credential:
+    # Get credential (cached, decrypted)
+    credentials = get_credential_service().get(device.id, db)
+    if not credentials:
         raise HTTPException(status_code=404, detail="SNMP credential not found")
 
-    # Prepare SNMP parameters
-    if credential.version == "v2c":
-        community = decrypt_credential(credential.community_encrypted)
-        snmp_params = {"version": "v2c", "community": community}
-    else:
-        snmp_params = {
-            "version": "v3",
-            "username": credential.username,
-            "security_level": credential.security_level,
-        }
-        if credential.auth_key_encrypted:
-            snmp_params["auth_protocol"] = credential.auth_protocol
-            snmp_params["auth_key"] = decrypt_credential(credential.auth_key_encrypted)
-        if credential.priv_key_encrypted:
-            snmp_params["priv_protocol"] = credential.priv_protocol
-            snmp_params["priv_key"] = decrypt_credential(credential.priv_key_encrypted)
+    snmp_params = asdict(credentials)
 
     # Query OID
     try:
@@ -19,6 +19,7 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from database import get_db, User
+from monitoring.config_version import bump_config_version
 from monitoring.models import MonitoringTemplate, MonitoringItem, StandaloneDevice
 from routers.auth import get_current_active_user
 
@@ -340,6 +341,7 @@ def apply_template_to_devices(
             failed_devices.append({"device_id": device_id_str, "error": str(e)})
 
     db.commit()
+    bump_config_version("template applied")
 
     logger.info(f"Applied template '{template.name}' to {len(request.device_ids)} devices, created {len(created_items)} monitoring items")
 
@@ -0,0 +1,178 @@
+"""
+WARD FLUX - SNMPv2c Fast Path Codec Tests
+
+Checks the hand-written BER codec in monitoring/snmp/fastpath.py against
+messages encoded by pysnmp (requests it sends, responses it decodes) and
+round-trips the value types polling relies on.
+"""
+
+import pytest
+
+from monitoring.snmp.fastpath import (
+    PDU_GET,
+    PDU_GET_BULK,
+    PDU_INFORM,
+    SNMP_TRAP_OID,
+    SNMP_VERSION_2C,
+    SYS_UPTIME_OID,
+    TAG_COUNTER64,
+    TAG_END_OF_MIB_VIEW,
+    TAG_INTEGER,
+    TAG_IP_ADDRESS,
+    TAG_NO_SUCH_INSTANCE,
+    TAG_OCTET_STRING,
+    TAG_OID,
+    TAG_SEQUENCE,
+    TAG_TIMETICKS,
+    _encode_tlv,
+    decode_response,
+    decode_trap,
+    encode_inform_response,
+    encode_integer,
+    encode_oid,
+    encode_request,
+    encode_response,
+    encode_value,
+)
+
+COMMUNITY = "public"
+REQUEST_ID = 0x1234ABCD
+OIDS = ["1.3.6.1.2.1.1.1.0", "1.3.6.1.2.1.2.2.1.10.1", "1.3.6.1.4.1.9.9.109.1.1.1.1.8.200"]
+
+
+def _pysnmp_message(pdu_class, api_pdu, var_binds=None, **fields):
+    pytest.importorskip("pysnmp")
+    from pyasn1.codec.ber import encoder
+    from pysnmp.proto import api
+
+    proto = api.protoModules[api.protoVersion2c]
+    pdu = getattr(proto, pdu_class)()
+    api_pdu = getattr(proto, api_pdu)
+    api_pdu.setDefaults(pdu)
+    api_pdu.setRequestID(pdu, REQUEST_ID)
+    if "non_repeaters" in fields:
+        api_pdu.setNonRepeaters(pdu, fields["non_repeaters"])
+        api_pdu.setMaxRepetitions(pdu, fields["max_repetitions"])
+    if var_binds is None:
+        var_binds = [(oid, proto.Null("")) for oid in OIDS]
+    api_pdu.setVarBinds(pdu, [(proto.ObjectIdentifier(oid), value) for oid, value in var_binds])
+
+    message = proto.Message()
+    proto.apiMessage.setDefaults(message)
+    proto.apiMessage.setCommunity(message, COMMUNITY)
+    proto.apiMessage.setPDU(message, pdu)
+    return encoder.encode(message)
+
+
+# ============================================
+# Requests
+# ============================================
+
+def test_get_request_matches_pysnmp():
+    expected = _pysnmp_message("GetRequestPDU", "apiPDU")
+    assert encode_request(REQUEST_ID, COMMUNITY, OIDS, PDU_GET) == expected
+
+
+def test_get_bulk_request_matches_pysnmp():
+    expected = _pysnmp_message("GetBulkRequestPDU", "apiBulkPDU", non_repeaters=1, max_repetitions=25)
+    assert encode_request(REQUEST_ID, COMMUNITY, OIDS, PDU_GET_BULK, 1, 25) == expected
+
+
+# ============================================
+# Responses
+# ============================================
+
+def test_response_round_trip():
+    counter_max = 2 ** 64 - 1
+    message = encode_response(
+        REQUEST_ID,
+        COMMUNITY,
+        [
+            ("1.3.6.1.2.1.31.1.1.1.6.1", encode_value(TAG_COUNTER64, counter_max)),
+            ("1.3.6.1.2.1.4.20.1.1.10.0.0.1", encode_value(TAG_IP_ADDRESS, "10.0.0.1")),
+            ("1.3.6.1.2.1.2.2.1.10.99", encode_value(TAG_NO_SUCH_INSTANCE, None)),
+            ("1.3.6.1.2.1.2.2.1.10", encode_value(TAG_END_OF_MIB_VIEW, None)),
+        ],
+    )
+
+    response = decode_response(message)
+
+    assert response.request_id == REQUEST_ID
+    assert response.community == COMMUNITY
+    assert (response.error_status, response.error_index) == (0, 0)
+    assert [(oid, tuple(value)) for oid, value in response.var_binds] == [
+        ((1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 6, 1), (counter_max, "counter64")),
+        ((1, 3, 6, 1, 2, 1, 4, 20, 1, 1, 10, 0, 0, 1), ("10.0.0.1", "string")),
+        ((1, 3, 6, 1, 2, 1, 2, 2, 1, 10, 99), (None, "noSuchInstance")),
+        ((1, 3, 6, 1, 2, 1, 2, 2, 1, 10), (None, "endOfMibView")),
+    ]
+
+
+def test_decode_pysnmp_response():
+    pytest.importorskip("pysnmp")
+    from pysnmp.proto import rfc1902, rfc1905
+
+    counter_max = 2 ** 64 - 1
+    message = _pysnmp_message(
+        "ResponsePDU",
+        "apiPDU",
+        [
+            ("1.3.6.1.2.1.31.1.1.1.6.1", rfc1902.Counter64(counter_max)),
+            ("1.3.6.1.2.1.4.20.1.1.10.0.0.1", rfc1902.IpAddress("10.0.0.1")),
+            ("1.3.6.1.2.1.1.5.0", rfc1902.OctetString("core-sw1")),
+            ("1.3.6.1.2.1.2.2.1.10.99", rfc1905.noSuchInstance),
+            ("1.3.6.1.2.1.2.2.1.10", rfc1905.endOfMibView),
+        ],
+    )
+
+    response = decode_response(message)
+
+    assert response.request_id == REQUEST_ID
+    assert response.community == COMMUNITY
+    assert (response.error_status, response.error_index) == (0, 0)
+    assert [(oid, tuple(value)) for oid, value in response.var_binds] == [
+        ((1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 6, 1), (counter_max, "counter64")),
+        ((1, 3, 6, 1, 2, 1, 4, 20, 1, 1, 10, 0, 0, 1), ("10.0.0.1", "string")),
+        ((1, 3, 6, 1, 2, 1, 1, 5, 0), ("core-sw1", "string")),
+        ((1, 3, 6, 1, 2, 1, 2, 2, 1, 10, 99), (None, "noSuchInstance")),
+        ((1, 3, 6, 1, 2, 1, 2, 2, 1, 10), (None, "endOfMibView")),
+    ]
+
+
+# ============================================
+# Notifications
+# ============================================
+
+def test_inform_decode_and_acknowledge():
+    link_down = "1.3.6.1.6.3.1.1.5.3"
+    var_binds = [
+        (".".join(map(str, SYS_UPTIME_OID)), encode_value(TAG_TIMETICKS, 123456)),
+        (".".join(map(str, SNMP_TRAP_OID)), encode_value(TAG_OID, link_down)),
+        ("1.3.6.1.2.1.2.2.1.1.7", encode_value(TAG_INTEGER, 7)),
+        ("1.3.6.1.2.1.2.2.1.2.7", encode_value(TAG_OCTET_STRING, "Gi0/7")),
+    ]
+    body = b"".join(_encode_tlv(TAG_SEQUENCE, encode_oid(oid) + value) for oid, value in var_binds)
+    pdu = _encode_tlv(
+        PDU_INFORM, encode_integer(REQUEST_ID) + encode_integer(0) + encode_integer(0) + _encode_tlv(TAG_SEQUENCE, body)
+    )
+    inform = _encode_tlv(
+        TAG_SEQUENCE, encode_integer(SNMP_VERSION_2C) + _encode_tlv(TAG_OCTET_STRING, COMMUNITY.encode()) + pdu
+    )
+
+    trap = decode_trap(inform)
+
+    assert trap.pdu_type == PDU_INFORM
+    assert trap.request_id == REQUEST_ID
+    assert trap.trap_oid == (1, 3, 6, 1, 6, 3, 1, 1, 5, 3)
+    assert trap.uptime == 123456
+    assert [(oid, tuple(value)) for oid, value in trap.var_binds] == [
+        ((1, 3, 6, 1, 2, 1, 2, 2, 1, 1, 7), (7, "integer")),
+        ((1, 3, 6, 1, 2, 1, 2, 2, 1, 2, 7), ("Gi0/7", "string")),
+    ]
+
+    # The acknowledgement is a Response echoing every varbind, including sysUpTime.0 and snmpTrapOID.0
+    ack = decode_response(encode_inform_response(trap))
+    assert ack.request_id == REQUEST_ID
+    assert ack.community == COMMUNITY
+    assert [oid for oid, _ in ack.var_binds] == [tuple(map(int, oid.split("."))) for oid, _ in var_binds]
+    assert tuple(ack.var_binds[1][1]) == (link_down, "oid")